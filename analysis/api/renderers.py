@@ -0,0 +1,178 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) Provided rest api for the 'Analysis' page involving
+#              renderers
+# ------------------------------------------------------------------------------------------------
+# Notes:  This is one of the REST API part of the serverside module that allows the user to
+#         interact with the 'analysis' interface of the website. The 'frames' format sends the
+#         numeric numpy arrays of a component result as raw little endian buffers next to a JSON
+#         header, instead of one JSON number per element. It is chosen with the Accept header
+#         (application/vnd.mads.frames) and decodes to the same shape as the JSON response.
+#
+#         Layout: magic (8 bytes) | header length (uint32) | reserved (uint32) | header (utf-8
+#         JSON, padded to 8 bytes) | buffers (each starting at a multiple of 8 bytes)
+#         The header is {"data": result, "buffers": [{"dtype", "shape", "offset", "byteLength"}]}
+#         where every array of the result is replaced by {"$buffer": index into buffers}.
+# ------------------------------------------------------------------------------------------------
+# References: json, struct, numpy, pandas and rest framework libs
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+#-------------------------------------------------------------------------------------------------
+
+FRAMES_MAGIC = b'MADSFRM1'
+
+FRAMES_MEDIA_TYPE = 'application/vnd.mads.frames'
+
+# Types that the client can view as typed arrays (no 64 bit integers in javascript)
+frame_dtypes = {'float64', 'float32', 'int8', 'int16', 'int32', 'uint8', 'uint16', 'uint32'}
+
+_prefix = struct.Struct('<8sII')
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def to_frame_array(array):
+    """Return the array as one of the frame_dtypes (plus whether it holds booleans), or None if
+    it is not numeric and has to stay in the JSON header.
+    """
+    kind = array.dtype.kind
+    if kind == 'b':
+        return array.astype('uint8'), True
+    if kind == 'f':
+        dtype = 'float32' if array.dtype.itemsize <= 4 else 'float64'
+        return array.astype(dtype, copy=False), False
+    if kind in 'iu':
+        if array.dtype.name in frame_dtypes:
+            return array, False
+        info = np.iinfo('int32')
+        if array.size == 0 or (array.min() >= info.min and array.max() <= info.max):
+            return array.astype('int32'), False
+        return array.astype('float64'), False
+    return None, False
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def extract_buffers(obj, buffers):
+    """Copy of obj (a component result) whose numeric arrays are moved to buffers."""
+
+    if isinstance(obj, (pd.Series, pd.Index)):
+        obj = obj.to_numpy()
+
+    if isinstance(obj, np.ndarray):
+        if obj.ndim == 0:
+            return obj.item()
+        array, is_bool = to_frame_array(obj)
+        if array is None:
+            return obj.tolist()
+        buffers.append((np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<')), is_bool))
+        return {'$buffer': len(buffers) - 1}
+
+    if isinstance(obj, dict):
+        return {k: extract_buffers(v, buffers) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [extract_buffers(v, buffers) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def _pad(length):
+    return -length % 8
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def encode_frames(data):
+    buffers = []
+    header = {'data': extract_buffers(data, buffers), 'buffers': []}
+
+    offset = 0
+    for array, is_bool in buffers:
+        entry = {'dtype': array.dtype.name, 'shape': list(array.shape), 'offset': offset,
+                 'byteLength': array.nbytes}
+        if is_bool:
+            entry['bool'] = True
+        header['buffers'].append(entry)
+        offset += array.nbytes + _pad(array.nbytes)
+
+    header_bytes = json.dumps(
+        header, cls=encoders.JSONEncoder, ensure_ascii=False,
+        allow_nan=not api_settings.STRICT_JSON, separators=(',', ':'),
+    ).encode('utf-8')
+    header_bytes += b' ' * _pad(len(header_bytes))
+
+    parts = [_prefix.pack(FRAMES_MAGIC, len(header_bytes), 0), header_bytes]
+    for array, is_bool in buffers:
+        parts.append(array.tobytes())
+        parts.append(b'\0' * _pad(array.nbytes))
+    return b''.join(parts)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def decode_frames(content):
+    """Inverse of encode_frames, with numpy arrays (read only views of content) in place of
+    the buffers.
+    """
+    magic, header_length, _ = _prefix.unpack_from(content)
+    if magic != FRAMES_MAGIC:
+        raise ValueError('Not a frames response.')
+
+    start = _prefix.size + header_length
+    header = json.loads(bytes(content[_prefix.size:start]).decode('utf-8'))
+
+    arrays = []
+    for b in header['buffers']:
+        array = np.frombuffer(content, dtype=np.dtype(b['dtype']).newbyteorder('<'),
+                              count=b['byteLength'] // np.dtype(b['dtype']).itemsize,
+                              offset=start + b['offset']).reshape(b['shape'])
+        arrays.append(array.astype(bool) if b.get('bool') else array)
+
+    def restore(obj):
+        if isinstance(obj, dict):
+            if set(obj) == {'$buffer'}:
+                return arrays[obj['$buffer']]
+            return {k: restore(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [restore(v) for v in obj]
+        return obj
+
+    return restore(header['data'])
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class FramesRenderer(renderers.BaseRenderer):
+    """Binary 'frames' rendering of component results (see the notes above)."""
+
+    media_type = FRAMES_MEDIA_TYPE
+    format = 'frames'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return encode_frames(data)
+#-------------------------------------------------------------------------------------------------
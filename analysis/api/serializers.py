@@ -23,6 +23,7 @@ from rest_framework import serializers
 from ..models import Workspace
 from ..models import VisComponent
 from ..models import ComponentInstance
+from ..models import OptimizationSession
 
 import logging
 logger = logging.getLogger(__name__)
@@ -99,3 +100,25 @@ class ComponentInstanceSerializer(serializers.ModelSerializer):
             'shared_users', 'shared_groups', 'contents'
         ]
 #-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class OptimizationSessionSerializer(serializers.ModelSerializer):
+
+    settings = JSONSerializerField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance is not None:
+            # the process is fitted on the workspace and settings the session was created with
+            self.fields['workspace'].read_only = True
+            self.fields['settings'].read_only = True
+
+    class Meta:
+        model = OptimizationSession
+        fields = [
+            'id', 'name', 'owner', 'description', 'accessibility', 'workspace',
+            'settings', 'observation_count', 'created', 'modified',
+        ]
+        read_only_fields = ['owner', 'observation_count']
+#-------------------------------------------------------------------------------------------------
@@ -0,0 +1,130 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) rest api utils for the 'Analysis' page providing the
+#              acquisition functions of the 'gaussian_process' (Bayesian optimization) component
+# ------------------------------------------------------------------------------------------------
+# Notes:  This is one of the REST API parts of the 'analysis' interface of the website. Every
+#         function scores the whole candidate array at once (no python loop over candidates).
+#         All functions return "higher is better" scores for both maximization and minimization.
+# ------------------------------------------------------------------------------------------------
+# References: logging, numpy and scipy libs
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+import logging
+import numpy as np
+from scipy.special import ndtr
+
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------------------------
+
+_inv_sqrt_2pi = 1.0 / np.sqrt(2.0 * np.pi)
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def _improvement(mean, best, xi, maximize):
+    """Predicted improvement over the best observation, in the direction of the optimization."""
+    mean = np.asarray(mean, dtype='float64')
+    return mean - best - xi if maximize else best - mean - xi
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def _z_score(improvement, std):
+    """improvement / std, with 0 where the standard deviation is 0."""
+    std = np.asarray(std, dtype='float64')
+    z = np.zeros_like(improvement)
+    np.divide(improvement, std, out=z, where=std > 0)
+    return z, std
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def expected_improvement(mean, std, best, xi=0.0, maximize=True):
+    """EI = s * (z * Phi(z) + phi(z)), z = improvement / s. Candidates without uncertainty get 0."""
+    improvement = _improvement(mean, best, xi, maximize)
+    z, std = _z_score(improvement, std)
+    ei = std * (z * ndtr(z) + _inv_sqrt_2pi * np.exp(-0.5 * z * z))
+    ei[std <= 0] = 0.0
+    return ei
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def probability_of_improvement(mean, std, best, xi=0.0, maximize=True):
+    improvement = _improvement(mean, best, xi, maximize)
+    z, std = _z_score(improvement, std)
+    pi = ndtr(z)
+    pi[std <= 0] = 0.0
+    return pi
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def upper_confidence_bound(mean, std, kappa=2.0, maximize=True):
+    """UCB (mean + kappa * s); for minimization the negated lower confidence bound."""
+    mean = np.asarray(mean, dtype='float64')
+    std = np.asarray(std, dtype='float64')
+    return mean + kappa * std if maximize else -(mean - kappa * std)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def top_k(scores, k):
+    """Indices of the k highest scores in descending order, without sorting the whole array."""
+    scores = np.asarray(scores)
+    k = max(0, min(int(k), len(scores)))
+    if k == 0:
+        return np.empty(0, dtype='intp')
+    if k < len(scores):
+        index = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    else:
+        index = np.arange(len(scores))
+    return index[np.argsort(scores[index], kind='stable')[::-1]]
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def q_expected_improvement(model, candidates, ei, best, q, xi=0.0, maximize=True,
+                           n_pool=200, n_samples=512, random_state=0):
+    """Select a batch of q candidates with high joint expected improvement (q-EI).
+
+    The pool of the n_pool candidates with the highest single point EI is sampled from the joint
+    posterior of the fitted GaussianProcessRegressor, and the batch is grown greedily by the
+    candidate that increases the Monte Carlo estimate of E[max(improvement of the batch)] most.
+
+    Returns:
+        indices of the batch into candidates (in selection order), q-EI estimate of the batch
+    """
+    pool = top_k(ei, n_pool)
+    if len(pool) == 0 or q <= 0:
+        return np.empty(0, dtype='intp'), 0.0
+
+    mean, cov = model.predict(candidates[pool], return_cov=True)
+    rng = np.random.default_rng(random_state)
+    samples = rng.multivariate_normal(mean, cov, size=n_samples, method='eigh')
+    gain = np.maximum(_improvement(samples, best, xi, maximize), 0.0)
+
+    current = np.zeros(n_samples)
+    chosen = []
+    available = np.ones(len(pool), dtype=bool)
+    for _ in range(min(q, len(pool))):
+        value = np.maximum(gain, current[:, None]).mean(axis=0)
+        value[~available] = -np.inf
+        best_index = int(np.argmax(value))
+        chosen.append(best_index)
+        available[best_index] = False
+        current = np.maximum(current, gain[:, best_index])
+
+    return pool[chosen], float(current.mean())
+#-------------------------------------------------------------------------------------------------
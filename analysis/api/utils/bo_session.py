@@ -0,0 +1,262 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) rest api utils for the 'Analysis' page providing incremental
+#              Bayesian optimization sessions for the 'gaussian_process' component
+# ------------------------------------------------------------------------------------------------
+# Notes:  This is one of the REST API parts of the 'analysis' interface of the website. A session
+#         keeps the fitted kernel and the Cholesky factor of the Gaussian process between the
+#         iterations of an experiment loop; new observations extend the factor (rank-m update)
+#         and the kernel hyperparameters are only re-optimized now and then, starting from the
+#         current ones. The state is stored as plain arrays (observations, Cholesky factor and
+#         kernel hyperparameters), not as pickled objects, so it survives library upgrades.
+# ------------------------------------------------------------------------------------------------
+# References: Django settings, io, logging, numpy, scipy and sklearn libs and the 'acquisition'
+#             and 'gaussian_process' utils
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+import io
+import logging
+import numpy as np
+from scipy.linalg import cho_solve, cholesky, solve_triangular
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import RBF, ConstantKernel, Kernel
+
+from .acquisition import expected_improvement
+from .acquisition import probability_of_improvement
+from .acquisition import q_expected_improvement
+from .acquisition import upper_confidence_bound
+from .gaussian_process import CHUNK_SIZE
+from .gaussian_process import acquisition_names
+from .gaussian_process import get_kernel
+from .gaussian_process import iter_grid_chunks
+from .gaussian_process import iter_sample_chunks
+from .gaussian_process import predict_candidates
+
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------------------------
+
+# Number of observations after which the kernel hyperparameters are re-optimized (warm start)
+REFIT_EVERY = getattr(settings, 'ANALYSIS_BO_REFIT_EVERY', 5)
+
+# Jitter added to the diagonal of the kernel matrix (same as the GaussianProcessRegressor default)
+JITTER = 1e-10
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class IncrementalGP:
+    """Gaussian process with fixed kernel hyperparameters whose Cholesky factor is extended when
+    observations are added. Predictions match a GaussianProcessRegressor (normalize_y=False) that
+    has the same fitted kernel.
+    """
+
+    def __init__(self, kernel, X, y, L=None):
+        self.kernel_ = kernel
+        self.X = np.asarray(X, dtype='float64')
+        self.y = np.asarray(y, dtype='float64')
+        if L is None:
+            K = self.kernel_(self.X)
+            K[np.diag_indices_from(K)] += JITTER
+            L = cholesky(K, lower=True, check_finite=False)
+        self.L = L
+        self.alpha = cho_solve((self.L, True), self.y, check_finite=False)
+
+    @classmethod
+    def fit(cls, kernel, X, y):
+        """Optimize the hyperparameters of the kernel (starting from its current values)."""
+        model = GaussianProcessRegressor(kernel)
+        model.fit(X, y)
+        return cls(model.kernel_, X, y, model.L_)
+
+    def append(self, X_new, y_new):
+        """Add observations with a block update of the Cholesky factor, O(n^2 m) instead of
+        O(n^3).
+        """
+        X_new = np.asarray(X_new, dtype='float64')
+        K12 = self.kernel_(self.X, X_new)
+        K22 = self.kernel_(X_new)
+        K22[np.diag_indices_from(K22)] += JITTER
+
+        S21 = solve_triangular(self.L, K12, lower=True, check_finite=False).T
+        L22 = cholesky(K22 - S21 @ S21.T, lower=True, check_finite=False)
+
+        n, m = len(self.X), len(X_new)
+        L = np.zeros((n + m, n + m))
+        L[:n, :n] = self.L
+        L[n:, :n] = S21
+        L[n:, n:] = L22
+
+        self.X = np.vstack([self.X, X_new])
+        self.y = np.concatenate([self.y, np.asarray(y_new, dtype='float64')])
+        self.L = L
+        self.alpha = cho_solve((self.L, True), self.y, check_finite=False)
+
+    def predict(self, X, return_std=False, return_cov=False):
+        K_trans = self.kernel_(X, self.X)
+        mean = K_trans @ self.alpha
+        if not (return_std or return_cov):
+            return mean
+
+        v = solve_triangular(self.L, K_trans.T, lower=True, check_finite=False)
+        if return_cov:
+            return mean, self.kernel_(X) - v.T @ v
+
+        var = self.kernel_.diag(X) - np.einsum('ij,ij->j', v, v)
+        return mean, np.sqrt(np.clip(var, 0.0, None))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_observations(session_settings, dataset):
+    """Feature matrix and target vector of the observations in dataset (DataFrame or dict of
+    columns), ordered like the feature columns of the session.
+    """
+    columns = [c['column'] for c in session_settings['featureColumns']]
+    X = np.column_stack([np.asarray(dataset[c], dtype='float64') for c in columns])
+    y = np.asarray(dataset[session_settings['targetColumn']], dtype='float64')
+    if len(X) != len(y):
+        raise ValueError('All columns of the observations must have the same length.')
+    return X, y
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_session_kernel(session_settings, n_features):
+    """Unfitted kernel of the session settings (the GaussianProcessRegressor default if none)."""
+    kernel = get_kernel(session_settings.get('kernel'), n_features)
+    if not isinstance(kernel, Kernel):
+        kernel = (ConstantKernel(1.0, constant_value_bounds='fixed')
+                  * RBF(1.0, length_scale_bounds='fixed'))
+    return kernel
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def create_state(session_settings, dataset):
+    """Fit the Gaussian process of a new session (full hyperparameter optimization)."""
+    X, y = get_observations(session_settings, dataset)
+    kernel = get_session_kernel(session_settings, X.shape[1])
+    return {'gp': IncrementalGP.fit(kernel, X, y), 'sinceRefit': 0}
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_session_state(session):
+    """Load the state of an OptimizationSession, the kernel is rebuilt from the session settings
+    with the stored (log) hyperparameters.
+    """
+    if not session.state:
+        return None
+
+    with np.load(io.BytesIO(bytes(session.state)), allow_pickle=False) as stored:
+        X = stored['X']
+        kernel = get_session_kernel(session.settings, X.shape[1]).clone_with_theta(stored['theta'])
+        gp = IncrementalGP(kernel, X, stored['y'], stored['L'])
+        return {'gp': gp, 'sinceRefit': int(stored['sinceRefit'])}
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def set_session_state(session, state):
+    """Store the state in an OptimizationSession (not saved) as arrays in npz format."""
+    gp = state['gp']
+    buffer = io.BytesIO()
+    np.savez(buffer, X=gp.X, y=gp.y, L=gp.L, theta=gp.kernel_.theta, sinceRefit=state['sinceRefit'])
+    session.state = buffer.getvalue()
+    session.observation_count = len(gp.y)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def observe(state, session_settings, dataset, refit=False):
+    """Add observations to the session. Every REFIT_EVERY observations (or on request) the
+    hyperparameters are re-optimized starting from the current ones, otherwise only the
+    Cholesky factor is extended.
+
+    Returns:
+        True when the hyperparameters were re-optimized
+    """
+    X_new, y_new = get_observations(session_settings, dataset)
+    gp = state['gp']
+    state['sinceRefit'] += len(y_new)
+
+    if refit or (REFIT_EVERY and state['sinceRefit'] >= REFIT_EVERY):
+        X = np.vstack([gp.X, X_new])
+        y = np.concatenate([gp.y, y_new])
+        state['gp'] = IncrementalGP.fit(gp.kernel_, X, y)
+        state['sinceRefit'] = 0
+        return True
+
+    gp.append(X_new, y_new)
+    return False
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def suggest(state, session_settings, count=5, acquisition=None):
+    """Score the candidates of the session (grid or quasi random samples within the feature
+    bounds) and return the best count ones.
+    """
+    gp = state['gp']
+    feature_columns = session_settings['featureColumns']
+    acquisition = acquisition or session_settings.get('acquisition', 'EI')
+    sampling = session_settings.get('sampling', 'grid')
+    if acquisition not in acquisition_names:
+        raise ValueError('unknown acquisition function ' + str(acquisition))
+    if sampling not in ('grid', 'lhs', 'sobol'):
+        raise ValueError('unknown sampling method ' + str(sampling))
+    maximize = session_settings.get('targetEI', 'Maximization') == 'Maximization'
+    kappa = float(session_settings.get('kappa', 2.0))
+    best = np.max(gp.y) if maximize else np.min(gp.y)
+    Xi = np.std(gp.y) * 0.01
+
+    def get_acquisition(pred, std):
+        EI = expected_improvement(pred, std, best, Xi, maximize)
+        if acquisition == 'PI':
+            score = probability_of_improvement(pred, std, best, Xi, maximize)
+        elif acquisition == 'UCB':
+            score = upper_confidence_bound(pred, std, kappa, maximize)
+        else: # EI and qEI
+            score = EI
+        return score, EI
+
+    number_of_elements = int(session_settings.get('numberOfElements', 1000))
+    if sampling == 'grid':
+        elements = max(2, int(np.floor(number_of_elements ** (1 / len(feature_columns)))))
+        axes = [np.linspace(float(c['min']), float(c['max']), elements) for c in feature_columns]
+        chunks = iter_grid_chunks(axes, CHUNK_SIZE) if len(axes) > 1 else (axes[0][:, None],)
+    else:
+        mins = [float(c['min']) for c in feature_columns]
+        maxs = [float(c['max']) for c in feature_columns]
+        chunks = iter_sample_chunks(sampling, mins, maxs, number_of_elements, CHUNK_SIZE)
+
+    keep = max(int(count), 200) if acquisition == 'qEI' else int(count)
+    candidates, pred, std, score, EI = predict_candidates(gp, chunks, get_acquisition, keep)
+
+    result = {'columns': [c['column'] for c in feature_columns]}
+    if acquisition == 'qEI':
+        index, value = q_expected_improvement(gp, candidates, EI, best, int(count), Xi, maximize)
+        result['qEI'] = value
+    else:
+        index = np.arange(min(int(count), len(candidates)))
+
+    result.update({
+        'candidates': candidates[index],
+        'prediction': pred[index],
+        'std': std[index],
+        'score': score[index],
+    })
+    return result
+#-------------------------------------------------------------------------------------------------
@@ -0,0 +1,317 @@
+# =================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) rest api utils for the 'Analysis' page providing a result cache
+#              for the serverside components
+# ------------------------------------------------------------------------------------------------
+# Notes:  This is one of the REST API parts of the 'analysis' interface of the website that keeps
+#         the replies of already computed components (keyed on view type, settings and data) so
+#         that re-opening a workspace does not fit the same models again.
+# ------------------------------------------------------------------------------------------------
+# References: Django settings and cache, hashlib, json, pickle, threading, logging libs and
+#             'datamanagement' folder's 'dataframes'
+# =================================================================================================
+
+# -------------------------------------------------------------------------------------------------
+# Import required Libraries
+# -------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+
+from datamanagement.dataframes import get_frame_key
+from .dataset import get_datasource
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------------------------------------
+
+DEFAULT_RESULT_CACHE = {
+    "BACKEND": "locmem",
+    "MAX_ENTRIES": 128,
+    "MAX_BYTES": 256 * 1024 * 1024,
+    "LOCATION": None,
+    "CACHE_ALIAS": "default",
+    "TIMEOUT": None,
+}
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+def get_fingerprint(value):
+    """Stable hash of a JSON-like value (dict key order does not matter)."""
+    text = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+def get_data_fingerprint(data):
+    """Fingerprint of the data a component is run on.
+
+    A data source reference is identified by the referenced file version and the selection
+    instead of its contents, so it does not need to be loaded to be looked up.
+    """
+    if "dataSource" in data and data["dataSource"] is not None:
+        datasource = get_datasource(data["dataSource"])
+        return get_fingerprint([get_frame_key(datasource), data["dataSource"]])
+
+    return get_fingerprint(data.get("data"))
+
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+class LocMemResultBackend:
+    """In-process LRU store of pickled results, bounded by number of entries and bytes."""
+
+    name = "locmem"
+
+    def __init__(self, options):
+        self.max_entries = options["MAX_ENTRIES"]
+        self.max_bytes = options["MAX_BYTES"]
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is None:
+                return None
+            self._entries.move_to_end(key)
+        return pickle.loads(blob)
+
+    def set(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.max_bytes and len(blob) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = blob
+            self._bytes += len(blob)
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes and self._bytes > self.max_bytes
+            ):
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+class FileSystemResultBackend:
+    """Directory of pickled results shared by all workers of one host. The file modification
+    time is refreshed on every hit, and the least recently used files are removed first.
+    """
+
+    name = "filesystem"
+
+    def __init__(self, options):
+        self.max_entries = options["MAX_ENTRIES"]
+        self.max_bytes = options["MAX_BYTES"]
+        self.location = options["LOCATION"] or os.path.join(
+            tempfile.gettempdir(), "cads_analysis_cache"
+        )
+        os.makedirs(self.location, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.location, key + ".pkl")
+
+    def _files(self):
+        files = []
+        for entry in os.scandir(self.location):
+            if entry.name.endswith(".pkl"):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+        return files
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        return value
+
+    def set(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.location, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except Exception:
+            os.remove(tmp)
+            raise
+        self._evict()
+
+    def _evict(self):
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        while files and (
+            len(files) > self.max_entries or (self.max_bytes and total > self.max_bytes)
+        ):
+            _, size, path = files.pop(0)
+            total -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for _, _, path in self._files():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def info(self):
+        files = self._files()
+        return {"entries": len(files), "bytes": sum(size for _, size, _ in files)}
+
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+class DjangoCacheResultBackend:
+    """Store results in one of the configured Django caches (eviction is done by that cache).
+    The cache may be shared with other apps, so clearing only bumps a key generation.
+    """
+
+    name = "django"
+    generation_key = "analysis-result:generation"
+
+    def __init__(self, options):
+        from django.core.cache import caches
+
+        self.cache = caches[options["CACHE_ALIAS"]]
+        self.timeout = options["TIMEOUT"]
+
+    def _key(self, key):
+        generation = self.cache.get_or_set(self.generation_key, 0, timeout=None)
+        return "analysis-result:" + str(generation) + ":" + key
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, value):
+        self.cache.set(self._key(key), value, timeout=self.timeout)
+
+    def clear(self):
+        self.cache.get_or_set(self.generation_key, 0, timeout=None)
+        self.cache.incr(self.generation_key)
+
+    def info(self):
+        return {}
+
+
+# -------------------------------------------------------------------------------------------------
+
+result_backends = {
+    "locmem": LocMemResultBackend,
+    "filesystem": FileSystemResultBackend,
+    "django": DjangoCacheResultBackend,
+}
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+class ResultCache:
+    """Content-addressed cache of component results with hit/miss counters."""
+
+    def __init__(self, options=None):
+        options = dict(DEFAULT_RESULT_CACHE, **(options or {}))
+        backend = options["BACKEND"]
+        self.backend = result_backends[backend](options) if backend else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def get_key(self, data):
+        return get_fingerprint(
+            {
+                "type": data["view"]["type"],
+                "settings": data["view"].get("settings"),
+                "data": get_data_fingerprint(data),
+            }
+        )
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        try:
+            self.backend.set(key, value)
+        except (pickle.PicklingError, TypeError, OSError) as e:
+            logger.warning("The analysis result could not be cached: " + str(e))
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        stats = {
+            "backend": self.backend.name if self.enabled else None,
+            "hits": hits,
+            "misses": misses,
+            "hitRate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+        if self.enabled:
+            stats.update(self.backend.info())
+        return stats
+
+
+# -------------------------------------------------------------------------------------------------
+
+result_cache = ResultCache(getattr(settings, "ANALYSIS_RESULT_CACHE", None))
+
+# -------------------------------------------------------------------------------------------------
@@ -12,7 +12,7 @@
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
 #         allows serverside work for the 'classification' component.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy, pandas and sklearn libs
+# References: logging, numpy, pandas and sklearn libs and the 'execution' utils
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
@@ -30,6 +30,8 @@ from sklearn.linear_model import RidgeClassifier
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.neural_network import MLPClassifier
 
+from .execution import get_n_jobs, reset_n_jobs
+
 logger = logging.getLogger(__name__)
 
 #-------------------------------------------------------------------------------------------------
@@ -52,17 +54,20 @@ def get_classification(data):
     y = df_target.values
 
     model = None
+    n_jobs = get_n_jobs(data['view']['settings'])
 
     if method == 'RandomForest':
-        model = RandomForestClassifier(random_state=int(method_args['arg1']), n_estimators=int(method_args['arg2']))
+        model = RandomForestClassifier(random_state=int(method_args['arg1']),
+                                       n_estimators=int(method_args['arg2']), n_jobs=n_jobs)
     elif method == 'SVC':
         model = SVC(C=float(method_args['arg1']), gamma=float(method_args['arg2']))
     elif method == 'ExtraTrees':
-        model = ExtraTreesClassifier(random_state=int(method_args['arg1']), n_estimators=int(method_args['arg2']))
+        model = ExtraTreesClassifier(random_state=int(method_args['arg1']),
+                                     n_estimators=int(method_args['arg2']), n_jobs=n_jobs)
     elif method == 'GradientBoosting':
         model = GradientBoostingClassifier()
     elif method == 'KNeighbors':
-        model = KNeighborsClassifier(n_neighbors=3)
+        model = KNeighborsClassifier(n_neighbors=3, n_jobs=n_jobs)
     elif method == 'SGD':
         model = SGDClassifier()
     elif method == 'MLP':
@@ -70,8 +75,10 @@ def get_classification(data):
     else: #  Ridge
         model = RidgeClassifier(alpha=float(method_args['arg1']))
 
+    # forests build their trees with threads (their own n_jobs)
     model.fit(X, y)
     y_predict = model.predict(X)
+    reset_n_jobs(model)
     p_name = target_column + '--predicted'
 
     data = {}
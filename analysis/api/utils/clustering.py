@@ -10,62 +10,188 @@
 #              'clustering' components
 # ------------------------------------------------------------------------------------------------
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
-#         allows serverside work for the 'clustering' component.
+#         allows serverside work for the 'clustering' component. Above
+#         ANALYSIS_CLUSTERING_LARGE_ROWS rows KMeans becomes MiniBatchKMeans and the Gaussian
+#         mixture is fitted on a random sample and then assigns all rows. Only the labels are
+#         returned (as int8/int16), the client already has the rows. The 'sweep' mode fits
+#         every cluster count of a range in parallel and reports inertia, BIC (Gaussian
+#         mixture) and a sampled silhouette score for each.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy, pandas and sklearn libs
+# References: Django settings, logging, numpy, pandas, joblib and sklearn libs and the
+#             'execution' utils
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
 import logging
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
 from sklearn.mixture import GaussianMixture
 
+from .execution import get_n_jobs, parallel_execution
+
 logger = logging.getLogger(__name__)
 #-------------------------------------------------------------------------------------------------
 
+# Rows above which the mini-batch / sampled strategies are used
+LARGE_ROWS = getattr(settings, 'ANALYSIS_CLUSTERING_LARGE_ROWS', 50000)
+
+# Rows the Gaussian mixture is fitted on for large data
+SAMPLE_SIZE = getattr(settings, 'ANALYSIS_CLUSTERING_SAMPLE_SIZE', 20000)
+
+# Rows the silhouette scores of a sweep are computed on (the same rows for every k)
+SILHOUETTE_SAMPLE_SIZE = getattr(settings, 'ANALYSIS_CLUSTERING_SILHOUETTE_SAMPLE_SIZE', 5000)
+
+MAX_CLUSTERS = 10
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_label_array(labels, n_clusters):
+    """Labels in the smallest signed integer type that holds them."""
+    dtype = 'int8' if n_clusters <= np.iinfo('int8').max else 'int16'
+    return np.asarray(labels).astype(dtype)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def fit_clusters(X, method, n_clusters, random_state=0, n_init=None):
+    """Cluster the rows of X with KMeans or a Gaussian mixture, switching to the large data
+    strategies above LARGE_ROWS rows.
+
+    Returns:
+        fitted estimator, labels (int8/int16), name of the engine that was used
+    """
+    large = len(X) > LARGE_ROWS
+
+    if method == 'KMeans':
+        if large:
+            clf = MiniBatchKMeans(n_clusters=n_clusters, n_init=n_init or 3, batch_size=4096,
+                                  random_state=random_state)
+        else:
+            clf = KMeans(n_clusters=n_clusters, n_init=n_init or 10, random_state=random_state)
+        labels = clf.fit_predict(X)
+        return clf, get_label_array(labels, n_clusters), type(clf).__name__
+
+    clf = GaussianMixture(n_components=n_clusters, n_init=n_init or 1, random_state=random_state)
+    if large and len(X) > SAMPLE_SIZE:
+        rng = np.random.default_rng(random_state)
+        clf.fit(X[rng.choice(len(X), SAMPLE_SIZE, replace=False)])
+        return clf, get_label_array(clf.predict(X), n_clusters), 'GaussianMixture (sampled)'
+
+    clf.fit(X)
+    return clf, get_label_array(clf.predict(X), n_clusters), 'GaussianMixture'
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def fit_predict_clusters(X, method, n_clusters, random_state=0, n_init=None):
+    """Same as fit_clusters, without the estimator."""
+    _, labels, engine = fit_clusters(X, method, n_clusters, random_state, n_init)
+    return labels, engine
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_inertia(X, labels, n_clusters):
+    """Sum of squared distances of the rows to the mean of their cluster."""
+    counts = np.bincount(labels, minlength=n_clusters).astype('float64')
+    centers = np.zeros((n_clusters, X.shape[1]))
+    np.add.at(centers, labels, X)
+    centers /= np.maximum(counts, 1)[:, None]
+    return float(np.square(X - centers[labels]).sum())
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def fit_sweep_step(X, method, n_clusters, random_state, n_init, sample):
+    """Fit one cluster count of a sweep and score it."""
+    clf, labels, engine = fit_clusters(X, method, n_clusters, random_state, n_init)
+
+    silhouette = None
+    if len(np.unique(labels[sample])) > 1:
+        silhouette = float(silhouette_score(X[sample], labels[sample]))
+
+    return {
+        'k': n_clusters,
+        'inertia': get_inertia(X, labels, n_clusters),
+        'bic': float(clf.bic(X)) if isinstance(clf, GaussianMixture) else None,
+        'silhouette': silhouette,
+        'labels': labels,
+        'engine': engine,
+    }
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def sweep_clusters(X, method, k_values, random_state=0, n_init=None, n_jobs=1):
+    """Fit every cluster count in k_values in parallel (one fit per worker).
+
+    Returns:
+        one dict (k, inertia, bic, silhouette, labels, engine) per cluster count
+    """
+    rng = np.random.default_rng(random_state)
+    sample = np.sort(rng.choice(len(X), min(len(X), SILHOUETTE_SAMPLE_SIZE), replace=False))
+
+    with parallel_execution(n_jobs):
+        return Parallel()(
+            delayed(fit_sweep_step)(X, method, k, random_state, n_init, sample) for k in k_values
+        )
+#-------------------------------------------------------------------------------------------------
+
 
 #-------------------------------------------------------------------------------------------------
 def get_clusters(data):
-    vis_type = data['view']['settings']['visType']
+    view_settings = data['view']['settings']
+    vis_type = view_settings['visType']
 
     result = {}
     result['vis_type'] = vis_type
 
-    feature_columns = data['view']['settings']['featureColumns']
-    num_of_clusters = int(data['view']['settings']['numberOfClusters'])
-    if num_of_clusters > 10:
-        num_of_clusters = 10
+    feature_columns = view_settings['featureColumns']
+    num_of_clusters = min(int(view_settings['numberOfClusters']), MAX_CLUSTERS)
+    random_state = view_settings.get('randomState', 0)
+    random_state = None if random_state in (None, '') else int(random_state)
+    n_init = int(view_settings['nInit']) if view_settings.get('nInit') else None
 
     dataset = data['data']
-    df = pd.DataFrame(dataset)
-    df_target = df[feature_columns]
-    X = df_target.values
+    df = dataset if isinstance(dataset, pd.DataFrame) else pd.DataFrame(dataset)
+    X = df[feature_columns].to_numpy(dtype='float64')
 
-    if(vis_type == "Bar Chart"):
-        method = data['view']['settings']['method']
+    # the scatter plot has always been KMeans
+    method = view_settings['method'] if vis_type == "Bar Chart" else 'KMeans'
 
-        cif = None
-        if (method == 'KMeans'):
-            clf = KMeans(n_clusters=num_of_clusters)
-        else:
-            clf = GaussianMixture(n_components=num_of_clusters)
+    if view_settings.get('sweep', False):
+        k_min = max(2, int(view_settings.get('minClusters', 2)))
+        k_max = min(int(view_settings.get('maxClusters', MAX_CLUSTERS)), MAX_CLUSTERS, len(X) - 1)
+        steps = sweep_clusters(X, method, range(k_min, k_max + 1), random_state, n_init,
+                               get_n_jobs(view_settings))
+        if not steps:
+            return {'status': 'error: the cluster count range is empty'}
 
-        clf.fit(X)
-        y = clf.predict(X)
+        # the shown clustering is the one with the best silhouette score
+        scored = [s for s in steps if s['silhouette'] is not None]
+        best = max(scored, key=lambda s: s['silhouette']) if scored else steps[0]
 
-        result['cluster'] = y
-    else:
-        kmean = KMeans(n_clusters=num_of_clusters)
-        kmean.fit(X)
-        y = kmean.predict(X)
+        result['sweep'] = [{name: v for name, v in s.items() if name != 'labels'} for s in steps]
+        result['labels'] = [s['labels'] for s in steps]
+        result['bestK'] = best['k']
+        result['cluster'] = best['labels']
+        result['engine'] = best['engine']
+        return result
 
-        result['cluster'] = y
-        result['data'] = data['data']
+    y, engine = fit_predict_clusters(X, method, num_of_clusters, random_state, n_init)
 
+    result['cluster'] = y
+    result['engine'] = engine
 
     return result
 #-------------------------------------------------------------------------------------------------
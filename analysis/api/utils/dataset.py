@@ -0,0 +1,90 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) rest api utils for the 'Analysis' page involving
+#              data source references
+# ------------------------------------------------------------------------------------------------
+# Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
+#         lets a component refer to a stored data source instead of posting all of its rows.
+# ------------------------------------------------------------------------------------------------
+# References: logging, numpy, pandas libs and 'datamanagement' folder's 'models' and 'dataframes'
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+import logging
+import numpy as np
+import pandas as pd
+
+from datamanagement.models import DataSource
+from datamanagement.dataframes import get_dataframe
+
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------------------------
+
+# Row filter operators that can be used in a data source reference
+filter_operators = {
+    "==": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "in": lambda s, v: s.isin(v),
+    "notnull": lambda s, v: s.notna(),
+}
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_datasource(reference):
+    """Look up the data source of a reference like
+    {"id": ..., "columns": [...], "rows": [...], "filter": [{"column", "op", "value"}]}.
+    """
+    if not isinstance(reference, dict) or "id" not in reference:
+        raise ValueError("The data source reference requires an 'id'.")
+
+    return DataSource.objects.get(id=reference["id"])
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def load_dataset(reference, datasource=None):
+    """Resolve a data source reference into a DataFrame, applying the optional row selection,
+    row filter and column projection (in that order).
+    """
+    if datasource is None:
+        datasource = get_datasource(reference)
+
+    df = get_dataframe(datasource)
+    if df is None:
+        raise ValueError("The file type of the data source is not supported.")
+
+    rows = reference.get("rows")
+    if rows is not None:
+        df = df.take(np.asarray(rows, dtype="int64"))
+
+    for f in reference.get("filter") or []:
+        op = f.get("op", "==")
+        if op not in filter_operators:
+            raise ValueError("Unknown filter operator: " + str(op))
+        if f["column"] not in df.columns:
+            raise ValueError("Unknown filter column: " + str(f["column"]))
+        df = df[filter_operators[op](df[f["column"]], f.get("value"))]
+
+    columns = reference.get("columns")
+    if columns:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise ValueError("Unknown columns: " + ", ".join(map(str, missing)))
+        df = df[columns]
+
+    return df.reset_index(drop=True)
+#-------------------------------------------------------------------------------------------------
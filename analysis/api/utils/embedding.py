@@ -0,0 +1,225 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) rest api utils for the 'Analysis' page providing the nonlinear
+#              3D embeddings (t-SNE and UMAP) of the 'scatter3D' component
+# ------------------------------------------------------------------------------------------------
+# Notes:  This is one of the REST API parts of the 'analysis' interface of the website. Both
+#         methods start from the k nearest neighbor graph of the rows, which is the expensive
+#         part; it is built once per data and features (with enough neighbors for the usual
+#         perplexities) and reused when only perplexity, n_neighbors or min_dist change.
+#         UMAP uses umap-learn when it is installed, otherwise a spectral embedding of the same
+#         fuzzy neighbor graph (min_dist then has no effect).
+# ------------------------------------------------------------------------------------------------
+# References: Django settings, collections, logging, threading, numpy, scipy and sklearn libs,
+#             umap-learn (optional) and the 'execution' utils
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+from collections import OrderedDict
+import logging
+import threading
+import numpy as np
+from scipy import sparse
+from sklearn.manifold import SpectralEmbedding
+from sklearn.manifold import TSNE
+from sklearn.neighbors import NearestNeighbors
+from sklearn.neighbors import sort_graph_by_row_values
+
+try:
+    import umap
+except ImportError:
+    umap = None
+
+from .execution import report_progress
+
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------------------------
+
+# Neighbors of a cached graph (t-SNE needs 3 * perplexity + 2, 92 covers perplexity 30)
+GRAPH_NEIGHBORS = getattr(settings, 'ANALYSIS_EMBEDDING_GRAPH_NEIGHBORS', 92)
+
+# Neighbor graphs and embeddings remembered per process
+GRAPH_CACHE_SIZE = getattr(settings, 'ANALYSIS_EMBEDDING_CACHE_SIZE', 4)
+
+embedding_methods = ['t-SNE', 'UMAP']
+
+_graphs = OrderedDict()
+_embeddings = OrderedDict()
+_cache_lock = threading.Lock()
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def _cache_get(cache, key):
+    with _cache_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    return None
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def _cache_set(cache, key, value):
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > GRAPH_CACHE_SIZE:
+            cache.popitem(last=False)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_neighbors(data_key, X, k):
+    """Distances and indices (rows sorted by distance, the row itself excluded) of at least the
+    k nearest neighbors of every row of X, from the cache if a large enough graph was built.
+    """
+    k = min(int(k), len(X) - 1)
+    cached = _cache_get(_graphs, data_key)
+    if cached is not None and cached[1].shape[1] >= k:
+        return cached
+
+    report_progress('neighbors')
+    n_neighbors = min(max(k, GRAPH_NEIGHBORS), len(X) - 1)
+    nn = NearestNeighbors(n_neighbors=n_neighbors).fit(X)
+    distances, indices = nn.kneighbors()
+    graph = (distances.astype('float32'), indices.astype('int32'))
+
+    _cache_set(_graphs, data_key, graph)
+    return graph
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_distance_graph(distances, indices, k, squared=False):
+    """Sparse (CSR) matrix of the distances to the k nearest neighbors of every row, with
+    every row sorted by distance (as the precomputed neighbors of sklearn expect).
+    """
+    n = len(indices)
+    d = distances[:, :k].astype('float64')
+    if squared:
+        d = np.square(d)
+    rows = np.repeat(np.arange(n), k)
+    graph = sparse.csr_matrix((d.ravel(), (rows, indices[:, :k].ravel())), shape=(n, n))
+    return sort_graph_by_row_values(graph, copy=False, warn_when_not_sorted=False)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_fuzzy_graph(distances, indices, k):
+    """UMAP's symmetric fuzzy membership graph: exp(-(d - rho) / sigma) per row, with rho the
+    distance to the nearest neighbor and sigma chosen so that the weights sum to log2(k),
+    combined as A + A^T - A * A^T.
+    """
+    d = distances[:, :k].astype('float64')
+    rho = d[:, :1]
+    excess = np.maximum(d - rho, 0.0)
+    target = np.log2(k)
+
+    # binary search of sigma for all rows at once
+    low = np.zeros((len(d), 1))
+    high = np.full((len(d), 1), np.inf)
+    sigma = np.ones((len(d), 1))
+    for _ in range(64):
+        total = np.exp(-excess / np.maximum(sigma, 1e-12)).sum(axis=1, keepdims=True)
+        too_large = total > target
+        high = np.where(too_large, sigma, high)
+        low = np.where(too_large, low, sigma)
+        sigma = np.where(np.isinf(high), sigma * 2, (low + high) / 2)
+
+    weights = np.exp(-excess / np.maximum(sigma, 1e-12))
+    n = len(indices)
+    rows = np.repeat(np.arange(n), k)
+    A = sparse.csr_matrix((weights.ravel(), (rows, indices[:, :k].ravel())), shape=(n, n))
+    return A + A.T - A.multiply(A.T)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_tsne(data_key, X, perplexity=30.0, random_state=0):
+    """Barnes-Hut t-SNE on the precomputed neighbor graph (squared euclidean distances, like
+    the default metric of TSNE). TSNE asks for 3 * perplexity + 1 neighbors of every row and
+    queries the graph for one more (the row itself, which the graph leaves out).
+    """
+    perplexity = min(float(perplexity), (len(X) - 3) / 3.0)
+    k = int(3.0 * perplexity + 1) + 1
+    distances, indices = get_neighbors(data_key, X, k)
+
+    report_progress('embedding')
+    tsne = TSNE(n_components=3, perplexity=perplexity, metric='precomputed', method='barnes_hut',
+                init='random', learning_rate='auto', random_state=random_state)
+    return tsne.fit_transform(get_distance_graph(distances, indices, k, squared=True))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_umap(data_key, X, n_neighbors=15, min_dist=0.1, random_state=0):
+    """UMAP (umap-learn) on the precomputed neighbor graph, or a spectral embedding of the
+    fuzzy neighbor graph when umap-learn is not installed.
+    """
+    k = min(int(n_neighbors), len(X) - 1)
+    distances, indices = get_neighbors(data_key, X, k)
+
+    report_progress('embedding')
+    if umap is not None:
+        # umap-learn counts the row itself as its first neighbor
+        n = len(X)
+        knn_indices = np.hstack([np.arange(n)[:, None], indices[:, :k - 1]])
+        knn_dists = np.hstack([np.zeros((n, 1), dtype='float32'), distances[:, :k - 1]])
+        reducer = umap.UMAP(n_components=3, n_neighbors=k, min_dist=float(min_dist),
+                            random_state=random_state,
+                            precomputed_knn=(knn_indices, knn_dists, None))
+        return reducer.fit_transform(X)
+
+    embedding = SpectralEmbedding(n_components=3, affinity='precomputed', random_state=random_state)
+    return embedding.fit_transform(get_fuzzy_graph(distances, indices, k))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_embedding_engine(method):
+    """Name of the implementation computing the embedding of the method: 'sklearn' for t-SNE,
+    'umap-learn' or (when it is not installed) 'spectral' for UMAP.
+    """
+    if method == 't-SNE':
+        return 'sklearn'
+    return 'spectral' if umap is None else 'umap-learn'
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_embedding(data_key, X, method, view_settings):
+    """3D embedding of the rows of X as three float32 arrays. data_key identifies X (the
+    preprocessed features of the rows), so graphs and embeddings can be reused.
+    """
+    random_state = int(view_settings.get('randomState', 0))
+    if method == 't-SNE':
+        params = (float(view_settings.get('perplexity', 30.0)),)
+    else:
+        params = (int(view_settings.get('nNeighbors', 15)),
+                  float(view_settings.get('minDist', 0.1)))
+
+    key = (data_key, method, params, random_state)
+    coords = _cache_get(_embeddings, key)
+    if coords is None:
+        if method == 't-SNE':
+            Y = get_tsne(data_key, X, *params, random_state=random_state)
+        else:
+            Y = get_umap(data_key, X, *params, random_state=random_state)
+        coords = [np.ascontiguousarray(c, dtype='float32') for c in Y.T]
+        _cache_set(_embeddings, key, coords)
+
+    report_progress('done')
+    return coords
+#-------------------------------------------------------------------------------------------------
@@ -0,0 +1,125 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) rest api utils for the 'Analysis' page providing the parallel
+#              execution settings of the serverside components
+# ------------------------------------------------------------------------------------------------
+# Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
+#         decides how many cores a component may use (requested with the 'nJobs' view setting,
+#         capped by the server) and which joblib backend runs the work. Long running
+#         components can also report their progress to the job that runs them.
+# ------------------------------------------------------------------------------------------------
+# References: Django settings, contextlib, os, logging, threading and joblib libs
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+from contextlib import contextmanager
+import logging
+import os
+import threading
+
+from joblib import parallel_backend
+
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------------------------
+
+# joblib backend of the parallel work ("loky", "threading" or "multiprocessing")
+PARALLEL_BACKEND = getattr(settings, 'ANALYSIS_PARALLEL_BACKEND', 'loky')
+
+# Upper bound of the cores one request may use (None: all cores of the machine)
+MAX_N_JOBS = getattr(settings, 'ANALYSIS_MAX_N_JOBS', 4)
+
+_progress = threading.local()
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_n_jobs(view_settings):
+    """Number of workers for a component, from its optional 'nJobs' setting (-1 or missing:
+    as many as allowed), capped by ANALYSIS_MAX_N_JOBS and the number of cores.
+    """
+    limit = os.cpu_count() or 1
+    if MAX_N_JOBS:
+        limit = min(limit, MAX_N_JOBS)
+
+    try:
+        requested = int(view_settings.get('nJobs', -1))
+    except (TypeError, ValueError):
+        requested = -1
+
+    if requested <= 0:
+        return limit
+    return min(requested, limit)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def split_n_jobs(n_jobs, n_tasks):
+    """Share n_jobs workers between n_tasks parallel tasks (e.g. CV folds) and the work inside
+    each of them (e.g. tree building), so the nested parallelism does not oversubscribe the cores.
+
+    Returns:
+        outer n_jobs, inner n_jobs
+    """
+    outer = max(1, min(n_jobs, n_tasks))
+    return outer, max(1, n_jobs // outer)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def parallel_execution(n_jobs):
+    """Context in which the joblib calls of scikit-learn run on the configured backend. Meant
+    for independent tasks (CV folds, permutations); a forest fitted in it would build its trees
+    in processes instead of the threads it prefers, so forests are fitted outside of it.
+    """
+    return parallel_backend(PARALLEL_BACKEND, n_jobs=n_jobs)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def reset_n_jobs(model):
+    """Drop the request specific n_jobs of a fitted model, so that it is not carried into the
+    predictions made with it later (e.g. after it is saved as pretrained model).
+    """
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=None)
+    return model
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+@contextmanager
+def progress_reporter(callback):
+    """Context in which report_progress calls (of the current thread) are passed to callback,
+    e.g. to update the state of the celery job that processes the component.
+    """
+    previous = getattr(_progress, 'callback', None)
+    _progress.callback = callback
+    try:
+        yield
+    finally:
+        _progress.callback = previous
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def report_progress(stage, done=None, total=None):
+    """Report how far a long running component is, if anybody listens (see progress_reporter)."""
+    callback = getattr(_progress, 'callback', None)
+    if callback is None:
+        return
+    try:
+        callback({'stage': stage, 'done': done, 'total': total})
+    except Exception as e:
+        logger.warning('Could not report the progress: ' + str(e))
+#-------------------------------------------------------------------------------------------------
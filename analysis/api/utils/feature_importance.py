@@ -10,66 +10,251 @@
 #              'feature importance' components
 # ------------------------------------------------------------------------------------------------
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
-#         allows serverside work for the 'feature importance' component.
+#         allows serverside work for the 'feature importance' component. Next to the impurity
+#         importance of the random forest it offers permutation importance (every feature and
+#         repeat is an independent parallel task) and tree path contributions (SHAP values with
+#         the shap package, otherwise Saabas contributions computed from the decision paths).
+#         Results are cached per data, features, target and method.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy, pandas and sklearn libs
+# References: Django settings, collections, hashlib, logging, threading, numpy, pandas, joblib
+#             and sklearn libs, shap (optional) and the 'execution' utils
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+from collections import OrderedDict
+import hashlib
 import logging
+import threading
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from scipy import sparse
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
+from sklearn.utils.multiclass import type_of_target
+
+try:
+    import shap
+except ImportError:
+    shap = None
+
+from .execution import get_n_jobs, parallel_execution
 
 logger = logging.getLogger(__name__)
 
 #-------------------------------------------------------------------------------------------------
 
+# Computed importances remembered per process
+IMPORTANCE_CACHE_SIZE = getattr(settings, 'ANALYSIS_IMPORTANCE_CACHE_SIZE', 64)
+
+importance_methods = ['impurity', 'permutation', 'shap']
+
+_importances = OrderedDict()
+_importances_lock = threading.Lock()
 
 #-------------------------------------------------------------------------------------------------
-def get_feature_importance(data):
-    train_columns = data['view']['settings']['featureColumns']
-    target_columns = data['view']['settings']['targetColumn']
 
-    dataset = data['data']
-    df = pd.DataFrame(dataset)
 
-    # logger.info(df)
+#-------------------------------------------------------------------------------------------------
+def get_data_hash(df):
+    hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(hashed.tobytes()).hexdigest()
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def fit_forest(X_train, y_train, n_trees, n_jobs):
+    """Random forest classifier for class labels, regressor otherwise."""
+    if type_of_target(y_train) in ('binary', 'multiclass'):
+        model = RandomForestClassifier(n_estimators=n_trees, random_state=0, n_jobs=n_jobs)
+    else:
+        model = RandomForestRegressor(n_estimators=n_trees, random_state=0, n_jobs=n_jobs)
+    model.fit(X_train, y_train)
+    return model
+#-------------------------------------------------------------------------------------------------
+
 
-    df_train = df[train_columns]
-    X = df_train.values
+#-------------------------------------------------------------------------------------------------
+def score_permutations(model, X, y, tasks):
+    """Scores of the model with one feature column shuffled, for every (feature, seed) task."""
+    X_permuted = X.copy()
+    scores = []
+    for feature, seed in tasks:
+        X_permuted[:, feature] = np.random.default_rng(seed).permutation(X[:, feature])
+        scores.append(model.score(X_permuted, y))
+        X_permuted[:, feature] = X[:, feature]
+    return scores
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_permutation_importance(model, X, y, n_repeats=5, n_jobs=1):
+    """Mean and standard deviation of the score drop when a feature is shuffled. The (feature,
+    repeat) pairs are independent and shared evenly between the workers, so the model is only
+    sent once to every worker.
+    """
+    n_features = X.shape[1]
+    baseline = model.score(X, y)
+    tasks = [(j, r * n_features + j) for j in range(n_features) for r in range(n_repeats)]
+    batches = [b for b in np.array_split(np.arange(len(tasks)), max(1, n_jobs)) if len(b)]
+
+    with parallel_execution(n_jobs):
+        scores = Parallel()(
+            delayed(score_permutations)(model, X, y, [tasks[i] for i in b]) for b in batches
+        )
+
+    drops = baseline - np.concatenate(scores).reshape(n_features, n_repeats)
+    return drops.mean(axis=1), drops.std(axis=1)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_tree_contributions(tree, X, n_features):
+    """Saabas contributions of one fitted decision tree: every split on the path of a sample
+    adds the change of the node value (class probabilities for classifiers) to the feature it
+    splits on.
 
-    df_target = df[target_columns]
-    y = np.ravel(np.array(df_target))
+    Returns:
+        samples x features x outputs (classes)
+    """
+    t = tree.tree_
+    value = t.value[:, 0, :]
+    if hasattr(tree, 'classes_'):
+        value = value / value.sum(axis=1, keepdims=True)
+
+    parent = np.full(t.node_count, -1)
+    for side in (t.children_left, t.children_right):
+        nodes = np.flatnonzero(side >= 0)
+        parent[side[nodes]] = nodes
+    child = np.flatnonzero(parent >= 0)
+
+    # edge matrix: the row of a node holds the value change from its parent, in the column of
+    # the feature its parent splits on
+    delta = value[child] - value[parent[child]]
+    path = tree.decision_path(X)
+    contributions = np.empty((X.shape[0], n_features, value.shape[1]))
+    for k in range(value.shape[1]):
+        E = sparse.csr_matrix((delta[:, k], (child, t.feature[parent[child]])),
+                              shape=(t.node_count, n_features))
+        contributions[:, :, k] = (path @ E).toarray()
+    return contributions
+#-------------------------------------------------------------------------------------------------
 
+
+#-------------------------------------------------------------------------------------------------
+def sum_tree_contributions(trees, X, n_features):
+    """Saabas contributions summed over a batch of trees (samples x features x outputs), so a
+    worker only holds one such array however many trees it handles.
+    """
+    total = get_tree_contributions(trees[0], X, n_features)
+    for tree in trees[1:]:
+        total += get_tree_contributions(tree, X, n_features)
+    return total
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_contribution_engine():
+    """'shap' if the shap package is installed, else 'saabas'."""
+    return 'saabas' if shap is None else 'shap'
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_contribution_importance(model, X, n_jobs=1):
+    """Mean absolute contribution of every feature (averaged over the outputs/classes): SHAP
+    values of the shap TreeExplainer if shap is installed, else Saabas contributions of the
+    forest, the trees being shared evenly between the workers.
+    """
+    n_features = X.shape[1]
+
+    if shap is not None:
+        values = shap.TreeExplainer(model).shap_values(X)
+        values = np.stack(values, axis=-1) if isinstance(values, list) else np.asarray(values)
+        if values.ndim == 2:
+            values = values[:, :, None]
+    else:
+        trees = model.estimators_
+        batches = [b for b in np.array_split(np.arange(len(trees)), max(1, n_jobs)) if len(b)]
+        with parallel_execution(n_jobs):
+            sums = Parallel()(
+                delayed(sum_tree_contributions)([trees[i] for i in b], X, n_features)
+                for b in batches
+            )
+        # the forest contribution is the mean over the trees, the absolute value is taken after
+        values = np.sum(sums, axis=0) / len(trees)
+
+    return np.abs(values).mean(axis=(0, 2))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def compute_feature_importance(X, y, method, n_trees, n_repeats, n_jobs):
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=0)
 
-    model = None
-    try:
-        model = RandomForestClassifier(n_estimators=10, random_state=0)
-        model.fit(X_train, y_train)
-    except ValueError:
-        model = RandomForestRegressor(n_estimators=10, random_state=0)
-        model.fit(X_train, y_train)
+    if method == 'impurity':
+        model = fit_forest(X_train, y_train, n_trees, n_jobs)
+        return {'importance': model.feature_importances_}
 
-    fti = model.feature_importances_
+    # the forest is fitted with all workers, the evaluation then runs one task per worker
+    model = fit_forest(X_train, y_train, n_trees, n_jobs)
+    model.set_params(n_jobs=1)
 
-    result = {}
-    features = []
-    importance = []
+    if method == 'permutation':
+        mean, std = get_permutation_importance(model, X_test, y_test, n_repeats, n_jobs)
+        return {'importance': mean, 'std': std}
 
-    for i, feat in enumerate(train_columns):
-        features.append(feat)
-        importance.append(fti[i])
+    return {'importance': get_contribution_importance(model, X_test, n_jobs),
+            'engine': get_contribution_engine()}
+#-------------------------------------------------------------------------------------------------
 
-    result['features'] = features
-    result['importance'] = importance
 
-    # logger.info(result)
+#-------------------------------------------------------------------------------------------------
+def get_feature_importance(data):
+    view_settings = data['view']['settings']
+    train_columns = view_settings['featureColumns']
+    target_columns = view_settings['targetColumn']
+    method = view_settings.get('importanceMethod', 'impurity')
+    if method not in importance_methods:
+        return {'status': 'error: unknown importance method ' + str(method)}
+    n_trees = int(view_settings.get('numberOfTrees', 10))
+    n_repeats = int(view_settings.get('numberOfRepeats', 5))
+
+    dataset = data['data']
+    df = dataset if isinstance(dataset, pd.DataFrame) else pd.DataFrame(dataset)
+
+    target = target_columns if isinstance(target_columns, list) else [target_columns]
+    key = (get_data_hash(df[train_columns + target]), tuple(train_columns), tuple(target), method,
+           n_trees, n_repeats if method == 'permutation' else None)
+
+    with _importances_lock:
+        cached = _importances.get(key)
+        if cached is not None:
+            _importances.move_to_end(key)
+
+    if cached is None:
+        X = df[train_columns].values
+        y = np.ravel(np.array(df[target_columns]))
+        n_jobs = get_n_jobs(view_settings)
+        cached = compute_feature_importance(X, y, method, n_trees, n_repeats, n_jobs)
+        with _importances_lock:
+            _importances[key] = cached
+            while len(_importances) > IMPORTANCE_CACHE_SIZE:
+                _importances.popitem(last=False)
+
+    result = {}
+    result['features'] = list(train_columns)
+    result['importance'] = cached['importance']
+    result['method'] = method
+    if 'std' in cached:
+        result['std'] = cached['std']
+    if 'engine' in cached:
+        result['engine'] = cached['engine']
 
     return result
 #-------------------------------------------------------------------------------------------------
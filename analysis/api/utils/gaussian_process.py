@@ -12,16 +12,24 @@
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
 #         allows serverside work for the 'GaussianProcess' component.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy, pandas and sklearn libs
+# References: Django settings, hashlib, threading, logging, numpy, pandas, scipy, joblib and
+#             sklearn libs and the 'acquisition' and 'execution' utils
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+from collections import OrderedDict
+import hashlib
 import logging
 import math
+import threading
 import numpy as np
 import pandas as pd
+from scipy.stats import qmc
+from joblib import Parallel, delayed
 
 #Gaussian Process Regression
 from sklearn.model_selection import cross_val_score
@@ -30,21 +38,53 @@ from sklearn.gaussian_process import GaussianProcessRegressor
 from sklearn.gaussian_process import kernels as sk_kern
 from sklearn.gaussian_process.kernels import ConstantKernel, RBF, WhiteKernel, DotProduct, Matern
 from sklearn.preprocessing import StandardScaler
-from scipy.stats import norm
+
+from .acquisition import expected_improvement
+from .acquisition import probability_of_improvement
+from .acquisition import q_expected_improvement
+from .acquisition import top_k
+from .acquisition import upper_confidence_bound
+from .execution import get_n_jobs, parallel_execution
 
 logger = logging.getLogger(__name__)
 
 #-------------------------------------------------------------------------------------------------
 
+# Number of candidates predicted at once for three or more features
+CHUNK_SIZE = getattr(settings, 'ANALYSIS_GP_CHUNK_SIZE', 16384)
+
+# Upper bound of the best candidates kept (and returned) for three or more features
+MAX_KEPT_CANDIDATES = getattr(settings, 'ANALYSIS_GP_MAX_KEPT_CANDIDATES', 10000)
+
+# Number of random 80/20 splits the score of a kernel is averaged over ("route" mode)
+NUM_VALIDATION = 10
+
+# Number of (kernel, data, split) scores remembered per process
+SCORE_CACHE_SIZE = getattr(settings, 'ANALYSIS_GP_SCORE_CACHE_SIZE', 1024)
+
+kernel_names = [
+    'ConstantKernel() * RBF() + WhiteKernel()',
+    'ConstantKernel() * DotProduct() + WhiteKernel()',
+    'ConstantKernel() * RBF() + WhiteKernel() + ConstantKernel() * DotProduct()',
+    'ConstantKernel() * RBF(np.ones()) + WhiteKernel()',
+    'ConstantKernel() * RBF(np.ones()) + WhiteKernel() + ConstantKernel() * DotProduct()',
+]
+
+_scores = OrderedDict()
+_scores_lock = threading.Lock()
+
+acquisition_names = {
+    'EI': 'EI',
+    'PI': 'PI',
+    'UCB': 'UCB',
+    'qEI': 'EI',
+}
 
 #-------------------------------------------------------------------------------------------------
-def get_gaussian_process(data):
-    feature_columns = data['view']['settings']['featureColumns']
-    target_column = data['view']['settings']['targetColumn']
-    kernel = data['view']['settings']['kernel']
-    dataset = data['data']
-    #---------------------------------------------------------------------------------------------
-    #kernel
+
+
+#-------------------------------------------------------------------------------------------------
+def get_kernel(kernel, n_features):
     if kernel == 'ConstantKernel() * RBF() + WhiteKernel()':
         kernel = ConstantKernel() * RBF() + WhiteKernel()
     elif kernel == 'ConstantKernel() * DotProduct() + WhiteKernel()':
@@ -52,10 +92,125 @@ def get_gaussian_process(data):
     elif kernel == 'ConstantKernel() * RBF() + WhiteKernel() + ConstantKernel() * DotProduct()':
         kernel = ConstantKernel() * RBF() + WhiteKernel() + ConstantKernel() * DotProduct()
     elif kernel == 'ConstantKernel() * RBF(np.ones()) + WhiteKernel()':
-        kernel = ConstantKernel() * RBF(np.ones(len(feature_columns))) + WhiteKernel()
+        kernel = ConstantKernel() * RBF(np.ones(n_features)) + WhiteKernel()
     elif kernel == 'ConstantKernel() * RBF(np.ones()) + WhiteKernel() + ConstantKernel() * DotProduct()':
-        kernel = ConstantKernel() * RBF(np.ones(len(feature_columns))) + WhiteKernel() + ConstantKernel() * DotProduct()
-    #----------------------------------------------------------------------------------------------
+        kernel = ConstantKernel() * RBF(np.ones(n_features)) + WhiteKernel() + ConstantKernel() * DotProduct()
+    return kernel
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def score_split(kernel, x, y, seed):
+    """R^2 on the test part of one random 80/20 split."""
+    X_train, X_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=seed)
+    model = GaussianProcessRegressor(kernel)
+    model.fit(X_train, y_train)
+    return model.score(X_test, y_test)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_route_scores(names, n_features, x, y, n_jobs):
+    """Mean split score of every named kernel. Scores are memoized per (kernel, data, seed), and
+    the missing fits of all kernels are run in one parallel batch.
+    """
+    x = np.ascontiguousarray(x, dtype='float64')
+    y = np.ascontiguousarray(y, dtype='float64')
+    digest = hashlib.sha256()
+    for a in (x, y):
+        digest.update(str(a.shape).encode('utf-8'))
+        digest.update(a.tobytes())
+    data_hash = digest.hexdigest()
+
+    keys = [(name, data_hash, seed) for name in names for seed in range(NUM_VALIDATION)]
+    known = {}
+    with _scores_lock:
+        for k in keys:
+            if k in _scores:
+                _scores.move_to_end(k)
+                known[k] = _scores[k]
+    missing = [k for k in keys if k not in known]
+
+    if missing:
+        with parallel_execution(n_jobs):
+            computed = Parallel()(
+                delayed(score_split)(get_kernel(name, n_features), x, y, seed)
+                for name, _, seed in missing
+            )
+        known.update(zip(missing, computed))
+        with _scores_lock:
+            for k, score in zip(missing, computed):
+                _scores[k] = score
+                _scores.move_to_end(k)
+            while len(_scores) > SCORE_CACHE_SIZE:
+                _scores.popitem(last=False)
+
+    return [float(np.mean([known[(name, data_hash, seed)] for seed in range(NUM_VALIDATION)]))
+            for name in names]
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def iter_grid_chunks(axes, chunk_size):
+    """Rows of the full grid over the given axes (ordered like np.meshgrid(*axes) flattened),
+    generated chunk by chunk from the flat grid index.
+    """
+    shape = tuple(len(a) for a in axes)
+    shape = (shape[1], shape[0]) + shape[2:]
+    axes = [axes[1], axes[0]] + list(axes[2:])
+    total = int(np.prod(shape))
+    for start in range(0, total, chunk_size):
+        index = np.unravel_index(np.arange(start, min(start + chunk_size, total)), shape)
+        columns = [a[i] for a, i in zip(axes, index)]
+        columns[0], columns[1] = columns[1], columns[0]
+        yield np.column_stack(columns)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def iter_sample_chunks(method, mins, maxs, n, chunk_size, seed=0):
+    """n quasi random candidates ('lhs': Latin hypercube per chunk, 'sobol': scrambled Sobol
+    sequence) within the given bounds, generated chunk by chunk.
+    """
+    if method == 'sobol':
+        sampler = qmc.Sobol(len(mins), scramble=True, seed=seed)
+    else:
+        sampler = qmc.LatinHypercube(len(mins), seed=seed)
+    for start in range(0, n, chunk_size):
+        yield qmc.scale(sampler.random(min(chunk_size, n - start)), mins, maxs)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def predict_candidates(model, chunks, get_acquisition, keep):
+    """Predict every chunk of candidates and keep the ones with the highest acquisition score.
+
+    Returns:
+        candidates, prediction, standard deviation, score and EI of the kept candidates (empty
+        arrays if there are no candidates)
+    """
+    kept = None
+    for X in chunks:
+        pred, std = model.predict(X, return_std=True)
+        score, EI = get_acquisition(pred, std)
+        current = (X, pred, std, score, EI)
+        if kept is not None:
+            current = tuple(np.concatenate([a, b]) for a, b in zip(kept, current))
+        index = top_k(current[3], keep)
+        kept = tuple(a[index] for a in current)
+    if kept is None:
+        return (np.empty((0, model.n_features_in_)),) + tuple(np.empty(0) for _ in range(4))
+    return kept
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_gaussian_process(data):
+    feature_columns = data['view']['settings']['featureColumns']
+    target_column = data['view']['settings']['targetColumn']
+    kernel = data['view']['settings'].get('kernel')
+    dataset = data['data']
+    kernel = get_kernel(kernel, len(feature_columns))
 
     result = {}
 
@@ -66,19 +221,33 @@ def get_gaussian_process(data):
         df_target = df[target_column]
         y = np.array(df_target)
 
-        num_validation = 10
-        total_score = 0
-        for i in range(num_validation):
-            X_train, X_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=i)
-            model = GaussianProcessRegressor(kernel)
-            model.fit(X_train, y_train)
-            score = model.score(X_test, y_test)
-            total_score += score
-        mean_score = total_score / num_validation
+        n_jobs = get_n_jobs(data['view']['settings'])
+        if data['view']['settings'].get('compareKernels'):
+            names = kernel_names
+        else:
+            names = [data['view']['settings']['kernel']]
+
+        scores = get_route_scores(names, len(feature_columns), x, y, n_jobs)
+        leaderboard = sorted(
+            [{'kernel': name, 'score': score} for name, score in zip(names, scores)],
+            key=lambda row: row['score'], reverse=True
+        )
+        mean_score = scores[0] if len(names) == 1 else leaderboard[0]['score']
 
         result = {'serverReply': mean_score}
+        if len(names) > 1:
+            result['leaderboard'] = leaderboard
     else:
-        target_EI = data['view']['settings']['targetEI']
+        data_settings = data['view']['settings']
+        target_EI = data_settings['targetEI']
+        acquisition = data_settings.get('acquisition', 'EI')
+        kappa = float(data_settings.get('kappa', 2.0))
+        batch_size = int(data_settings.get('batchSize', 5))
+        sampling = data_settings.get('sampling', 'grid')
+        if acquisition not in acquisition_names:
+            return {'status': 'error: unknown acquisition function ' + str(acquisition)}
+        if sampling not in ('grid', 'lhs', 'sobol'):
+            return {'status': 'error: unknown sampling method ' + str(sampling)}
         elements = math.floor(math.pow(int(data['view']['settings']['numberOfElements']), 1 / len(feature_columns)))
 
         dataset = data['data']
@@ -93,6 +262,23 @@ def get_gaussian_process(data):
         model = GaussianProcessRegressor(kernel)
         model.fit(x, y)
 
+        #Acquisition function
+        y_std = np.std(y)
+
+        Xi = y_std * 0.01
+        maximize = target_EI == 'Maximization'
+        best = np.max(y) if maximize else np.min(y)
+
+        def get_acquisition(pred, std):
+            EI = expected_improvement(pred, std, best, Xi, maximize)
+            if acquisition == 'PI':
+                score = probability_of_improvement(pred, std, best, Xi, maximize)
+            elif acquisition == 'UCB':
+                score = upper_confidence_bound(pred, std, kappa, maximize)
+            else: # EI and qEI
+                score = EI
+            return score, EI
+
         data = {}
         d1 = {}
         d2 = {}
@@ -107,8 +293,10 @@ def get_gaussian_process(data):
         if number_variables == 1 :
             pred_values = pd.DataFrame(d1).values
             pred,std = model.predict(pred_values, return_std=True)
+            score, EI = get_acquisition(pred, std)
             d2['Prediction'] = pred
             d2['Standard Deviation'] = std
+            d2['Expected Improvement'] = EI
 
         elif number_variables == 2 :
             mesh_values = [d1[keys] for keys in d1]
@@ -118,49 +306,44 @@ def get_gaussian_process(data):
                 d1[k] = i
             pred_values = np.column_stack(meshgrid)
             pred, std = model.predict(pred_values,return_std=True)
+            score, EI = get_acquisition(pred, std)
             d2['Prediction'] = np.reshape(pred, (step[1], step[0]))
             d2['Standard Deviation'] = np.reshape(std, (step[1], step[0]))
+            d2['Expected Improvement'] = np.reshape(EI, (step[1], step[0]))
 
         else :
-            mesh_values = [d1[keys] for keys in d1]
-            meshgrid = []
-            for k, i in zip(d1, np.meshgrid(*mesh_values)):
-                meshgrid.append(i.reshape(-1))
-                d1[k] = i.reshape(-1)
-            pred_values = np.column_stack(meshgrid)
-            pred, std = model.predict(pred_values,return_std=True)
+            # the candidates are predicted chunk by chunk and only the best ones are kept,
+            # so the memory use does not grow with the size of the grid
+            if sampling == 'grid':
+                total = int(np.prod(step))
+                chunks = iter_grid_chunks([d1[k] for k in d1], CHUNK_SIZE)
+            else:
+                total = int(data_settings.get('numberOfSamples', data_settings['numberOfElements']))
+                mins = [float(i['min']) for i in feature_columns]
+                maxs = [float(i['max']) for i in feature_columns]
+                chunks = iter_sample_chunks(sampling, mins, maxs, total, CHUNK_SIZE)
+            if total <= 0:
+                return {'status': 'error: there are no candidates, increase the number of elements'}
+
+            keep = min(max(1, int(total * 0.1)), MAX_KEPT_CANDIDATES)
+            pred_values, pred, std, score, EI = predict_candidates(model, chunks, get_acquisition,
+                                                                   keep)
+            for k, column in zip(d1, pred_values.T):
+                d1[k] = column
             d2['Prediction'] = pred
             d2['Standard Deviation'] = std
-
-        #Acquisition function
-        y_std = np.std(y)
-
-        Xi = y_std * 0.01
-        EI = np.zeros(len(pred))
-        ind = np.where(std != 0)[0]
-        pred = pred[ind]
-        std = std[ind]
-        if target_EI == 'Maximization':
-            y_max = np.max(y)
-            Z = (y_max + pred - Xi) / std
-        else :
-            y_min = np.min(y)
-            Z = (y_min - pred - Xi) / std
-        EI.flat[ind] = std * Z * np.array([norm.cdf(z) for z in Z]) + std * np.array([norm.pdf(z) for z in Z])
-        if number_variables == 2:
-            d2['Expected Improvement'] = np.reshape(EI, (step[1], step[0]))
-        else:
             d2['Expected Improvement'] = EI
+
         data['feature_columns'] = d1
         data[target_column] = d2
 
         #Bayesian optimization
-        size = len(EI)
-        top_ten_percent = int(size * 0.1)
-        max_index = np.argsort(EI)[::-1][:top_ten_percent]
-        top_ten_percent_EI = [round(num, 10) for num in EI[max_index]]
+        size = len(score) if number_variables < 3 else total
+        top_ten_percent = min(int(size * 0.1), len(score))
+        max_index = top_k(score, top_ten_percent)
+        top_ten_percent_EI = np.round(score[max_index], 10)
         top_ten_percent_feature = pred_values[max_index]
-        header_values = [["<b>rank</b>"], ["<b>EI</b>"]]
+        header_values = [["<b>rank</b>"], ["<b>" + acquisition_names[acquisition] + "</b>"]]
         for i in feature_columns:
             header_values.append(["<b>" + i['column'] + "</b>"])
 
@@ -172,6 +355,15 @@ def get_gaussian_process(data):
             values.append(i)
 
         data['bayesian_optimization'] = {'header_values': header_values, 'values': values}
+
+        if acquisition == 'qEI':
+            batch_index, batch_value = q_expected_improvement(model, pred_values, EI, best,
+                                                              batch_size, Xi, maximize)
+            data['bayesian_optimization']['batch'] = {
+                'columns': [i['column'] for i in feature_columns],
+                'values': pred_values[batch_index],
+                'qEI': batch_value,
+            }
         # logger.info(data)
 
         result = data
@@ -12,7 +12,7 @@
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
 #         allows serverside work for the 'histogram' component.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy libs
+# References: logging, numpy, pandas and scipy libs
 # =================================================================================================
 
 # -------------------------------------------------------------------------------------------------
@@ -29,44 +29,109 @@ logger = logging.getLogger(__name__)
 
 
 # -------------------------------------------------------------------------------------------------
-def get_histogram(data):
-    # logger.info(data)
-    dummy_value = 999999999999
-    x = data["data"]
-    bins = data["view"]["settings"]["bins"]
+def get_bin_index(values, bin_edges):
+    """Bin of every value in one searchsorted pass (bins are [left, right), the last one is
+    closed), -1 for missing values and values outside of the edges.
+    """
+    ids = np.searchsorted(bin_edges, values, side="right") - 1
+    last = len(bin_edges) - 2
+    ids[values == bin_edges[-1]] = last
+    ids[~((ids >= 0) & (ids <= last))] = -1
+    return ids
+
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+def get_csr_indices(bin_ids, n_bins):
+    """Row ids per bin as CSR arrays: the rows of bin i are ids[offsets[i]:offsets[i + 1]]."""
+    rows = np.flatnonzero(bin_ids >= 0)
+    ids = rows[np.argsort(bin_ids[rows], kind="stable")].astype("int32")
+    counts = np.bincount(bin_ids[rows], minlength=n_bins)
+    offsets = np.zeros(n_bins + 1, dtype="int32")
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, ids, counts
+
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+def get_uniform_bins(X, bins):
+    """Equal width bins of every column of X in one vectorized pass.
+
+    The edges are the ones np.histogram_bin_edges gives for an integer number of bins, and the
+    bin of a value follows the same [left, right) rule with a closed last bin.
+
+    Returns:
+        edges (columns x bins + 1), bin ids (rows x columns, -1 for missing values)
+
+    Raises:
+        ValueError -- for infinite values, like np.histogram does
+    """
+    if bins < 1:
+        raise ValueError("`bins` must be positive")
+
+    X = np.asarray(X, dtype="float64")
+    valid = ~np.isnan(X)
+    has_values = valid.any(axis=0)
+
+    first = np.where(has_values, np.min(np.where(valid, X, np.inf), axis=0), 0.0)
+    last = np.where(has_values, np.max(np.where(valid, X, -np.inf), axis=0), 1.0)
+    if not (np.isfinite(first).all() and np.isfinite(last).all()):
+        column = int(np.flatnonzero(~(np.isfinite(first) & np.isfinite(last)))[0])
+        raise ValueError("autodetected range of [{}, {}] is not finite".format(
+            first[column], last[column]))
+    same = first == last
+    first[same] -= 0.5
+    last[same] += 0.5
+    edges = np.linspace(first, last, bins + 1, axis=1)
+
+    # estimate from the bin width, then correct values that fall on the wrong side of an edge
+    scaled = np.where(valid, (X - first) * (bins / (last - first)), 0.0)
+    ids = np.clip(scaled.astype("int64"), 0, bins - 1)
+    edges_by_bin = np.ascontiguousarray(edges.T)
+    ids -= (X < np.take_along_axis(edges_by_bin, ids, axis=0)) & (ids > 0)
+    ids += (X >= np.take_along_axis(edges_by_bin, ids + 1, axis=0)) & (ids < bins - 1)
+    ids[~valid] = -1
+
+    return edges, ids
 
-    x_df = pd.DataFrame(x, dtype="float64")
-    x_dropna = x_df.dropna()
 
-    hist, bin_edges = np.histogram(x_dropna.values, bins=bins)
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+def get_histogram_result(bin_edges, bin_ids, index_format):
+    offsets, ids, hist = get_csr_indices(bin_ids, len(bin_edges) - 1)
 
     result = {}
     result["hist"] = hist
     result["binEdges"] = bin_edges
 
-    x_replace_na = x_df.fillna(dummy_value)
-    x_array = x_replace_na.values
-    # kde = gaussian_kde(x_array)
-    # logger.info(x_array)
+    if index_format == "csr":
+        result["indexOffsets"] = offsets
+        result["indexIds"] = ids
+    else:
+        result["indices"] = np.split(ids, offsets[1:-1])
 
-    indices = []
+    return result
 
-    l = len(bin_edges)
-    for i in range(l - 1):
-        left = bin_edges[i]
-        right = bin_edges[i + 1]
-        # logger.info(left)
-        # logger.info(right)
-        ids = []
-        if i == l - 2:
-            ids = list(np.where((left <= x_array) & (x_array <= right))[0])
-        else:
-            ids = list(np.where((left <= x_array) & (x_array < right))[0])
-        indices.append(ids)
 
-    result["indices"] = indices
+# -------------------------------------------------------------------------------------------------
 
-    return result
+
+# -------------------------------------------------------------------------------------------------
+def get_histogram(data):
+    x = data["data"]
+    bins = data["view"]["settings"]["bins"]
+    index_format = data["view"]["settings"].get("indexFormat", "lists")
+
+    x_array = pd.DataFrame(x, dtype="float64").to_numpy().ravel()
+    bin_edges = np.histogram_bin_edges(x_array[~np.isnan(x_array)], bins=bins)
+
+    return get_histogram_result(bin_edges, get_bin_index(x_array, bin_edges), index_format)
 
 
 # -------------------------------------------------------------------------------------------------
@@ -76,22 +141,26 @@ def get_histogram(data):
 def get_histograms(data):
     selected_columns = data["view"]["settings"]["targetColumns"]
     dataset = data["data"]
-    df = pd.DataFrame(dataset, dtype="float64")
-    df = df[selected_columns]
+    df = pd.DataFrame(dataset)
+    df = df[selected_columns].astype("float64")
+    bins = data["view"]["settings"]["bins"]
+    index_format = data["view"]["settings"].get("indexFormat", "lists")
     result = {"data": {}}
-    count = 0
-    for i in selected_columns:
-        for j in selected_columns:
-            if i == j:
-                t_df = df[i].dropna()
-                target_data = {"view": {"settings": {}}}
-                target_data["data"] = df[i]
-                target_data["view"]["settings"]["bins"] = data["view"]["settings"][
-                    "bins"
-                ]
-                result["data"][count] = get_histogram(target_data)
-                # logger.info(result["data"][count])
-                count += 1
+    try:
+        bins = int(bins)
+    except (TypeError, ValueError):
+        pass
+
+    if isinstance(bins, int):
+        # all columns are binned in one pass
+        edges, ids = get_uniform_bins(df.to_numpy(), bins)
+        for count in range(len(selected_columns)):
+            result["data"][count] = get_histogram_result(edges[count], ids[:, count], index_format)
+    else:
+        for count, column in enumerate(selected_columns):
+            target_data = {"view": {"settings": dict(data["view"]["settings"])}}
+            target_data["data"] = df[column]
+            result["data"][count] = get_histogram(target_data)
     result["columns"] = selected_columns
     if data["view"]["settings"]["skewness"]:
         skewness = df.skew().round(7)
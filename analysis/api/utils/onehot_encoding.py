@@ -6,12 +6,14 @@
 # Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
 # ________________________________________________________________________________________________
 # Description: Serverside (Django) rest api utils for the 'Analysis' page involving
-#              'statistics' component
+#              'onehot_encoding' component
 # ------------------------------------------------------------------------------------------------
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
-#         allows serverside work for the 'statistics' component.
+#         allows serverside work for the 'onehot_encoding' component. With outputFormat 'sparse'
+#         the encoded columns are returned as categories with CSR row ids (the rows with a 1),
+#         the other columns column by column, so no dense rows are built.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy libs
+# References: logging, numpy, pandas libs and the 'histogram' utils
 # =================================================================================================
 
 # -------------------------------------------------------------------------------------------------
@@ -21,28 +23,106 @@ import logging
 import pandas as pd
 import numpy as np
 
+from .histogram import get_csr_indices
+
 logger = logging.getLogger(__name__)
 
 # -------------------------------------------------------------------------------------------------
 
 
+# -------------------------------------------------------------------------------------------------
+def get_onehot_codes(series, drop_first):
+    """Category code of every row (-1 for missing values and the dropped first category) and
+    the categories, sorted like pd.get_dummies sorts them.
+    """
+    codes, categories = pd.factorize(series, sort=True)
+    if drop_first:
+        codes = codes - 1
+        codes[codes < 0] = -1
+        categories = categories[1:]
+    return codes, categories
+
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+def get_onehot_names(column, categories):
+    return [str(column) + "_" + str(c) for c in categories]
+
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+def get_onehot_frame(df, columns, drop_first):
+    """Dense uint8 encoding with the columns (and column order) of pd.get_dummies."""
+    parts = [df.drop(columns=columns)]
+    rows = np.arange(len(df))
+    for c in columns:
+        codes, categories = get_onehot_codes(df[c], drop_first)
+        dummies = np.zeros((len(df), len(categories)), dtype="uint8")
+        valid = codes >= 0
+        dummies[rows[valid], codes[valid]] = 1
+        parts.append(
+            pd.DataFrame(dummies, columns=get_onehot_names(c, categories), index=df.index)
+        )
+    return pd.concat(parts, axis=1)
+
+
+# -------------------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------------------
+def get_sparse_onehot(df, columns, drop_first):
+    """Columnar sparse encoding: the rows with a 1 in column names[i] of an encoded column are
+    indexIds[indexOffsets[i]:indexOffsets[i + 1]].
+    """
+    kept = [c for c in df.columns if c not in columns]
+
+    encoded = []
+    for c in columns:
+        codes, categories = get_onehot_codes(df[c], drop_first)
+        offsets, ids, counts = get_csr_indices(codes, len(categories))
+        encoded.append(
+            {
+                "column": c,
+                "categories": categories.tolist(),
+                "names": get_onehot_names(c, categories),
+                "indexOffsets": offsets,
+                "indexIds": ids,
+            }
+        )
+
+    result = {}
+    result["rows"] = len(df)
+    result["columns"] = kept + [n for e in encoded for n in e["names"]]
+    result["data"] = {c: df[c].tolist() for c in kept}
+    result["encoded"] = encoded
+
+    return result
+
+
+# -------------------------------------------------------------------------------------------------
+
+
 # -------------------------------------------------------------------------------------------------
 def get_onehot(data):
     selected_columns = data["view"]["settings"]["featureColumns"]
     drop_first = data["view"]["settings"]["dropFirst"]
+    output_format = data["view"]["settings"].get("outputFormat", "records")
     dataset = data["data"]
 
-    df = pd.DataFrame(dataset)
-    onehot = pd.get_dummies(
-        df, columns=selected_columns, drop_first=drop_first, sparse=True, dtype="uint8"
-    )
-    # logger.info(onehot)
+    df = dataset if isinstance(dataset, pd.DataFrame) else pd.DataFrame(dataset)
+
+    if output_format == "sparse":
+        return get_sparse_onehot(df, selected_columns, drop_first)
+
+    onehot = get_onehot_frame(df, selected_columns, drop_first)
 
     result = {}
     result["columns"] = onehot.columns
-    # logger.info(result)
     result["data"] = onehot.to_dict(orient="records")
-    # logger.info(result)
 
     return result
 
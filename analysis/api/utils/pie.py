@@ -11,7 +11,7 @@
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
 #         allows serverside work for the 'pie' component.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy libs
+# References: logging, numpy, pandas libs and the 'histogram' utils
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
@@ -19,40 +19,67 @@
 #-------------------------------------------------------------------------------------------------
 import logging
 import numpy as np
+import pandas as pd
+
+from .histogram import get_bin_index
+from .histogram import get_csr_indices
 
 logger = logging.getLogger(__name__)
 #-------------------------------------------------------------------------------------------------
 
 
+#-------------------------------------------------------------------------------------------------
+def get_counts(values):
+    """Sorted unique values and their counts, from the categorical codes of pd.factorize."""
+    codes, uniques = pd.factorize(values, sort=True)
+    return uniques, np.bincount(codes, minlength=len(uniques))
+#-------------------------------------------------------------------------------------------------
+
+
 #-------------------------------------------------------------------------------------------------
 def get_pie(data):
     includeNoneVals = False
     if "undefinedIsIncluded" in data['view']['settings']:
         includeNoneVals = data['view']['settings']['undefinedIsIncluded']
     bins = data['view']['settings']['bins']
+    index_format = data['view']['settings'].get('indexFormat', 'lists')
+
+    if isinstance(data['data'], pd.DataFrame):
+        # a data source reference resolves into a (single column) table
+        column = data['data'].iloc[:, 0]
+    else:
+        column = pd.Series(data['data'])
+    missing = column.isna().to_numpy()
+    values = column[~missing].infer_objects().to_numpy()
+    n_missing = int(missing.sum()) if includeNoneVals else 0
+
     result = {}
-    if type(data['data'][0]) is str:
-        if(None in data['data']):
-            if includeNoneVals:
-                data['data'] = ['Undefined' if v is None else v for v in data['data']]
+    if len(values) and isinstance(values[0], str):
+        unique_elements, counts_elements = get_counts(values.astype(str))
+        dimensions = [str(ue) for ue in unique_elements]
+        if n_missing:
+            # 'Undefined' is sorted in with the other categories
+            position = int(np.searchsorted(unique_elements, 'Undefined'))
+            if position < len(dimensions) and dimensions[position] == 'Undefined':
+                counts_elements[position] += n_missing
             else:
-                data['data'] = [x for x in data['data'] if x is not None]
-
-        unique_elements, counts_elements = np.unique(data['data'], return_counts=True)
+                dimensions.insert(position, 'Undefined')
+                counts_elements = np.insert(counts_elements, position, n_missing)
         result['values'] = counts_elements
-        result['dimensions'] = [str(ue) for ue in unique_elements]
+        result['dimensions'] = dimensions
     else:
-        if(None in data['data']):
-            if includeNoneVals:
-                data['data'] = ['Undefined' if v is None else v for v in data['data']]
-            else:
-                data['data'] = [x for x in data['data'] if x is not None]
-        unique_elements, counts_elements = np.unique(data['data'], return_counts=True)
+        unique_elements, counts_elements = get_counts(values)
         if bins == 0 or bins == len(unique_elements):
             result['values'] = counts_elements
             result['dimensions'] = [str(ue) for ue in unique_elements]
+            if n_missing:
+                result['values'] = np.append(counts_elements, n_missing)
+                result['dimensions'].append('Undefined')
         else:
-            hist, bin_edges = np.histogram(data['data'], bins=bins)
+            x_array = column.to_numpy(dtype='float64', na_value=np.nan)
+            bin_edges = np.histogram_bin_edges(x_array[~missing], bins=bins)
+            bin_ids = get_bin_index(x_array, bin_edges)
+            offsets, ids, hist = get_csr_indices(bin_ids, len(bin_edges) - 1)
             result['values'] = hist
 
             floatsExists = False
@@ -65,19 +92,18 @@ def get_pie(data):
             else:
                 result['dimensions'] = ["{:0.0f}".format(x) for x in bin_edges]
 
-            x_array = np.array(data['data'])
-            indices = []
-            l = len(bin_edges)
-            for i in range(l - 1):
-                left = bin_edges[i]
-                right = bin_edges[i + 1]
-                ids = []
-                if i == l - 2:
-                    ids = list(np.where((left <= x_array) & (x_array <= right))[0])
-                else:
-                    ids = list(np.where((left <= x_array) & (x_array < right))[0])
-                indices.append(ids)
-            result['indices'] = indices
+            if n_missing:
+                # the rows without value form one more slice after the bins
+                result['values'] = np.append(hist, n_missing)
+                result['dimensions'].append('Undefined')
+                offsets = np.append(offsets, offsets[-1] + n_missing).astype('int32')
+                ids = np.concatenate([ids, np.flatnonzero(missing).astype('int32')])
+
+            if index_format == 'csr':
+                result['indexOffsets'] = offsets
+                result['indexIds'] = ids
+            else:
+                result['indices'] = np.split(ids, offsets[1:-1])
 
     return result
 #-------------------------------------------------------------------------------------------------
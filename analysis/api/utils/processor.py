@@ -36,6 +36,8 @@ from .node_graph import get_node_graph
 from .gaussian_process import get_gaussian_process
 from .xenonpy import get_xenonpy
 from .onehot_encoding import get_onehot
+from .dataset import load_dataset
+from .cache import result_cache
 
 
 import logging
@@ -67,17 +69,89 @@ processor_map = {
 }
 
 
+# components that build a table from the posted rows and therefore can also be fed from a
+# data source reference ("dataSource") instead of "data"
+dataset_reference_types = {
+    "histogram",
+    "feature-importance",
+    "clustering",
+    "regression",
+    "classification",
+    "pie",
+    "scatter3D",
+    "statistics",
+    "gaussianProcess",
+    "xenonpy",
+    "onehot_encoding",
+}
+
+
+# components that resolve a data source reference themselves (e.g. from precomputed sketches)
+lazy_reference_types = {
+    "statistics",
+}
+
+
+# components that only pass the posted data back and are not worth caching
+uncached_types = {
+    "bar",
+    "line",
+    "heatmap",
+    "pairwise-correlation",
+    "custom",
+    "nodeGraph",
+}
+
+
+# -------------------------------------------------------------------------------------------------
+def resolve_data(data):
+    """Replace a data source reference in the request with the referenced (cached) DataFrame."""
+
+    if "dataSource" in data and data["dataSource"] is not None:
+        if data["view"]["type"] not in dataset_reference_types:
+            raise ValueError(
+                "The component '" + data["view"]["type"]
+                + "' does not support data source references."
+            )
+        if data["view"]["type"] not in lazy_reference_types:
+            data["data"] = load_dataset(data["dataSource"])
+
+    return data
+
+
+# -------------------------------------------------------------------------------------------------
+
+
 # -------------------------------------------------------------------------------------------------
 def process_view(data):
     # logger.info(data['view']['type'])
 
     result = {"status": "error: data is incorrect"}
 
+    # the key has to be taken before the processors get to modify the request data
+    cache_key = None
+    if (
+        result_cache.enabled
+        and data.get("cache", True)
+        and data["view"]["type"] not in uncached_types
+    ):
+        cache_key = result_cache.get_key(data)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    data = resolve_data(data)
+
     if data["view"]["type"] == "regression" or data["view"]["type"] == "classification":
         result, _ = processor_map[data["view"]["type"]](data)
     else:
         result = processor_map[data["view"]["type"]](data)
 
+    if cache_key is not None and not (
+        isinstance(result, dict) and str(result.get("status", "")).startswith("error")
+    ):
+        result_cache.set(cache_key, result)
+
     return result
 
 
@@ -88,6 +162,7 @@ def process_view(data):
 def get_model(data):
     # logger.info(data['view']['type'])
 
+    data = resolve_data(data)
     _, model = processor_map[data["view"]["type"]](data)
 
     return model
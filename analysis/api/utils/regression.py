@@ -12,7 +12,7 @@
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
 #         allows serverside work for the 'regression' component.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy, pandas and sklearn libs
+# References: logging, numpy, pandas and sklearn libs and the 'execution' utils
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
@@ -30,10 +30,34 @@ from sklearn.kernel_ridge import KernelRidge
 from sklearn.svm import SVR
 from sklearn.model_selection import cross_validate, train_test_split, KFold
 
+from .execution import get_n_jobs, parallel_execution, reset_n_jobs, split_n_jobs
+
 logger = logging.getLogger(__name__)
 #-------------------------------------------------------------------------------------------------
 
 
+#-------------------------------------------------------------------------------------------------
+def create_regressor(method, method_args, n_jobs=1):
+    if method == 'Linear':
+        return LinearRegression(fit_intercept=True)
+    elif method == 'Lasso':
+        return Lasso()
+    elif method == 'SVR':
+        return SVR(C=float(method_args['arg1']), gamma=float(method_args['arg2']))
+    elif method == 'RandomForest':
+        return RandomForestRegressor(random_state=int(method_args['arg1']),
+                                     n_estimators=int(method_args['arg2']), n_jobs=n_jobs)
+    elif method == 'ExtraTrees':
+        return ExtraTreesRegressor(random_state=int(method_args['arg1']),
+                                   n_estimators=int(method_args['arg2']), n_jobs=n_jobs)
+    elif method == 'MLP':
+        return MLPRegressor(random_state=int(method_args['arg1']),
+                            max_iter=int(method_args['arg2']))
+    else: # KernelRidge
+        return KernelRidge(alpha=float(method_args['arg1']))
+#-------------------------------------------------------------------------------------------------
+
+
 #-------------------------------------------------------------------------------------------------
 def get_regression(data):
     feature_columns = data['view']['settings']['featureColumns']
@@ -50,30 +74,12 @@ def get_regression(data):
     df_target = df[target_column]
     y = df_target.values
 
-    reg = None
-    cv_model = None
+    n_jobs = get_n_jobs(data['view']['settings'])
+    n_splits = 5 if cvMethod == 'TrainTestSplit' else int(cvMethod_args)
+    cv_jobs, cv_model_jobs = split_n_jobs(n_jobs, n_splits)
 
-    if method == 'Linear':
-        reg = LinearRegression(fit_intercept=True)
-        cv_model = LinearRegression(fit_intercept=True)
-    elif method == 'Lasso':
-        reg = Lasso()
-        cv_model = Lasso()
-    elif method == 'SVR':
-        reg = SVR(C=float(method_args['arg1']), gamma=float(method_args['arg2']))
-        cv_model = SVR(C=float(method_args['arg1']), gamma=float(method_args['arg2']))
-    elif method == 'RandomForest':
-        reg = RandomForestRegressor(random_state=int(method_args['arg1']), n_estimators=int(method_args['arg2']))
-        cv_model = RandomForestRegressor(random_state=int(method_args['arg1']), n_estimators=int(method_args['arg2']))
-    elif method == 'ExtraTrees':
-        reg = ExtraTreesRegressor(random_state=int(method_args['arg1']), n_estimators=int(method_args['arg2']))
-        cv_model = ExtraTreesRegressor(random_state=int(method_args['arg1']), n_estimators=int(method_args['arg2']))
-    elif method == 'MLP':
-        reg = MLPRegressor(random_state=int(method_args['arg1']), max_iter=int(method_args['arg2']))
-        cv_model = MLPRegressor(random_state=int(method_args['arg1']), max_iter=int(method_args['arg2']))
-    else: # KernelRidge
-        reg = KernelRidge(alpha=float(method_args['arg1']))
-        cv_model = KernelRidge(alpha=float(method_args['arg1']))
+    reg = create_regressor(method, method_args, n_jobs)
+    cv_model = create_regressor(method, method_args, cv_model_jobs)
 
     data = {}
     d1 = {}
@@ -86,37 +92,31 @@ def get_regression(data):
         'mae': 'neg_mean_absolute_error',
     }
 
+    # forests build their trees with threads (their own n_jobs), only the CV folds, which are
+    # independent fits, are run on the configured (process) backend
     if cvMethod == 'TrainTestSplit':
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size = float(cvMethod_args), random_state = 2)
         reg.fit(X_train, y_train)
-        y_predict = reg.predict(X_test)
-        train_x=[]
-        for i in X_train:
-            train_x.append(reg.predict([i])[0])
-
-        train_y=[]
-        for j in y_train:
-            train_y.append(j)
-
-        test_x=[]
-        for ii in X_test:
-            test_x.append(reg.predict([ii])[0])
-
-        test_y=[]
-        for jj in y_test:
-            test_y.append(jj)
-
-        scores = cross_validate(cv_model, X_train, y_train, scoring=scoring)
-        d1[target_column] = train_y
+        reset_n_jobs(reg)
+        # one batched predict per split, returned as typed (float64) arrays
+        train_x = reg.predict(X_train).astype('float64', copy=False)
+        test_x = reg.predict(X_test).astype('float64', copy=False)
+        y_predict = test_x
+
+        with parallel_execution(cv_jobs):
+            scores = cross_validate(cv_model, X_train, y_train, scoring=scoring, n_jobs=cv_jobs)
+        d1[target_column] = y_train
         d1[p_name] = train_x
-        d2[target_column] = test_y
+        d2[target_column] = y_test
         d2[p_name] = test_x
 
     else: # KFold
         kf = KFold(shuffle=True, random_state=0, n_splits=int(cvMethod_args))
         reg.fit(X, y)
         y_predict = reg.predict(X)
-        scores = cross_validate(cv_model, X, y, cv=kf, scoring=scoring)
+        reset_n_jobs(reg)
+        with parallel_execution(cv_jobs):
+            scores = cross_validate(cv_model, X, y, cv=kf, scoring=scoring, n_jobs=cv_jobs)
         d1[target_column] = y
         d1[p_name] = y_predict
         d2[target_column] = []
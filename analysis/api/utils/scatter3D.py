@@ -9,15 +9,26 @@
 #              'scatter3D' components
 # ------------------------------------------------------------------------------------------------
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
-#         allows serverside work for the 'scatter3D' component.
+#         allows serverside work for the 'scatter3D' component. The fitted projection (scaler
+#         and PCA) is cached per data and features, so recoloring or filtering the same point
+#         cloud only projects the rows again. Larger inputs use the randomized SVD, and tall ones
+#         an IncrementalPCA fitted chunk by chunk (data sources are read chunk by chunk from
+#         their memory mapped sidecar). t-SNE and UMAP are computed by the 'embedding' utils.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy, pandas and sklearn libs
+# References: Django settings, collections, hashlib, logging, threading, numpy, pandas and
+#             sklearn libs, 'datamanagement' folder's 'dataframes' and the 'dataset' and
+#             'embedding' utils
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+from collections import OrderedDict
+import hashlib
 import logging
+import threading
 import numpy as np
 import pandas as pd
 
@@ -25,51 +36,182 @@ import pandas as pd
 from sklearn import decomposition
 from sklearn import preprocessing as preproc
 
+from datamanagement.dataframes import get_dataframe
+from .dataset import get_datasource
+from .embedding import embedding_methods
+from .embedding import get_embedding
+from .embedding import get_embedding_engine
+
 logger = logging.getLogger(__name__)
 
 #-------------------------------------------------------------------------------------------------
 
+# Rows above which the PCA is fitted incrementally, and the rows of one chunk
+INCREMENTAL_ROWS = getattr(settings, 'ANALYSIS_PCA_INCREMENTAL_ROWS', 200000)
+CHUNK_SIZE = getattr(settings, 'ANALYSIS_PCA_CHUNK_SIZE', 50000)
+
+# Fitted projections remembered per process
+PROJECTION_CACHE_SIZE = getattr(settings, 'ANALYSIS_PROJECTION_CACHE_SIZE', 8)
+
+# Matrix size (rows x features) from which the randomized SVD is used
+RANDOMIZED_MIN_SIZE = 100000
+
+_projections = OrderedDict()
+_projections_lock = threading.Lock()
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def iter_chunks(df, columns, chunk_size=CHUNK_SIZE):
+    """(start, stop, float64 matrix) of the given columns, in chunks of about chunk_size rows."""
+    n_chunks = max(1, -(-len(df) // chunk_size))
+    bounds = np.linspace(0, len(df), n_chunks + 1).astype('int64')
+    features = df[columns]
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        yield start, stop, features.iloc[start:stop].to_numpy(dtype='float64')
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_features_hash(df, columns):
+    digest = hashlib.sha256()
+    for _, _, X in iter_chunks(df, columns):
+        digest.update(np.ascontiguousarray(X).tobytes())
+    return digest.hexdigest()
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_preprocessor(view_settings):
+    if not view_settings.get('preprocessingEnabled', False):
+        return None
+    method = view_settings.get('preprocMethod')
+    if method == "StandardScaling":
+        return preproc.StandardScaler()
+    if method == "Normalization":
+        return preproc.Normalizer()
+    return None
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def fit_projection(df, feature_columns, scaler):
+    """Fit the (optional) scaler and a 3 component PCA on the feature columns of df.
+
+    Returns:
+        scaler, pca
+    """
+    if len(df) > INCREMENTAL_ROWS:
+        if isinstance(scaler, preproc.StandardScaler):
+            for _, _, X in iter_chunks(df, feature_columns):
+                scaler.partial_fit(X)
+        pca = decomposition.IncrementalPCA(n_components=3)
+        for _, _, X in iter_chunks(df, feature_columns):
+            pca.partial_fit(scaler.transform(X) if scaler is not None else X)
+        return scaler, pca
+
+    X = df[feature_columns].to_numpy(dtype='float64')
+    if scaler is not None:
+        X = scaler.fit_transform(X)
+    solver = 'randomized' if X.size >= RANDOMIZED_MIN_SIZE else 'auto'
+    pca = decomposition.PCA(n_components=3, svd_solver=solver, random_state=0)
+    pca.fit(X)
+    return scaler, pca
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def project(df, feature_columns, scaler, pca):
+    """Coordinates of the rows of df as three float32 arrays."""
+    coords = [np.empty(len(df), dtype='float32') for _ in range(3)]
+    for start, stop, X in iter_chunks(df, feature_columns):
+        P = pca.transform(scaler.transform(X) if scaler is not None else X)
+        for i in range(3):
+            coords[i][start:stop] = P[:, i]
+    return coords
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_projection(data, df, feature_columns):
+    """Fitted (scaler, pca) for the request, from the cache if possible.
+
+    A data source reference is fitted on the whole data source, so filtered or selected rows
+    of it keep their place in the point cloud. Posted data is identified by its contents.
+    """
+    view_settings = data['view']['settings']
+    options = (tuple(feature_columns), view_settings.get('preprocessingEnabled', False),
+               view_settings.get('preprocMethod'))
+
+    fit_df = df
+    reference = data.get('dataSource')
+    if reference is not None:
+        datasource = get_datasource(reference)
+        fit_df = get_dataframe(datasource)
+        key = ('datasource', str(datasource.id), datasource.file.name,
+               datasource.modified.timestamp()) + options
+    else:
+        key = ('data', len(df), get_features_hash(df, feature_columns)) + options
+
+    with _projections_lock:
+        if key in _projections:
+            _projections.move_to_end(key)
+            return _projections[key]
+
+    projection = fit_projection(fit_df, feature_columns, get_preprocessor(view_settings))
+
+    with _projections_lock:
+        _projections[key] = projection
+        while len(_projections) > PROJECTION_CACHE_SIZE:
+            _projections.popitem(last=False)
+
+    return projection
+#-------------------------------------------------------------------------------------------------
+
 
 #-------------------------------------------------------------------------------------------------
 def get_scatter3D(data):
+    df = data['data'] if isinstance(data['data'], pd.DataFrame) else None
+    if df is not None:
+        # a data source reference resolves into a table, but the reply is column based
+        data['data'] = df.to_dict(orient='list')
+
+    view_settings = data['view']['settings']
+    if(view_settings['method'] == "PCA"):
+        feature_columns = view_settings['featureColumns']
+        if df is None:
+            df = pd.DataFrame(data['data'])
+
+        scaler, pca = get_projection(data, df, feature_columns)
+        x, y, z = project(df, feature_columns, scaler, pca)
+
+        data['data']['x'] = x
+        data['data']['y'] = y
+        data['data']['z'] = z
+        data['data']['evr'] = pca.explained_variance_ratio_
+        data['data']['noOfFeat'] = len(feature_columns)
+
+    elif(view_settings['method'] in embedding_methods):
+        feature_columns = view_settings['featureColumns']
+        if df is None:
+            df = pd.DataFrame(data['data'])
+
+        X = df[feature_columns].to_numpy(dtype='float64')
+        scaler = get_preprocessor(view_settings)
+        if scaler is not None:
+            X = scaler.fit_transform(X)
+        data_key = (get_features_hash(df, feature_columns),
+                    view_settings.get('preprocessingEnabled', False),
+                    view_settings.get('preprocMethod'))
+
+        x, y, z = get_embedding(data_key, X, view_settings['method'], view_settings)
 
-    if(data['view']['settings']['method'] == "PCA"):
-        feature_columns = data['view']['settings']['featureColumns']
-        target_column = data['view']['settings']['targetColumn']
-
-        df = pd.DataFrame(data['data'])
-        df_train = df[feature_columns]
-        X = df_train.values
-        df_target = df[target_column]
-        y = df_target.values
-
-        if "preprocessingEnabled" in data['view']['settings'].keys():
-            if "preprocMethod" in data['view']['settings'].keys():
-                if(data['view']['settings']['preprocessingEnabled'] == True):
-                    if(data['view']['settings']['preprocMethod'] == "StandardScaling"):
-                        scaler = preproc.StandardScaler()
-                        scaler.fit(X)
-                        X = scaler.transform(X)
-                    elif(data['view']['settings']['preprocMethod'] == "Normalization"):
-                        normalizer = preproc.Normalizer().fit(X)
-                        X = normalizer.transform(X)
-
-        pca = decomposition.PCA(n_components=3)
-        pca.fit(X)
-        X = pca.transform(X)
-        evr = pca.explained_variance_ratio_
-
-        pca_x = []; pca_y = []; pca_z = []
-        for pcaSet in X:
-            pca_x.append(pcaSet[0])
-            pca_y.append(pcaSet[1])
-            pca_z.append(pcaSet[2])
-
-        data['data']['x'] = pca_x
-        data['data']['y'] = pca_y
-        data['data']['z'] = pca_z
-        data['data']['evr'] = evr
+        data['data']['x'] = x
+        data['data']['y'] = y
+        data['data']['z'] = z
         data['data']['noOfFeat'] = len(feature_columns)
+        data['data']['engine'] = get_embedding_engine(view_settings['method'])
 
     return data['data']
 #-------------------------------------------------------------------------------------------------
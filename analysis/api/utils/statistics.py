@@ -11,7 +11,8 @@
 # Notes:  This is one of the REST API parts of the 'analysis' interface of the website that
 #         allows serverside work for the 'statistics' component.
 # ------------------------------------------------------------------------------------------------
-# References: logging, numpy libs
+# References: logging, numpy, pandas libs, common.sketches, 'datamanagement' folder's
+#             'dataframes' and the 'dataset' utils
 # =================================================================================================
 
 # -------------------------------------------------------------------------------------------------
@@ -21,19 +22,65 @@ import logging
 import pandas as pd
 import numpy as np
 
+from common.sketches import describe_names, sketch_frame
+from datamanagement.dataframes import get_sketches
+from .dataset import get_datasource, load_dataset
+
 logger = logging.getLogger(__name__)
 
 # -------------------------------------------------------------------------------------------------
 
 
+# -------------------------------------------------------------------------------------------------
+def get_reference_sketches(reference, columns):
+    """Persisted sketches of the columns of a data source reference, or None when the reference
+    selects rows (the sketches describe the whole file) or a column has no sketch.
+    """
+    if reference.get("rows") is not None or reference.get("filter"):
+        return None
+
+    sketches = get_sketches(get_datasource(reference))
+    if sketches is None or any(c not in sketches for c in columns):
+        return None
+
+    return {c: sketches[c] for c in columns}
+
+
+# -------------------------------------------------------------------------------------------------
+
+
 # -------------------------------------------------------------------------------------------------
 def get_statistics(data):
     selected_columns = data["view"]["settings"]["featureColumns"]
-    dataset = data["data"]
+    mode = data["view"]["settings"].get("mode", "exact")
+    reference = data.get("dataSource")
     stats_name = "Stats"
 
-    df = pd.DataFrame(dataset)
-    statistics = df.describe().round(5)
+    # 'approximate' uses one-pass sketches (the persisted ones of a data source reference without
+    # row selection), with exact count, mean, std, min and max and t-digest quartiles
+    sketches = None
+    if reference is not None:
+        if mode == "approximate":
+            sketches = get_reference_sketches(reference, selected_columns)
+        if sketches is None:
+            # only the selected columns are read from the memory mapped sidecar
+            projected = dict(reference, columns=reference.get("columns") or selected_columns)
+            data["data"] = load_dataset(projected)
+
+    if sketches is None:
+        dataset = data["data"]
+        df = dataset if isinstance(dataset, pd.DataFrame) else pd.DataFrame(dataset)
+        if mode == "approximate":
+            sketches = sketch_frame(df)
+
+    if sketches is not None:
+        described = [c for c in selected_columns if c in sketches]
+        statistics = pd.DataFrame(
+            {c: sketches[c].describe() for c in described}, index=describe_names
+        ).round(5)
+    else:
+        statistics = df.describe().round(5)
+
     statistics.insert(
         0,
         stats_name,
@@ -42,9 +89,9 @@ def get_statistics(data):
 
     result = {}
     result["columns"] = [stats_name] + selected_columns
-    logger.info(result)
     result["data"] = statistics.to_dict(orient="records")
-    logger.info(result)
+    if sketches is not None:
+        result["approximate"] = True
 
     return result
 
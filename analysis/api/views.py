@@ -12,14 +12,17 @@
 # Notes:  This is one of the REST API part of the serverside module that allows the user to
 #         interact with the 'analysis' interface of the website. (DB and server Python methods)
 # ------------------------------------------------------------------------------------------------
-# References: Django platform libraries and rest framework, logging, sys libs and
-#             'analysis' folder's 'models', 'api' subfolder's 'serializers' and 'permissions'
+# References: Django platform libraries and rest framework, celery, logging, pandas, sys libs and
+#             'analysis' folder's 'models' and 'tasks', 'api' subfolder's 'serializers',
+#             'permissions' and 'renderers'
 #             and 'utilz' folder's 'processor', 'users' folder's 'serializers'
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
+from django.core import signing
+from django.core.exceptions import ValidationError
 from django.db.models import Q
 import logging
 from rest_framework.generics import ( ListCreateAPIView, RetrieveUpdateDestroyAPIView )
@@ -30,20 +33,63 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import JSONParser
 from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.settings import api_settings
 
+from celery.result import AsyncResult
+
+from ..models import OptimizationSession
 from ..models import Workspace
+from ..tasks import from_stored_result
+from ..tasks import process_view_task
+from .serializers import OptimizationSessionSerializer
 from .serializers import WorkspaceSerializer
 from .serializers import WorkspaceSimpleSerializer
 from .permissions import IsOwnerOrReadOnly
+from .renderers import FramesRenderer
 from .utils.processor import process_view
+from .utils.cache import result_cache
+from .utils import bo_session
+from .utils.dataset import get_datasource
+from .utils.dataset import load_dataset
+from .utils.onehot_encoding import get_onehot_frame
+from datamanagement.models import DataSource
+from datamanagement.models import create_datasource_from_dataframe
 from users.serializers import CustomUserDetailsSerializer
 
+import pandas as pd
+import rules
 import sys
 
 logger = logging.getLogger(__name__)
 
 #-------------------------------------------------------------------------------------------------
 
+# Salt of the signed ids of component jobs
+JOB_ID_SALT = 'analysis.view-job'
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def check_data_source_access(request):
+    """Raise NotFound/PermissionDenied if the request refers to a data source ('dataSource')
+    that does not exist or that the user may not read.
+    """
+    reference = request.data.get('dataSource', None)
+    if reference is None:
+        return
+
+    try:
+        target = get_datasource(reference)
+    except (DataSource.DoesNotExist, ValidationError):
+        raise NotFound('The data source is not found.')
+
+    if not rules.test_rule('can_read_datasource', request.user, target):
+        raise PermissionDenied('Access denied.')
+#-------------------------------------------------------------------------------------------------
+
 
 #-------------------------------------------------------------------------------------------------
 class WorkspaceFilteredLookupMixin(object):
@@ -231,6 +277,41 @@ class WorkspaceAPIViewSet(
 #-------------------------------------------------------------------------------------------------
 
 
+#-------------------------------------------------------------------------------------------------
+def get_job_id(job, user):
+    """Signed id of a component job, that only the user who submitted the job can use."""
+    return signing.dumps([job.id, str(user.pk)], salt=JOB_ID_SALT)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_job(request, job_id):
+    """The celery job of a signed job id, raising NotFound for the jobs of other users."""
+    try:
+        task_id, owner = signing.loads(job_id, salt=JOB_ID_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise NotFound('The job is not found.')
+
+    if owner != str(request.user.pk):
+        raise NotFound('The job is not found.')
+
+    return AsyncResult(task_id, app=process_view_task.app)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_job_status(job, job_id):
+    reply = {'jobId': job_id, 'status': job.state}
+
+    if job.state == 'PROGRESS' and isinstance(job.info, dict):
+        reply['progress'] = job.info
+    elif job.state == 'FAILURE':
+        reply['detail'] = str(job.info)
+
+    return reply
+#-------------------------------------------------------------------------------------------------
+
+
 #-------------------------------------------------------------------------------------------------
 class ViewUpdateAPIs(APIView):
 
@@ -238,6 +319,8 @@ class ViewUpdateAPIs(APIView):
         permissions.AllowAny,
     )
     parser_classes = (JSONParser,)
+    # 'Accept: application/vnd.mads.frames' sends the numeric arrays as binary buffers
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (FramesRenderer,)
 
     def handle_exception(self, exc):
         try:
@@ -251,9 +334,25 @@ class ViewUpdateAPIs(APIView):
         return Response({'test': 'bbb'})
 
 
+    def check_data_source_access(self, request):
+        check_data_source_access(request)
+
+
     def post(self, request):
         result = {'status': 'success' }
 
+        self.check_data_source_access(request)
+
+        # long running components can be computed by a celery worker instead, the client then
+        # polls 'analysis-view-job' and fetches 'analysis-view-job-result' when it is done
+        if request.data.get('async', False):
+            if not request.user.is_authenticated:
+                self.permission_denied(
+                    request, message='Components can only be run as jobs when logged in.')
+            job = process_view_task.delay(request.data)
+            return Response(get_job_status(job, get_job_id(job, request.user)),
+                            status=status.HTTP_202_ACCEPTED)
+
         result = process_view(request.data)
 
         if ('status' in result.keys() and result['status'].startswith('error')):
@@ -263,6 +362,197 @@ class ViewUpdateAPIs(APIView):
 #-------------------------------------------------------------------------------------------------
 
 
+#-------------------------------------------------------------------------------------------------
+class ViewJobStatusAPIView(APIView):
+    """
+    Return the state of a component job that was submitted with "async": true.
+    """
+
+    permission_classes = (
+        permissions.IsAuthenticated,
+    )
+
+    def get(self, request, job_id):
+        job = get_job(request, job_id)
+        return Response(get_job_status(job, job_id))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class ViewJobResultAPIView(APIView):
+    """
+    Return the result of a finished component job, or its state if it is not finished yet.
+    """
+
+    permission_classes = (
+        permissions.IsAuthenticated,
+    )
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (FramesRenderer,)
+
+    def get(self, request, job_id):
+        job = get_job(request, job_id)
+
+        if not job.ready():
+            return Response(get_job_status(job, job_id), status=status.HTTP_202_ACCEPTED)
+
+        if job.failed():
+            reply = get_job_status(job, job_id)
+            reply['status'] = 'error: ' + reply.pop('detail', '')
+            return Response(reply, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        result = from_stored_result(job.result)
+        if (isinstance(result, dict) and str(result.get('status', '')).startswith('error')):
+            return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response(result)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class ViewCacheStatsAPIView(APIView):
+    """
+    Return the hit/miss counts of the analysis result cache of this server process,
+    or clear the cache (admin users only).
+    """
+
+    permission_classes = (
+        permissions.IsAdminUser,
+    )
+
+    def get(self, request):
+        return Response(result_cache.stats())
+
+
+    def delete(self, request):
+        result_cache.clear()
+        return Response(result_cache.stats())
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class OnehotDataSourceAPIView(APIView):
+    """
+    Store the one-hot encoding of the posted table ('data' columns or a 'dataSource' reference)
+    as a new data source of the user, named 'name'.
+    """
+
+    permission_classes = (
+        permissions.IsAuthenticated,
+    )
+    parser_classes = (JSONParser,)
+
+    def post(self, request):
+        check_data_source_access(request)
+
+        view_settings = request.data['view']['settings']
+        reference = request.data.get('dataSource', None)
+        try:
+            if reference is not None:
+                df = load_dataset(reference)
+            else:
+                df = pd.DataFrame(request.data['data'])
+            onehot = get_onehot_frame(df, view_settings['featureColumns'],
+                                      view_settings['dropFirst'])
+        except (KeyError, TypeError, ValueError) as e:
+            return Response({'status': 'error: ' + str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        name = request.data.get('name') or 'One-hot encoding'
+        try:
+            datasource = create_datasource_from_dataframe(onehot, request.user, name)
+        except ValueError as e:
+            return Response({'status': 'error: ' + str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'id': datasource.id, 'name': datasource.name,
+                         'columns': list(onehot.columns)}, status=status.HTTP_201_CREATED)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class OptimizationSessionAPIViewSet(viewsets.ModelViewSet):
+    """
+    Bayesian optimization sessions of workspaces. `create` fits the Gaussian process on the
+    initial observations ('data' columns or a 'dataSource' reference), `observe` adds new
+    observations without a full refit and `suggest` returns the next candidates.
+    """
+    queryset = OptimizationSession.objects.all()
+    serializer_class = OptimizationSessionSerializer
+    permission_classes = ( IsOwnerOrReadOnly, )
+
+    def get_queryset(self):
+        u = self.request.user
+        if u.is_anonymous:
+            return OptimizationSession.objects.filter(
+                accessibility=OptimizationSession.ACCESSIBILITY_PUBLIC)
+
+        return OptimizationSession.objects.filter(
+            Q(owner=u) |
+            Q(accessibility=OptimizationSession.ACCESSIBILITY_PUBLIC) |
+            (
+                Q(accessibility=OptimizationSession.ACCESSIBILITY_INTERNAL) &
+                (Q(shared_users__in=[u]) | Q(shared_groups__in=list(u.groups.all())))
+            )
+        ).distinct()
+
+
+    def get_observations(self, request):
+        check_data_source_access(request)
+        if request.data.get('dataSource') is not None:
+            return load_dataset(request.data['dataSource'])
+        # 'data' is the list of records the client holds, or a dict of columns
+        return pd.DataFrame(request.data['data'])
+
+
+    def perform_create(self, serializer):
+        workspace = serializer.validated_data['workspace']
+        if not rules.test_rule('can_edit_workspace', self.request.user, workspace):
+            raise PermissionDenied('Access denied.')
+
+        state = bo_session.create_state(serializer.validated_data['settings'],
+                                        self.get_observations(self.request))
+        session = serializer.save(owner=self.request.user)
+        bo_session.set_session_state(session, state)
+        session.save()
+
+
+    def create(self, request, *args, **kwargs):
+        try:
+            return super().create(request, *args, **kwargs)
+        except (KeyError, ValueError) as e:
+            return Response({'status': 'error: ' + str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+    @action(detail=True, methods=['post'])
+    def observe(self, request, *args, **kwargs):
+        session = self.get_object()
+        state = bo_session.get_session_state(session)
+        try:
+            refitted = bo_session.observe(state, session.settings, self.get_observations(request),
+                                          request.data.get('refit', False))
+        except (KeyError, ValueError) as e:
+            return Response({'status': 'error: ' + str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        bo_session.set_session_state(session, state)
+        session.save()
+
+        return Response({'refitted': refitted, 'observation_count': session.observation_count})
+
+
+    @action(detail=True)
+    def suggest(self, request, *args, **kwargs):
+        session = self.get_object()
+        try:
+            result = bo_session.suggest(
+                bo_session.get_session_state(session), session.settings,
+                count=int(request.query_params.get('count', 5)),
+                acquisition=request.query_params.get('acquisition')
+            )
+        except (KeyError, ValueError) as e:
+            return Response({'status': 'error: ' + str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result)
+#-------------------------------------------------------------------------------------------------
+
+
 #-------------------------------------------------------------------------------------------------
 class CurrentUserView(APIView):
     permission_classes = (
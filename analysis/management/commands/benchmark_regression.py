@@ -0,0 +1,95 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) custom management command (for the pip command line) that
+#              benchmarks the predictions of the 'regression' component
+# ------------------------------------------------------------------------------------------------
+# Notes: Compares predicting the train and test split one row at a time with one batched call per
+#        split, for every regression method supported by the 'analysis' page, on generated data.
+#        Run as: python manage.py benchmark_regression --rows 2000 --features 8
+# ------------------------------------------------------------------------------------------------
+# References: Django platform libraries, time, numpy and sklearn libs and 'analysis' folder's
+#             'api' subfolder's 'utils'
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from django.core.management.base import BaseCommand
+
+import time
+
+import numpy as np
+from sklearn.datasets import make_regression
+from sklearn.model_selection import train_test_split
+
+from analysis.api.utils.regression import create_regressor
+
+#-------------------------------------------------------------------------------------------------
+
+# The supported methods with the arguments the regression component would send for them
+methods = {
+    'Linear': {},
+    'Lasso': {},
+    'SVR': {'arg1': 1.0, 'arg2': 0.1},
+    'RandomForest': {'arg1': 0, 'arg2': 100},
+    'ExtraTrees': {'arg1': 0, 'arg2': 100},
+    'MLP': {'arg1': 0, 'arg2': 200},
+    'KernelRidge': {'arg1': 1.0},
+}
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def time_per_row(model, X):
+    start = time.perf_counter()
+    y = [model.predict([x])[0] for x in X]
+    return time.perf_counter() - start, np.asarray(y)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def time_batched(model, X):
+    start = time.perf_counter()
+    y = model.predict(X)
+    return time.perf_counter() - start, y
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class Command(BaseCommand):
+    help = 'Compare per-row and batched prediction latency of the regression methods.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--features', type=int, default=8)
+        parser.add_argument('--test-size', type=float, default=0.2)
+        parser.add_argument('--methods', nargs='*', default=list(methods))
+
+    def handle(self, *args, **options):
+        X, y = make_regression(n_samples=options['rows'], n_features=options['features'],
+                               noise=0.1, random_state=0)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=options['test_size'],
+                                                            random_state=2)
+        X_all = np.concatenate([X_train, X_test])
+
+        self.stdout.write('{:<14}{:>12}{:>12}{:>10}'.format(
+            'method', 'per-row [s]', 'batched [s]', 'speedup'))
+        for method in options['methods']:
+            model = create_regressor(method, methods[method])
+            model.fit(X_train, y_train)
+
+            per_row, y_per_row = time_per_row(model, X_all)
+            batched, y_batched = time_batched(model, X_all)
+            if not np.allclose(y_per_row, y_batched):
+                self.stderr.write(method + ': the batched predictions differ from the per-row ones')
+
+            self.stdout.write('{:<14}{:>12.4f}{:>12.4f}{:>9.1f}x'.format(
+                method, per_row, batched, per_row / batched if batched > 0 else float('inf')
+            ))
+#-------------------------------------------------------------------------------------------------
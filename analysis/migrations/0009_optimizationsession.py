@@ -0,0 +1,42 @@
+# Generated by Django 3.2.18 on 2026-10-18 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import jsonfield.fields
+import model_utils.fields
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analysis', '0008_auto_20230915_1659'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptimizationSession',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, help_text='Unique ID for this particular resource', primary_key=True, serialize=False)),
+                ('name', models.CharField(help_text='Enter the name of the resource', max_length=200)),
+                ('description', models.TextField(blank=True, help_text='Enter a brief description of the resource', max_length=1000)),
+                ('accessibility', models.CharField(choices=[('pri', 'Private'), ('int', 'Internal'), ('pub', 'Public')], default='pri', max_length=3)),
+                ('settings', jsonfield.fields.JSONField(null=True)),
+                ('state', models.BinaryField(editable=False, null=True)),
+                ('observation_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('owner', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('shared_groups', models.ManyToManyField(blank=True, related_name='bo_shared_groups', to='auth.Group')),
+                ('shared_users', models.ManyToManyField(blank=True, related_name='bo_shared_users', to=settings.AUTH_USER_MODEL)),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='optimization_sessions', to='analysis.workspace')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -75,3 +75,25 @@ class ComponentInstance(OwnedResourceModel):
     componentType = models.ForeignKey('VisComponent', on_delete=models.SET_NULL, null=True)
     contents = JSONField(null=True)
 #-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class OptimizationSession(OwnedResourceModel):
+    """Bayesian optimization session of a workspace. 'settings' holds the Gaussian process
+    component settings (feature columns with bounds, target, kernel, acquisition) and 'state'
+    the fitted process as npz arrays (see get_session_state in analysis.api.utils.bo_session).
+    """
+    shared_users = models.ManyToManyField(
+        'users.User', blank=True,
+        related_name='bo_shared_users'
+    )
+    shared_groups = models.ManyToManyField(
+        Group, blank=True, related_name='bo_shared_groups'
+    )
+    workspace = models.ForeignKey('Workspace', on_delete=models.CASCADE,
+                                  related_name='optimization_sessions')
+    settings = JSONField(null=True)
+    state = models.BinaryField(null=True, editable=False)
+    # kept next to the state, so listing sessions does not load every process
+    observation_count = models.PositiveIntegerField(default=0, editable=False)
+#-------------------------------------------------------------------------------------------------
@@ -0,0 +1,62 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) Provided celery tasks for the 'Analysis' page
+# ------------------------------------------------------------------------------------------------
+# Notes: This is one part of the serverside module that allows long running components of the
+#        'analysis' interface of the website to be computed outside of the web worker.
+# ------------------------------------------------------------------------------------------------
+# References: celery, base64, logging libs and 'analysis' folder's 'api' subfolder's 'renderers'
+#             and 'utils'
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from celery import shared_task
+
+from .api.renderers import decode_frames
+from .api.renderers import encode_frames
+from .api.utils.execution import progress_reporter
+from .api.utils.processor import process_view
+
+import base64
+
+import logging
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def to_stored_result(result):
+    """Encode a component result for the (json) result backend. The result is kept in the binary
+    'frames' format (see api/renderers.py), so that its numpy arrays keep their types and can be
+    sent as binary buffers again.
+    """
+    return {'frames': base64.b64encode(encode_frames(result)).decode('ascii')}
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def from_stored_result(stored):
+    """Inverse of to_stored_result."""
+    return decode_frames(base64.b64decode(stored['frames']))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+@shared_task(bind=True)
+def process_view_task(self, data):
+    logger.info('process view ' + str(data['view']['type']) + ' as job ' + str(self.request.id))
+
+    # long components (e.g. embeddings) report their stage, see get_job_status
+    with progress_reporter(lambda info: self.update_state(state='PROGRESS', meta=info)):
+        result = process_view(data)
+
+    return to_stored_result(result)
+#-------------------------------------------------------------------------------------------------
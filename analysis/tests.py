@@ -16,13 +16,680 @@
 #-------------------------------------------------------------------------------------------------
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from unittest import mock
+
+import json
+import numpy as np
+import os
+import subprocess
+import sys
+import pandas as pd
+from scipy.stats import norm
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.model_selection import train_test_split
+
+from analysis.api.renderers import decode_frames
+from analysis.api.renderers import encode_frames
+from analysis.api.serializers import OptimizationSessionSerializer
+from analysis.api.utils.acquisition import expected_improvement
+from analysis.api.utils.acquisition import top_k
+from analysis.api.utils.bo_session import IncrementalGP
+from analysis.api.utils.cache import ResultCache
+from analysis.api.utils.clustering import fit_predict_clusters
+from analysis.api.utils.clustering import get_clusters
+from analysis.api.utils.gaussian_process import get_kernel
+from analysis.api.utils.histogram import get_histograms
+from analysis.api.utils.onehot_encoding import get_onehot_frame
+from analysis.api.utils.onehot_encoding import get_sparse_onehot
+from analysis.api.utils.pie import get_pie
+from analysis.api.utils.dataset import load_dataset
+from analysis.api.utils.processor import process_view
+from analysis.api.utils.statistics import get_statistics
+from analysis.api.utils import bo_session
+from analysis.api.utils import embedding
+from analysis.api.utils import feature_importance
+from analysis.api.utils import gaussian_process
+from analysis.api.utils import regression
+from analysis.api.utils import scatter3D
+from analysis.models import OptimizationSession
+from analysis.models import Workspace
+from analysis.tasks import from_stored_result
+from analysis.tasks import to_stored_result
+from common.sketches import sketch_frame
+from datamanagement.models import DataSource
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class DatasetReferenceTests(SimpleTestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'a': [1.0, 2.0, 3.0, 4.0],
+            'b': [10.0, 20.0, None, 40.0],
+            'c': ['x', 'y', 'x', 'z'],
+        })
+        patcher = mock.patch('analysis.api.utils.dataset.get_dataframe', return_value=self.df)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_projection(self):
+        df = load_dataset({'id': 'x', 'columns': ['c', 'a']}, datasource=object())
+        self.assertEqual(list(df.columns), ['c', 'a'])
+        self.assertEqual(len(df), 4)
+
+    def test_rows_and_filter(self):
+        reference = {
+            'id': 'x',
+            'rows': [3, 1, 0],
+            'filter': [{'column': 'b', 'op': 'notnull'}, {'column': 'a', 'op': '>=', 'value': 2}],
+        }
+        df = load_dataset(reference, datasource=object())
+        self.assertEqual(df['a'].tolist(), [4.0, 2.0])
+        self.assertEqual(df.index.tolist(), [0, 1])
+
+    def test_unknown_column(self):
+        with self.assertRaises(ValueError):
+            load_dataset({'id': 'x', 'columns': ['nope']}, datasource=object())
+
+    def test_unsupported_component(self):
+        with self.assertRaises(ValueError):
+            process_view({'view': {'type': 'bar', 'settings': {}}, 'dataSource': {'id': 'x'}})
+
+    @mock.patch('analysis.api.utils.statistics.get_datasource', return_value=object())
+    @mock.patch('analysis.api.utils.dataset.get_datasource', return_value=object())
+    def test_statistics_exact_unless_approximate(self, *mocks):
+        sketches = sketch_frame(self.df)
+        with mock.patch('analysis.api.utils.statistics.get_sketches', return_value=sketches) as get:
+            exact = get_statistics({
+                'view': {'type': 'statistics', 'settings': {'featureColumns': ['a']}},
+                'dataSource': {'id': 'x'},
+            })
+            self.assertEqual(get.call_count, 0)
+            approximate = get_statistics({
+                'view': {'type': 'statistics', 'settings': {'featureColumns': ['a'], 'mode': 'approximate'}},
+                'dataSource': {'id': 'x'},
+            })
+            self.assertEqual(get.call_count, 1)
+
+        self.assertNotIn('approximate', exact)
+        self.assertEqual([r['a'] for r in exact['data']], self.df['a'].describe().round(5).tolist())
+        self.assertTrue(approximate['approximate'])
+#-------------------------------------------------------------------------------------------------
+
 
 #-------------------------------------------------------------------------------------------------
+class ResultCacheTests(SimpleTestCase):
+
+    def get_data(self, bins, rows):
+        return {'view': {'type': 'histogram', 'settings': {'bins': bins, 'targetColumns': ['a']}},
+                'data': rows}
+
+    def test_key_is_stable(self):
+        cache = ResultCache({'BACKEND': 'locmem'})
+        a = cache.get_key(self.get_data(10, [{'a': 1, 'b': 2}]))
+        b = cache.get_key({'data': [{'b': 2, 'a': 1}],
+                           'view': {'settings': {'targetColumns': ['a'], 'bins': 10}, 'type': 'histogram'}})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, cache.get_key(self.get_data(11, [{'a': 1, 'b': 2}])))
+        self.assertNotEqual(a, cache.get_key(self.get_data(10, [{'a': 2, 'b': 2}])))
 
+    def test_lru_eviction_and_stats(self):
+        cache = ResultCache({'BACKEND': 'locmem', 'MAX_ENTRIES': 2})
+        cache.set('k1', {'v': 1})
+        cache.set('k2', {'v': 2})
+        self.assertEqual(cache.get('k1'), {'v': 1})
+        cache.set('k3', {'v': 3})
+        self.assertIsNone(cache.get('k2'))
+        self.assertEqual(cache.get('k3'), {'v': 3})
 
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 2)
 #-------------------------------------------------------------------------------------------------
 
-# Create your tests here.
 
 #-------------------------------------------------------------------------------------------------
+class ViewJobTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(email='owner@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.data = {
+            'async': True,
+            'view': {'type': 'statistics', 'settings': {'featureColumns': ['a']}},
+            'data': [{'a': 1.0}, {'a': 2.0}, {'a': 3.0}],
+        }
+
+    def test_async_view_update(self):
+        response = self.client.post(reverse('analysis:analysis-view-update'), self.data, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['jobId']
+
+        response = self.client.get(reverse('analysis:analysis-view-job', kwargs={'job_id': job_id}))
+        self.assertEqual(response.data['status'], 'SUCCESS')
+
+        response = self.client.get(reverse('analysis:analysis-view-job-result', kwargs={'job_id': job_id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['columns'], ['Stats', 'a'])
+
+    def test_jobs_are_private(self):
+        response = self.client.post(reverse('analysis:analysis-view-update'), self.data, format='json')
+        job_id = response.data['jobId']
+
+        other = APIClient()
+        other.force_authenticate(user=get_user_model().objects.create(email='other@example.com'))
+        for name in ('analysis:analysis-view-job', 'analysis:analysis-view-job-result'):
+            self.assertEqual(other.get(reverse(name, kwargs={'job_id': job_id})).status_code, 404)
+            self.assertIn(APIClient().get(reverse(name, kwargs={'job_id': job_id})).status_code, (401, 403))
+
+        response = APIClient().post(reverse('analysis:analysis-view-update'), self.data, format='json')
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_stored_result_keeps_arrays(self):
+        result = {'x': np.arange(3, dtype='int16'), 'names': ['a', 'b']}
+        stored = from_stored_result(json.loads(json.dumps(to_stored_result(result))))
+        self.assertEqual(stored['x'].dtype, np.int16)
+        self.assertEqual(stored['names'], ['a', 'b'])
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class CeleryAppTests(SimpleTestCase):
+
+    def test_package_import_keeps_the_settings_default_open(self):
+        # wsgi.py sets its (production) default after the package, and with it the celery app,
+        # has been imported
+        env = {k: v for k, v in os.environ.items() if k != 'DJANGO_SETTINGS_MODULE'}
+        code = 'import os, madsapp; print(os.environ.get("DJANGO_SETTINGS_MODULE"))'
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, env=env, capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(output.strip(), 'None')
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class RegressionTests(SimpleTestCase):
+
+    def get_request(self, method, method_args, cv_method, cv_arg, n_jobs):
+        X = np.random.default_rng(0).normal(size=(80, 3))
+        data = {c: X[:, i].tolist() for i, c in enumerate("abc")}
+        data["y"] = (X @ [1.0, -2.0, 0.5]).tolist()
+        return {
+            "view": {"settings": {"featureColumns": ["a", "b", "c"], "targetColumn": "y",
+                                  "method": method, "methodArguments": method_args,
+                                  "cvmethod": cv_method, "cvmethodArg": cv_arg, "nJobs": n_jobs}},
+            "data": data,
+        }
+
+    def test_cross_validation_does_not_depend_on_n_jobs(self):
+        results = [regression.get_regression(
+            self.get_request("RandomForest", {"arg1": 0, "arg2": 10}, "KFold", 4, n_jobs))[0]
+            for n_jobs in (1, 3)]
+
+        for key in ("test_r2", "test_mae"):
+            np.testing.assert_allclose(results[0]["scores"][key], results[1]["scores"][key])
+        np.testing.assert_allclose(results[0]["d1"]["y--Predicted"],
+                                   results[1]["d1"]["y--Predicted"])
+
+    def test_batched_predictions_match_per_row_predictions(self):
+        request = self.get_request("SVR", {"arg1": 1.0, "arg2": 0.1}, "TrainTestSplit", 0.25, 2)
+        result, reg = regression.get_regression(request)
+
+        df = pd.DataFrame(request["data"])
+        X_train, X_test, _, _ = train_test_split(df[["a", "b", "c"]].values, df["y"].values,
+                                                 test_size=0.25, random_state=2)
+        for X, part in ((X_train, "d1"), (X_test, "d2")):
+            per_row = [reg.predict([row])[0] for row in X]
+            self.assertEqual(result[part]["y--Predicted"].dtype, np.float64)
+            np.testing.assert_allclose(result[part]["y--Predicted"], per_row)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class AcquisitionTests(SimpleTestCase):
+
+    def test_expected_improvement(self):
+        mean = np.array([0.5, 1.5, 2.0, 1.0])
+        std = np.array([0.2, 0.3, 0.0, 1.0])
+        ei = expected_improvement(mean, std, best=1.0, maximize=True)
+        z = (mean[[0, 1, 3]] - 1.0) / std[[0, 1, 3]]
+        expected = std[[0, 1, 3]] * (z * norm.cdf(z) + norm.pdf(z))
+        np.testing.assert_allclose(ei[[0, 1, 3]], expected)
+        self.assertEqual(ei[2], 0.0)
+        self.assertGreater(ei[1], ei[0])
+
+        ei = expected_improvement(mean, std, best=1.0, maximize=False)
+        self.assertGreater(ei[0], ei[1])
+
+    def test_top_k(self):
+        scores = np.array([3.0, 9.0, 1.0, 7.0, 5.0])
+        self.assertEqual(top_k(scores, 3).tolist(), [1, 3, 4])
+        self.assertEqual(top_k(scores, 10).tolist(), [1, 3, 4, 0, 2])
+        self.assertEqual(len(top_k(scores, 0)), 0)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class GaussianProcessCandidateTests(SimpleTestCase):
+
+    def setUp(self):
+        X = np.random.default_rng(0).uniform(size=(20, 3))
+        kernel = get_kernel('ConstantKernel() * RBF() + WhiteKernel()', 3)
+        self.model = GaussianProcessRegressor(kernel)
+        self.model.fit(X, X.sum(axis=1))
+
+    def get_acquisition(self, pred, std):
+        return pred + std, pred
+
+    def test_chunked_prediction_matches_one_prediction(self):
+        axes = [np.linspace(0, 1, 4), np.linspace(0, 1, 5), np.linspace(0, 1, 3)]
+        grid = np.column_stack([g.reshape(-1) for g in np.meshgrid(*axes)])
+        pred, std = self.model.predict(grid, return_std=True)
+
+        X, kept_pred, kept_std, score, _ = gaussian_process.predict_candidates(
+            self.model, gaussian_process.iter_grid_chunks(axes, 7), self.get_acquisition, 10)
+
+        index = top_k(pred + std, 10)
+        np.testing.assert_allclose(X, grid[index])
+        np.testing.assert_allclose(kept_pred, pred[index])
+        np.testing.assert_allclose(kept_std, std[index])
+
+    def test_no_candidates_give_empty_arrays(self):
+        X, pred, std, score, EI = gaussian_process.predict_candidates(
+            self.model, iter([]), self.get_acquisition, 10)
+        self.assertEqual(X.shape, (0, 3))
+        self.assertEqual([len(a) for a in (pred, std, score, EI)], [0, 0, 0, 0])
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class IncrementalGPTests(SimpleTestCase):
+
+    def test_append_matches_full_factorization(self):
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 1, (30, 2))
+        y = np.sin(3 * X[:, 0]) + X[:, 1] + rng.normal(0, 0.05, 30)
+        gp = IncrementalGP.fit(get_kernel('ConstantKernel() * RBF() + WhiteKernel()', 2), X[:20], y[:20])
+
+        gp.append(X[20:], y[20:])
+        full = IncrementalGP(gp.kernel_, X, y)
+        np.testing.assert_allclose(gp.L, full.L, atol=1e-6)
+
+        X_test = rng.uniform(0, 1, (5, 2))
+        mean, std = gp.predict(X_test, return_std=True)
+        full_mean, full_std = full.predict(X_test, return_std=True)
+        np.testing.assert_allclose(mean, full_mean, atol=1e-6)
+        np.testing.assert_allclose(std, full_std, atol=1e-6)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class OptimizationSessionTests(TestCase):
+
+    def create_session(self, workspace):
+        session_settings = {'targetColumn': 'y', 'kernel': 'ConstantKernel() * RBF() + WhiteKernel()'}
+        session = OptimizationSession(name='s', workspace=workspace, settings=session_settings)
+        kernel = get_kernel(session_settings['kernel'], 1)
+        gp = IncrementalGP.fit(kernel, np.array([[0.0], [1.0], [2.0]]), np.array([0.0, 1.0, 0.5]))
+        bo_session.set_session_state(session, {'gp': gp, 'sinceRefit': 1})
+        session.save()
+        return session, gp
+
+    def test_state_round_trip(self):
+        session, gp = self.create_session(Workspace.objects.create(name='a'))
+        session.refresh_from_db()
+
+        state = bo_session.get_session_state(session)
+        self.assertEqual(state['sinceRefit'], 1)
+        X = np.linspace(0, 2, 7)[:, None]
+        np.testing.assert_allclose(state['gp'].predict(X, return_std=True), gp.predict(X, return_std=True))
+
+    def test_unknown_acquisition_is_rejected(self):
+        session, gp = self.create_session(Workspace.objects.create(name='a'))
+        session.settings['featureColumns'] = [{'column': 'x', 'min': 0, 'max': 2}]
+        with self.assertRaisesMessage(ValueError, 'unknown acquisition function XYZ'):
+            bo_session.suggest({'gp': gp}, session.settings, acquisition='XYZ')
+
+    def test_create_and_observe_records(self):
+        user = get_user_model().objects.create(email='owner@example.com')
+        workspace = Workspace.objects.create(name='a', owner=user)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post(reverse('analysis:bo-session-api-list'), {
+            'name': 's', 'workspace': str(workspace.id),
+            'settings': {'featureColumns': [{'column': 'x', 'min': 0, 'max': 3}], 'targetColumn': 'y',
+                         'kernel': 'ConstantKernel() * RBF() + WhiteKernel()'},
+            'data': [{'x': 0.0, 'y': 0.0}, {'x': 1.0, 'y': 1.0}, {'x': 2.0, 'y': 0.5}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['observation_count'], 3)
+
+        url = reverse('analysis:bo-session-api-observe', kwargs={'pk': response.data['id']})
+        response = client.post(url, {'data': [{'x': 3.0, 'y': 0.2}]}, format='json')
+        self.assertEqual(response.data['observation_count'], 4)
+
+        response = client.post(url, {'data': [{'y': 0.2}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_update_keeps_workspace_and_settings(self):
+        workspace, other = Workspace.objects.create(name='a'), Workspace.objects.create(name='b')
+        session, _ = self.create_session(workspace)
+
+        serializer = OptimizationSessionSerializer(
+            session, data={'name': 't', 'workspace': other.id, 'settings': {}}, partial=True
+        )
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+
+        session.refresh_from_db()
+        self.assertEqual((session.name, session.workspace_id), ('t', workspace.id))
+        self.assertEqual(session.settings['targetColumn'], 'y')
+        self.assertEqual(OptimizationSessionSerializer(session).data['observation_count'], 3)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class HistogramTests(SimpleTestCase):
+
+    def get_data(self, index_format):
+        rng = np.random.default_rng(0)
+        a = rng.normal(size=1000)
+        a[::7] = np.nan
+        b = rng.integers(0, 5, 1000).astype("float64")
+        return {
+            "data": {"a": a.tolist(), "b": b.tolist()},
+            "view": {"settings": {"targetColumns": ["a", "b"], "bins": 10, "skewness": False, "indexFormat": index_format}},
+        }, {"a": a, "b": b}
+
+    def test_matches_numpy(self):
+        data, columns = self.get_data("lists")
+        result = get_histograms(data)
+        for i, name in enumerate(["a", "b"]):
+            x = columns[name][~np.isnan(columns[name])]
+            hist, edges = np.histogram(x, bins=10)
+            np.testing.assert_array_equal(result["data"][i]["hist"], hist)
+            np.testing.assert_allclose(result["data"][i]["binEdges"], edges)
+            for j, ids in enumerate(result["data"][i]["indices"]):
+                values = columns[name][ids]
+                self.assertTrue(np.all(values >= edges[j]))
+                self.assertTrue(np.all(values <= edges[j + 1]) if j == 9 else np.all(values < edges[j + 1]))
+
+    def test_infinite_values_are_rejected(self):
+        data, _ = self.get_data("lists")
+        data["data"]["b"][3] = np.inf
+        with self.assertRaises(ValueError):
+            get_histograms(data)
+
+    def test_csr(self):
+        lists = get_histograms(self.get_data("lists")[0])["data"][0]
+        csr = get_histograms(self.get_data("csr")[0])["data"][0]
+        self.assertEqual(csr["indexIds"].dtype, np.int32)
+        for j, ids in enumerate(lists["indices"]):
+            offsets = csr["indexOffsets"]
+            self.assertEqual(csr["indexIds"][offsets[j]:offsets[j + 1]].tolist(), ids.tolist())
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class PieTests(SimpleTestCase):
+
+    def test_categories(self):
+        data = {"data": ["b", None, "a", "b", "Z"], "view": {"settings": {"bins": 0, "undefinedIsIncluded": True}}}
+        result = get_pie(data)
+        self.assertEqual(result["dimensions"], ["Undefined", "Z", "a", "b"])
+        self.assertEqual(list(result["values"]), [1, 1, 1, 2])
+
+    def test_bins(self):
+        data = {"data": [0.5, None, 1.5, 2.5, 0.7], "view": {"settings": {"bins": 2}}}
+        result = get_pie(data)
+        self.assertEqual(list(result["values"]), [2, 2])
+        # indices refer to the rows of the column, including the ones without value
+        self.assertEqual([ids.tolist() for ids in result["indices"]], [[0, 4], [2, 3]])
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class OnehotTests(SimpleTestCase):
+
+    def test_matches_get_dummies(self):
+        df = pd.DataFrame({"x": [1.0, 2.0, 3.0, 4.0], "c": ["b", "a", None, "b"], "d": [2, 1, 2, 3]})
+        for drop_first in (False, True):
+            expected = pd.get_dummies(df, columns=["c", "d"], drop_first=drop_first, dtype="uint8")
+            pd.testing.assert_frame_equal(get_onehot_frame(df, ["c", "d"], drop_first), expected)
+
+            sparse = get_sparse_onehot(df, ["c", "d"], drop_first)
+            self.assertEqual(sparse["columns"], list(expected.columns))
+            for e in sparse["encoded"]:
+                for i, name in enumerate(e["names"]):
+                    rows = e["indexIds"][e["indexOffsets"][i]:e["indexOffsets"][i + 1]]
+                    self.assertEqual(list(rows), list(np.flatnonzero(expected[name].to_numpy())))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class OnehotDataSourceTests(TestCase):
+
+    def test_derived_data_source_is_limited_like_uploads(self):
+        user = get_user_model().objects.create(email='owner@example.com')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        request = {
+            'name': 'encoded',
+            'view': {'settings': {'featureColumns': ['c'], 'dropFirst': False}},
+            'data': {'c': ['a', 'b', 'c'] * 20},
+        }
+        url = reverse('analysis:analysis-onehot-datasource')
+
+        response = client.post(url, request, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        field = DataSource._meta.get_field('file')
+        with mock.patch.object(field, 'max_file_size', 100):
+            response = client.post(url, request, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(DataSource.objects.filter(owner=user).count(), 1)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class FramesRendererTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        result = {
+            "cluster": np.array([0, 2, 1], dtype="int64"),
+            "grid": np.arange(6, dtype="float64").reshape(2, 3),
+            "indices": [np.array([0, 4], dtype="int32"), np.array([], dtype="int32")],
+            "mask": np.array([True, False]),
+            "columns": pd.Index(["a", "b"]),
+            "count": np.int64(3),
+            "status": "success",
+        }
+        decoded = decode_frames(encode_frames(result))
+
+        self.assertEqual(decoded["cluster"].dtype, np.int32)
+        np.testing.assert_array_equal(decoded["cluster"], result["cluster"])
+        np.testing.assert_array_equal(decoded["grid"], result["grid"])
+        self.assertEqual([list(i) for i in decoded["indices"]], [[0, 4], []])
+        np.testing.assert_array_equal(decoded["mask"], result["mask"])
+        self.assertEqual(decoded["columns"], ["a", "b"])
+        self.assertEqual((decoded["count"], decoded["status"]), (3, "success"))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class ClusteringTests(SimpleTestCase):
+
+    def get_blobs(self, n):
+        rng = np.random.default_rng(0)
+        centers = np.array([[0.0, 0.0], [10.0, 10.0], [0.0, 10.0]])
+        truth = rng.integers(0, 3, n)
+        return centers[truth] + rng.normal(scale=0.5, size=(n, 2)), truth
+
+    def test_large_data_strategies(self):
+        X, truth = self.get_blobs(3000)
+        with mock.patch("analysis.api.utils.clustering.LARGE_ROWS", 1000), \
+                mock.patch("analysis.api.utils.clustering.SAMPLE_SIZE", 500):
+            for method, engine in (("KMeans", "MiniBatchKMeans"), ("GMM", "GaussianMixture (sampled)")):
+                labels, used = fit_predict_clusters(X, method, 3, random_state=1)
+                self.assertEqual((used, labels.dtype), (engine, np.int8))
+                # the same partition as the generating centers, up to the numbering
+                self.assertEqual(len(set(zip(labels, truth))), 3)
+
+    def test_seed_is_deterministic(self):
+        X, _ = self.get_blobs(300)
+        a, _ = fit_predict_clusters(X, "KMeans", 4, random_state=7)
+        b, _ = fit_predict_clusters(X, "KMeans", 4, random_state=7)
+        np.testing.assert_array_equal(a, b)
+
+    def test_sweep(self):
+        X, _ = self.get_blobs(600)
+        data = {
+            "data": pd.DataFrame(X, columns=["a", "b"]),
+            "view": {"settings": {"visType": "Bar Chart", "method": "KMeans", "numberOfClusters": 3,
+                                  "featureColumns": ["a", "b"], "sweep": True, "maxClusters": 6, "nJobs": 1}},
+        }
+        result = get_clusters(data)
+
+        self.assertEqual([s["k"] for s in result["sweep"]], [2, 3, 4, 5, 6])
+        self.assertEqual(len(result["labels"]), 5)
+        self.assertEqual(result["bestK"], 3)
+        inertia = [s["inertia"] for s in result["sweep"]]
+        self.assertEqual(inertia, sorted(inertia, reverse=True))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class Scatter3DTests(SimpleTestCase):
+
+    def get_request(self, X, preprocessing=True):
+        return {
+            "data": {c: X[:, i].tolist() for i, c in enumerate("abcde")},
+            "view": {"settings": {"method": "PCA", "featureColumns": list("abcde"),
+                                  "preprocessingEnabled": preprocessing, "preprocMethod": "StandardScaling"}},
+        }
+
+    def test_incremental_matches_full_pca(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(2000, 5)) @ np.diag([5.0, 3.0, 2.0, 0.5, 0.1])
+        full = scatter3D.get_scatter3D(self.get_request(X, False))
+        with mock.patch.object(scatter3D, "INCREMENTAL_ROWS", 100), \
+                mock.patch.object(scatter3D, "CHUNK_SIZE", 300):
+            scatter3D._projections.clear()
+            incremental = scatter3D.get_scatter3D(self.get_request(X, False))
+
+        self.assertEqual(full["x"].dtype, np.float32)
+        for c in "xyz":
+            # the sign of a principal component is arbitrary
+            a, b = np.asarray(full[c], dtype="float64"), np.asarray(incremental[c], dtype="float64")
+            self.assertAlmostEqual(abs(np.corrcoef(a, b)[0, 1]), 1.0, places=4)
+
+    def test_projection_is_cached(self):
+        X = np.random.default_rng(1).normal(size=(100, 5))
+        scatter3D._projections.clear()
+        with mock.patch.object(scatter3D, "fit_projection", wraps=scatter3D.fit_projection) as fit:
+            scatter3D.get_scatter3D(self.get_request(X))
+            scatter3D.get_scatter3D(self.get_request(X))
+        self.assertEqual(fit.call_count, 1)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class EmbeddingTests(SimpleTestCase):
+
+    def test_neighbor_graph_is_reused(self):
+        X = np.random.default_rng(0).normal(size=(120, 4))
+        embedding._graphs.clear()
+        embedding._embeddings.clear()
+
+        with mock.patch.object(embedding, "NearestNeighbors", wraps=embedding.NearestNeighbors) as nn:
+            for view_settings in ({"perplexity": 5}, {"perplexity": 10}):
+                x, y, z = embedding.get_embedding("key", X, "t-SNE", view_settings)
+            for view_settings in ({"nNeighbors": 10, "minDist": 0.1}, {"nNeighbors": 10, "minDist": 0.5}):
+                x, y, z = embedding.get_embedding("key", X, "UMAP", view_settings)
+
+        self.assertEqual(nn.call_count, 1)
+        self.assertEqual((x.dtype, len(x)), (np.float32, 120))
+        self.assertTrue(np.isfinite(np.concatenate([x, y, z])).all())
+
+    def test_tsne_with_default_perplexity(self):
+        X = np.random.default_rng(2).normal(size=(150, 5))
+        embedding._graphs.clear()
+        embedding._embeddings.clear()
+        request = {
+            "data": {c: X[:, i].tolist() for i, c in enumerate("abcde")},
+            "view": {"settings": {"method": "t-SNE", "featureColumns": list("abcde")}},
+        }
+
+        result = scatter3D.get_scatter3D(request)
+
+        self.assertEqual(len(result["x"]), 150)
+        self.assertTrue(np.isfinite(np.concatenate([result[c] for c in "xyz"])).all())
+        self.assertEqual(result["engine"], "sklearn")
+
+    def test_umap_reports_the_engine(self):
+        with mock.patch.object(embedding, "umap", None):
+            self.assertEqual(embedding.get_embedding_engine("UMAP"), "spectral")
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class FeatureImportanceTests(SimpleTestCase):
+
+    def get_request(self, df, method):
+        return {
+            "view": {"settings": {"featureColumns": ["a", "b", "c"], "targetColumn": "y",
+                                  "importanceMethod": method, "numberOfTrees": 20, "nJobs": 2}},
+            "data": df,
+        }
+
+    def test_methods_rank_the_relevant_feature_first(self):
+        X = np.random.default_rng(0).normal(size=(300, 3))
+        df = pd.DataFrame(X, columns=["a", "b", "c"]).assign(y=3 * X[:, 0])
+        feature_importance._importances.clear()
+
+        for method in feature_importance.importance_methods:
+            result = feature_importance.get_feature_importance(self.get_request(df, method))
+            self.assertEqual(int(np.argmax(result["importance"])), 0, method)
+        self.assertEqual(len(result["importance"]), 3)
+
+    def test_contributions_do_not_depend_on_the_worker_count(self):
+        X = np.random.default_rng(2).normal(size=(120, 3))
+        y = (X[:, 0] > 0).astype(int)
+        model = feature_importance.fit_forest(X, y, 7, 1)
+        per_tree = [feature_importance.get_tree_contributions(t, X, 3) for t in model.estimators_]
+        expected = np.abs(np.mean(per_tree, axis=0)).mean(axis=(0, 2))
+
+        feature_importance._importances.clear()
+        with mock.patch.object(feature_importance, "shap", None):
+            for n_jobs in (1, 3):
+                np.testing.assert_allclose(
+                    feature_importance.get_contribution_importance(model, X, n_jobs), expected)
+            result = feature_importance.get_feature_importance(self.get_request(
+                pd.DataFrame(X, columns=["a", "b", "c"]).assign(y=y), "shap"))
+        self.assertEqual(result["engine"], "saabas")
+
+    def test_cached_per_method(self):
+        X = np.random.default_rng(1).normal(size=(100, 3))
+        df = pd.DataFrame(X, columns=["a", "b", "c"]).assign(y=(X[:, 1] > 0).astype(int))
+        feature_importance._importances.clear()
+
+        compute = feature_importance.compute_feature_importance
+        with mock.patch.object(feature_importance, "compute_feature_importance", wraps=compute) as fit:
+            first = feature_importance.get_feature_importance(self.get_request(df, "permutation"))
+            second = feature_importance.get_feature_importance(self.get_request(df, "permutation"))
+            feature_importance.get_feature_importance(self.get_request(df, "impurity"))
+
+        self.assertEqual(fit.call_count, 2)
+        np.testing.assert_array_equal(first["std"], second["std"])
+#-------------------------------------------------------------------------------------------------
@@ -32,6 +32,8 @@ from .api import views as api_views
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
 router.register(r'api/workspaces', api_views.WorkspaceAPIViewSet, basename='workspace-api')
+router.register(r'api/bo-sessions', api_views.OptimizationSessionAPIViewSet,
+                basename='bo-session-api')
 
 schema_view = get_schema_view(title='MADS-analysis API')
 
@@ -58,6 +60,28 @@ urlpatterns = [
         name='analysis-view-update'
     ),
 
+    path(
+        'api/view-jobs/<job_id>',
+        view=api_views.ViewJobStatusAPIView.as_view(),
+        name='analysis-view-job'
+    ),
+    path(
+        'api/view-jobs/<job_id>/result',
+        view=api_views.ViewJobResultAPIView.as_view(),
+        name='analysis-view-job-result'
+    ),
+    path(
+        'api/view-cache-stats',
+        view=api_views.ViewCacheStatsAPIView.as_view(),
+        name='analysis-view-cache-stats'
+    ),
+
+    path(
+        'api/onehot-datasource',
+        view=api_views.OnehotDataSourceAPIView.as_view(),
+        name='analysis-onehot-datasource'
+    ),
+
     path('api/cuser', view=api_views.CurrentUserView.as_view(), name='cuser'),
 
     url(r'^', include(router.urls)),
@@ -96,8 +96,23 @@ export const sendRequestViewUpdate = (view, values, data) => (dispatch) => {
   dispatch(updateView(values));
   dispatch(loadingActions.setLoadingState(true));
 
+  // components run as server jobs report the stage they are in
+  let stage;
+  const onProgress = (progress) => {
+    if (progress.stage !== stage) {
+      stage = progress.stage;
+      dispatch(
+        messageActions.showMessage({
+          header: '',
+          content: 'Computing: ' + stage,
+          type: 'info',
+        })
+      );
+    }
+  };
+
   return api.views
-    .sendRequestViewUpdate(view, data)
+    .sendRequestViewUpdate(view, data, onProgress)
     .then((res) => {
       dispatch(receiveViewUpdateRemote(res.data));
       dispatch(datasetActions.addDatasetView(view.id, res.data));
@@ -30,6 +30,19 @@ export default function (getClient) {
 
       return fetch(url);
     },
+
+    fetchDataSourceRows(id, { offset = 0, limit, columns, format = 'json' } = {}) {
+      const params = new URLSearchParams({ offset, format });
+      if (limit !== undefined) {
+        params.append('limit', limit);
+      }
+      if (columns) {
+        params.append('columns', columns.join(','));
+      }
+      const url = `${Urls['datamanagement:datasource_rows'](id)}?${params.toString()}`;
+
+      return fetch(url);
+    },
   };
 }
 //-------------------------------------------------------------------------------------------------
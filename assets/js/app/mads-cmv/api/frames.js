@@ -0,0 +1,108 @@
+/*=================================================================================================
+// Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+//          Hokkaido University (2018)
+//          Last Update: Q3 2023
+// ________________________________________________________________________________________________
+// Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+// ________________________________________________________________________________________________
+// Description: This is the decoder of the binary 'frames' responses of the server side API
+// ------------------------------------------------------------------------------------------------
+// Notes: The numeric arrays of a component result are sent as raw little endian buffers next to
+//        a JSON header (see analysis/api/renderers.py). Decoding gives the same shape as the JSON
+//        response, with typed arrays (nested arrays of typed rows for 2D arrays) in place of the
+//        plain number arrays, or with plain arrays when the result is kept in the (saved) app
+//        state, where typed arrays would not survive JSON serialization.
+// ------------------------------------------------------------------------------------------------
+// References: None
+=================================================================================================*/
+
+//-------------------------------------------------------------------------------------------------
+// Global Constants
+//-------------------------------------------------------------------------------------------------
+export const FRAMES_MEDIA_TYPE = 'application/vnd.mads.frames';
+
+const FRAMES_MAGIC = 'MADSFRM1';
+const PREFIX_SIZE = 16;
+
+const typedArrays = {
+  float64: Float64Array,
+  float32: Float32Array,
+  int8: Int8Array,
+  int16: Int16Array,
+  int32: Int32Array,
+  uint8: Uint8Array,
+  uint16: Uint16Array,
+  uint32: Uint32Array,
+};
+//-------------------------------------------------------------------------------------------------
+
+//-------------------------------------------------------------------------------------------------
+// Split a flat array into nested arrays of rows following the shape
+//-------------------------------------------------------------------------------------------------
+const reshape = (values, shape) => {
+  if (shape.length <= 1) {
+    return values;
+  }
+  const [n, ...rest] = shape;
+  const size = rest.reduce((a, b) => a * b, 1);
+  const rows = [];
+  for (let i = 0; i < n; i++) {
+    const row = values.subarray
+      ? values.subarray(i * size, (i + 1) * size)
+      : values.slice(i * size, (i + 1) * size);
+    rows.push(reshape(row, rest));
+  }
+  return rows;
+};
+//-------------------------------------------------------------------------------------------------
+
+//-------------------------------------------------------------------------------------------------
+// Decode an ArrayBuffer of a 'frames' response into the result object
+//-------------------------------------------------------------------------------------------------
+export const decodeFrames = (buffer, { plainArrays = false } = {}) => {
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 8));
+  if (magic !== FRAMES_MAGIC) {
+    throw new Error('Not a frames response');
+  }
+
+  const view = new DataView(buffer);
+  const headerLength = view.getUint32(8, true);
+  const header = JSON.parse(
+    new TextDecoder('utf-8').decode(new Uint8Array(buffer, PREFIX_SIZE, headerLength))
+  );
+  const start = PREFIX_SIZE + headerLength;
+
+  const arrays = header.buffers.map((b) => {
+    const TypedArray = typedArrays[b.dtype];
+    const values = new TypedArray(
+      buffer,
+      start + b.offset,
+      b.byteLength / TypedArray.BYTES_PER_ELEMENT
+    );
+    if (b.bool) {
+      return reshape(Array.from(values, Boolean), b.shape);
+    }
+    return reshape(plainArrays ? Array.from(values) : values, b.shape);
+  });
+
+  const restore = (obj) => {
+    if (Array.isArray(obj)) {
+      return obj.map(restore);
+    }
+    if (obj !== null && typeof obj === 'object') {
+      const keys = Object.keys(obj);
+      if (keys.length === 1 && keys[0] === '$buffer') {
+        return arrays[obj.$buffer];
+      }
+      const restored = {};
+      keys.forEach((k) => {
+        restored[k] = restore(obj[k]);
+      });
+      return restored;
+    }
+    return obj;
+  };
+
+  return restore(header.data);
+};
+//-------------------------------------------------------------------------------------------------
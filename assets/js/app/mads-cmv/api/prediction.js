@@ -38,6 +38,13 @@ export default function (getClient) {
 
       return client.post(url, data);
     },
+
+    predictBatch(id, data) {
+      const client = getClient();
+      const url = Urls['prediction:models-api-predict-batch'](id);
+
+      return client.post(url, data);
+    },
   };
 }
 //-------------------------------------------------------------------------------------------------
@@ -10,22 +10,114 @@
 // ------------------------------------------------------------------------------------------------
 // Notes: 'Views' let us look at the data in various ways via multiple visualization components
 // ------------------------------------------------------------------------------------------------
-// References: None
+// References: the 'frames' decoder
 =================================================================================================*/
 
+//-------------------------------------------------------------------------------------------------
+// Load required libraries
+//-------------------------------------------------------------------------------------------------
+import { FRAMES_MEDIA_TYPE, decodeFrames } from './frames';
+
+//-------------------------------------------------------------------------------------------------
+
+// milliseconds between two state requests of a component job
+const JOB_POLL_INTERVAL = 1000;
+
+const FRAMES_REQUEST_CONFIG = {
+  responseType: 'arraybuffer',
+  headers: { Accept: FRAMES_MEDIA_TYPE },
+};
+
+//-------------------------------------------------------------------------------------------------
+
+//-------------------------------------------------------------------------------------------------
+// Decode a response of binary buffers (to plain arrays, as the results are stored with the
+// workspace), error replies included
+//-------------------------------------------------------------------------------------------------
+function decodeFramesResponse(request) {
+  return request
+    .then((res) => ({ ...res, data: decodeFrames(res.data, { plainArrays: true }) }))
+    .catch((err) => {
+      if (err.response && err.response.data instanceof ArrayBuffer) {
+        try {
+          err.response.data = decodeFrames(err.response.data);
+        } catch (e) {
+          err.response.data = {};
+        }
+      }
+      throw err;
+    });
+}
+//-------------------------------------------------------------------------------------------------
+
+//-------------------------------------------------------------------------------------------------
+// Ask for the state of a component job until it is finished, passing the progress reports on
+//-------------------------------------------------------------------------------------------------
+function waitForJob(client, jobId, onProgress) {
+  return client.get(Urls['analysis:analysis-view-job'](jobId)).then((res) => {
+    if (res.data.status === 'SUCCESS') {
+      return jobId;
+    }
+    if (res.data.status === 'FAILURE') {
+      const err = new Error(res.data.detail);
+      err.response = res;
+      throw err;
+    }
+    if (onProgress && res.data.progress) {
+      onProgress(res.data.progress);
+    }
+    return new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL)).then(() =>
+      waitForJob(client, jobId, onProgress)
+    );
+  });
+}
+//-------------------------------------------------------------------------------------------------
+
 //-------------------------------------------------------------------------------------------------
 // Export feature/module methods
 //-------------------------------------------------------------------------------------------------
 export default function (getClient) {
+  // components can ask for their numeric arrays as binary buffers instead of JSON numbers
+  const postView = (client, view, data) => {
+    const url = Urls['analysis:analysis-view-update']();
+    if (view.settings && view.settings.binaryResponse) {
+      return decodeFramesResponse(client.post(url, { view, data }, FRAMES_REQUEST_CONFIG));
+    }
+    return client.post(url, { view, data });
+  };
+
+  const getJobResult = (client, view, jobId) => {
+    const url = Urls['analysis:analysis-view-job-result'](jobId);
+    if (view.settings && view.settings.binaryResponse) {
+      return decodeFramesResponse(client.get(url, FRAMES_REQUEST_CONFIG));
+    }
+    return client.get(url);
+  };
+
   return {
-    sendRequestViewUpdate(view, data) {
+    sendRequestViewUpdate(view, data, onProgress) {
       const client = getClient();
-      const url = Urls['analysis:analysis-view-update']();
 
-      return client.post(url, {
-        view,
-        data,
-      });
+      if (!(view.settings && view.settings.asyncRequest)) {
+        return postView(client, view, data);
+      }
+
+      // long running components are submitted as a server job, which is polled until it is
+      // done; jobs need a login, so for anonymous users the component runs within the request
+      return client
+        .post(Urls['analysis:analysis-view-update'](), { view, data, async: true })
+        .then(
+          (res) =>
+            waitForJob(client, res.data.jobId, onProgress).then((jobId) =>
+              getJobResult(client, view, jobId)
+            ),
+          (err) => {
+            if (err.response && err.response.status === 403) {
+              return postView(client, view, data);
+            }
+            throw err;
+          }
+        );
     },
   };
 }
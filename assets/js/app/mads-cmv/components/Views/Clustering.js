@@ -125,7 +125,8 @@ export default class ClusteringView extends withCommandInterface( ClusteringVis,
         }
         else{
           data.cluster = dataset[id].cluster;
-          data.data = dataset[id].data;
+          // the server only returns the labels of the rows that were sent
+          data.data = dataset[id].data || dataset.main.data;
         }
       }
       else{
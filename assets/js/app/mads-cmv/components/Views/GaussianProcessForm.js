@@ -186,6 +186,8 @@ const GaussianProcessForm = (props) => {
 
   const informaion = ['Prediction', 'Standard Deviation', 'Expected Improvement', 'Proposed experimental conditions'];
   const targetEI = ['Maximization', 'Minimization']
+  const acquisitions = ['EI', 'PI', 'UCB', 'qEI']
+  const samplings = ['grid', 'lhs', 'sobol']
   const kernels = [
                'ConstantKernel() * RBF() + WhiteKernel()',
                'ConstantKernel() * DotProduct() + WhiteKernel()',
@@ -231,6 +233,24 @@ const GaussianProcessForm = (props) => {
 
     return true;
   }
+  const onCompareKernelsClick = async (e, value) => {
+    const data = {};
+    const settings = {route: "query", featureColumns: featureName, targetColumn: targetName, compareKernels: true}
+    const df = new DataFrame(value.value.main.data);
+    data[targetName] = df.get(targetName).values.toArray();
+
+    featureName.forEach((c) => {
+      data[c] = df.get(c).values.toArray();
+    });
+
+    const res = await api.views.sendRequestViewUpdate({settings: settings, id: null,
+    type: 'gaussianProcess'}, data);
+    const retres = res.data;
+
+    setServerInfo(retres.leaderboard.map((r, i) => (i + 1) + ". " + r.kernel + ": " + r.score.toFixed(4)).join(" | "));
+
+    return true;
+  }
 
 
   // The form itself, as being displayed in the DOM
@@ -250,6 +270,23 @@ const GaussianProcessForm = (props) => {
             max={500}
           />
         </Form.Field>
+        <Form.Field width={7}>
+          <label>Candidates for three or more features (default: grid)</label>
+          <Field
+            name="sampling"
+            component={SemanticDropdown}
+            placeholder="grid, lhs or sobol"
+            options={getDropdownOptions(samplings)}
+          />
+          <Field
+            name="numberOfSamples"
+            component={Input}
+            type="number"
+            step={1}
+            min={10}
+            placeholder="Number of samples (lhs and sobol)"
+          />
+        </Form.Field>
 
         <FieldArray
           name="featureColumns"
@@ -276,6 +313,12 @@ const GaussianProcessForm = (props) => {
           placeholder="Maximize or Minimize"
           options={getDropdownOptions(targetEI)}
         />
+        <Field
+          name="acquisition"
+          component={SemanticDropdown}
+          placeholder="Acquisition function (default: EI)"
+          options={getDropdownOptions(acquisitions)}
+        />
       </Form.Field>
 
       <hr />
@@ -297,6 +340,14 @@ const GaussianProcessForm = (props) => {
         >
           Get Score
         </Button>
+        <Button
+        color="blue"
+        onClick={onCompareKernelsClick}
+        value={dataset}
+        disabled={!(featureName.length && targetName) }
+        >
+          Compare Kernels
+        </Button>
 
         <br></br>
         <label>{currentServerInfo}</label>
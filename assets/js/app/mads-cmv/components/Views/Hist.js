@@ -71,6 +71,9 @@ export default class HistView extends withCommandInterface(QuadBarChart, HistFor
     });
 
     newValues = convertExtentValues(newValues);
+    newValues.indexFormat = 'csr';
+    // the bin membership arrays are large, they are sent as binary buffers
+    newValues.binaryResponse = true;
 
     actions.sendRequestViewUpdate(view, newValues, data);
   };
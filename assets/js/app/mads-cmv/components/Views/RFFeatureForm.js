@@ -26,6 +26,11 @@ import MultiSelectDropdown from '../FormFields/MultiSelectDropdown';
 import SemanticDropdown from '../FormFields/Dropdown';
 import Input from '../FormFields/Input';
 
+const importanceMethods = [
+  { text: 'Impurity (random forest)', value: 'impurity' },
+  { text: 'Permutation', value: 'permutation' },
+  { text: 'Tree contributions (SHAP if installed, else Saabas)', value: 'shap' },
+];
 //-------------------------------------------------------------------------------------------------
 
 
@@ -76,6 +81,33 @@ const RFFeatureForm = (props) => {
         />
       </Form.Field>
 
+      <Form.Field>
+        <label>Importance method</label>
+        <Field
+          name="importanceMethod"
+          component={SemanticDropdown}
+          placeholder="Impurity (random forest)"
+          options={importanceMethods}
+        />
+      </Form.Field>
+
+      <Form.Group widths="equal">
+        <Field
+          fluid
+          name="numberOfTrees"
+          component={Input}
+          label="Number of trees"
+          placeholder="10"
+        />
+        <Field
+          fluid
+          name="numberOfRepeats"
+          component={Input}
+          label="Permutation repeats"
+          placeholder="5"
+        />
+      </Form.Group>
+
       <hr />
       <Form.Group widths="equal">
         <label>Extent:</label>
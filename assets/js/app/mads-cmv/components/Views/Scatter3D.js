@@ -57,13 +57,14 @@ export default class Scatter3DView extends withCommandInterface(Scatter3D, Scatt
     const df = new DataFrame(internalData);
     let data = {};
 
-    if(newValues.method == "PCA"){
+    if(newValues.method == "PCA" || newValues.method == "t-SNE" || newValues.method == "UMAP"){
       if (!newValues.featureColumns[0] || !newValues.targetColumn) {
         return;
       }
 
       if(!newValues.options){ newValues["options"] = { axisTitles: [] } }
-      newValues.options.axisTitles = ['PC 1', 'PC 2', 'PC 3'];
+      const axisPrefix = newValues.method == "PCA" ? 'PC' : newValues.method;
+      newValues.options.axisTitles = [1, 2, 3].map((i) => axisPrefix + ' ' + i);
 
       (dataset.main.data).forEach(obj => {
         Object.keys(obj).forEach(key => {
@@ -95,6 +96,10 @@ export default class Scatter3DView extends withCommandInterface(Scatter3D, Scatt
     }
 
     newValues = convertExtentValues(newValues);
+    // the coordinates of every row are sent as binary buffers
+    newValues.binaryResponse = true;
+    // t-SNE and UMAP can take minutes, they are computed as a server job
+    newValues.asyncRequest = newValues.method == "t-SNE" || newValues.method == "UMAP";
     actions.sendRequestViewUpdate(view, newValues, data);
   };
 
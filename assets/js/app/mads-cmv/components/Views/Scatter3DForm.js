@@ -55,8 +55,8 @@ const errors = {};
 const errorValidate = (value, values, props, fieldName) => {
   let error = undefined;
 
-  // Clean away possible leftover from a previous PCA render
-  if(values.options && values.options.axisTitles && values.options.axisTitles[0] == "PC 1"){
+  // Clean away possible leftover from a previous projection (PCA, t-SNE, UMAP) render
+  if(values.options && values.options.axisTitles && /^(PC|t-SNE|UMAP) 1$/.test(values.options.axisTitles[0])){
     values.options.axisTitles = [];
   }
 
@@ -72,7 +72,7 @@ const errorValidate = (value, values, props, fieldName) => {
   }
 
   //Is required
-  if ((values.method && ((values.method == "PCA" && fieldName.toLowerCase().includes("column")) || (values.method == "Manual" && fieldName.toLowerCase().includes("axistitles")))) ||
+  if ((values.method && ((values.method != "Manual" && fieldName.toLowerCase().includes("column")) || (values.method == "Manual" && fieldName.toLowerCase().includes("axistitles")))) ||
       ((values.colorAssignmentEnabled && fieldName == "mappings.color") || (values.sizeAssignmentEnabled && fieldName == "mappings.size"))){
     if(!value || _.isEmpty(value)){
       error = 'Required';
@@ -81,9 +81,9 @@ const errorValidate = (value, values, props, fieldName) => {
   }
 
   //Must be at least 3
-  if(values.method && values.method == "PCA" && fieldName == "featureColumns"){
+  if(values.method && values.method != "Manual" && fieldName == "featureColumns"){
     if(value && value.length < 3){
-      error = 'At least three(3) featured columns have to be selected for 3D PCA to work';
+      error = 'At least three(3) featured columns have to be selected for a 3D projection to work';
     }
   }
 
@@ -118,14 +118,16 @@ const Scatter3DForm = (props) => {
     props: { style: '' },
   }));
 
-  const methods = ['Manual', 'PCA'];
+  const methods = ['Manual', 'PCA', 't-SNE', 'UMAP'];
   const preprocMethods = ['StandardScaling', 'Normalization'];
 
   // input managers
   const [fieldsAreShowing, toggleVisibleFields] = useState(
-    initialValues.method != methods[1]
+    initialValues.method == undefined || initialValues.method == methods[0]
   );
 
+  const [currentMethod, setCurrentMethod] = useState(initialValues.method);
+
   const [colorDisabled, setColorDisabled] = useState(
     !initialValues.colorAssignmentEnabled
   );
@@ -158,12 +160,13 @@ const Scatter3DForm = (props) => {
           placeholder="Method"
           options={getDropdownOptions(methods)}
           onChange={(e, data) => {
-            toggleVisibleFields(data != methods[1]);
+            toggleVisibleFields(data == methods[0]);
+            setCurrentMethod(data);
           }}
         />
       </Form.Field>
 
-      {/* These Form Fields are for the PCA method */}
+      {/* These Form Fields are for the projection methods (PCA, t-SNE and UMAP) */}
       {!fieldsAreShowing && <div>
         <Form.Field>
           <label>Feature columns</label>
@@ -211,6 +214,34 @@ const Scatter3DForm = (props) => {
             />
           </Form.Field>
         </div>}
+
+        {currentMethod == 't-SNE' && <Form.Field>
+          <label>Perplexity:</label>
+          <Field
+            name="perplexity"
+            component={Input}
+            placeholder="30"
+          />
+        </Form.Field>}
+
+        {currentMethod == 'UMAP' && <Form.Group widths="equal">
+          <Form.Field>
+            <label>Number of Neighbors:</label>
+            <Field
+              name="nNeighbors"
+              component={Input}
+              placeholder="15"
+            />
+          </Form.Field>
+          <Form.Field>
+            <label>Minimum Distance (umap-learn only):</label>
+            <Field
+              name="minDist"
+              component={Input}
+              placeholder="0.1"
+            />
+          </Form.Field>
+        </Form.Group>}
       </div>}
 
       {fieldsAreShowing && <div>
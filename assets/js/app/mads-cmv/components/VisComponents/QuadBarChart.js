@@ -66,6 +66,24 @@ function createEmptyChart(options, dataIsEmpty) {
   return fig;
 }
 
+//-------------------------------------------------------------------------------------------------
+// Returns the row indices of every bin, either as sent ('indices') or decoded from the compact
+// CSR form ('indexOffsets' and 'indexIds', used when the view requests indexFormat 'csr')
+//-------------------------------------------------------------------------------------------------
+function getBinIndices(contents) {
+  if (contents.indices || !contents.indexOffsets) {
+    return contents.indices;
+  }
+  if (!contents.decodedIndices) {
+    const { indexOffsets, indexIds } = contents;
+    contents.decodedIndices = [];
+    for (let i = 0; i < indexOffsets.length - 1; i++) {
+      contents.decodedIndices.push(indexIds.slice(indexOffsets[i], indexOffsets[i + 1]));
+    }
+  }
+  return contents.decodedIndices;
+}
+
 //-------------------------------------------------------------------------------------------------
 // This Visualization Component Class
 //-------------------------------------------------------------------------------------------------
@@ -144,7 +162,7 @@ export default class QuadBarChart extends Component {
           const hedges = dataContents[index][bins];
           const colors = new Array(hhist.length).fill(color);
 
-          const { indices } = dataContents[index];
+          const indices = getBinIndices(dataContents[index]);
           if (indices) {
             for (let i = 0; i < indices.length; i++) {
               colorTags.forEach((colorTag) => {
@@ -169,7 +187,7 @@ export default class QuadBarChart extends Component {
             this.cds.connect(this.cds.selected.change, () => {
               let indices;
               if (ds.selected.indices.length > 0) {
-                indices = dataContents[index].indices[ds.selected.indices];
+                indices = getBinIndices(dataContents[index])[ds.selected.indices];
               } else {
                 indices = [];
               }
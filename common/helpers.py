@@ -78,40 +78,71 @@ class OwnedResourceModelFilterHelper(FormHelper):
 
 
 #-------------------------------------------------------------------------------------------------
-def get_contents_from_file(file):
-    """Read contents from the specified file only if the type of the file is "CSV".
+def sniff_delimiter(file):
+    """Guess the delimiter of a csv file from its first data row (the file is rewound)."""
+
+    head = file.read(65536)
+    file.seek(0)
+    if isinstance(head, bytes):
+        head = head.decode('utf-8', errors='ignore')
+    lines = head.splitlines()
+    cellStr = lines[1] if len(lines) > 1 else (lines[0] if lines else '')
+
+    possible_delimeters = [',', ';', '\t', '\s', '|']
+    cnt = [cellStr.count(','), cellStr.count(';'), cellStr.count('\t'), cellStr.count('\s'), cellStr.count('|') ]
+    return possible_delimeters[cnt.index(max(cnt))]
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def read_dataframe_from_file(file):
+    """Parse the specified file into a DataFrame only if the type of the file is "CSV".
 
     Arguments:
         file {FieldFile} -- The file.
 
     Returns:
-        contents, file_type  -- contents, file_type
+        df, file_type  -- parsed DataFrame (None if not supported), file_type
     """
 
-    contents = None
+    df = None
     file_type = None
-    columns = None
     filename, file_extension = os.path.splitext(file.name)
 
     if (file_extension == '.csv'):
         file_type = 'csv'
 
         # Extract which delimiter is used in this csv file
-        delimiter = '@'
-        possible_delimeters = [',', ';', '\t', '\s', '|']
-        df_check = pd.read_csv(file, sep=delimiter, nrows=2)
-        cellStr = df_check.iat[0,0]
-        cnt = [cellStr.count(','), cellStr.count(';'), cellStr.count('\t'), cellStr.count('\s'), cellStr.count('|') ]
-        delimiter = possible_delimeters[cnt.index(max(cnt))]
-        file.seek(0)
+        delimiter = sniff_delimiter(file)
 
         df = pd.read_csv(file, sep=delimiter)
-        json = df.to_json(orient='table')
-        contents = json
-        columns = df.columns
 
     elif (file_extension == '.xsl' or file_extension == '.xslx'):
         file_type = 'xsl'
 
+    return df, file_type
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_contents_from_file(file):
+    """Read contents from the specified file only if the type of the file is "CSV".
+
+    Arguments:
+        file {FieldFile} -- The file.
+
+    Returns:
+        contents, file_type  -- contents, file_type
+    """
+
+    contents = None
+    columns = None
+
+    df, file_type = read_dataframe_from_file(file)
+
+    if df is not None:
+        contents = df.to_json(orient='table')
+        columns = df.columns
+
     return contents, file_type, columns
 #-------------------------------------------------------------------------------------------------
@@ -0,0 +1,196 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) common folder contains all base-root reusable codes that are
+#              shared and used by all various "apps" within this web site. This file contains
+#              mergeable one-pass summaries ('sketches') of numeric columns.
+# ------------------------------------------------------------------------------------------------
+# Notes: This is 'common' code that support various apps and files with all reusable features
+#        that is needed for the different pages Django provides. Count, mean, std, min and max
+#        are exact (Welford/Chan updates); quantiles are approximated with a merging t-digest.
+#        All sketches can be updated chunk by chunk, merged and stored as JSON.
+# ------------------------------------------------------------------------------------------------
+# References: numpy and pandas libs
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+#-------------------------------------------------------------------------------------------------
+
+# Rows of a frame that are summarized at once
+SKETCH_CHUNK_SIZE = 65536
+
+# Statistics (and their order) of a column description, the same as DataFrame.describe()
+describe_names = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class RunningStats:
+    """Count, mean, sum of squared deviations (M2), min and max of a stream of values. Every
+    chunk is reduced on its own and merged with Chan's update of Welford's method.
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=np.inf, max=-np.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        mean = values.mean()
+        self._merge(len(values), mean, np.square(values - mean).sum(), values.min(), values.max())
+        return self
+
+    def merge(self, other):
+        if other.count:
+            self._merge(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def _merge(self, count, mean, m2, min, max):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min if min < self.min else self.min
+        self.max = max if max > self.max else self.max
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1, like pandas)."""
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else float('nan')
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min,
+                'max': self.max}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['count'], d['mean'], d['m2'], d['min'], d['max'])
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class TDigest:
+    """Merging t-digest: weighted centroids whose size is bounded by the arcsine scale function,
+    so the tails (where the quantiles change fastest) keep the most resolution.
+    """
+
+    def __init__(self, compression=100, means=None, weights=None):
+        self.compression = compression
+        self.means = np.empty(0) if means is None else np.asarray(means, dtype='float64')
+        self.weights = np.empty(0) if weights is None else np.asarray(weights, dtype='float64')
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values):
+            self._compress(np.concatenate([self.means, values]),
+                           np.concatenate([self.weights, np.ones(len(values))]))
+        return self
+
+    def merge(self, other):
+        if len(other.means):
+            self._compress(np.concatenate([self.means, other.means]),
+                           np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        # centroids whose center falls into the same unit of the scale function are merged
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        group = np.floor(k - k[0]).astype('int64')
+        group = np.concatenate([[0], np.cumsum(np.diff(group) != 0)])
+
+        self.weights = np.bincount(group, weights=weights)
+        self.means = np.bincount(group, weights=weights * means) / self.weights
+
+    def quantile(self, q, min=None, max=None):
+        """Approximate quantile(s), interpolated between the centroid centers (anchored at the
+        exact min and max when they are given).
+        """
+        if len(self.means) == 0:
+            return np.full(np.shape(q), np.nan)
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions, values = centers, self.means
+        if min is not None and max is not None:
+            positions = np.concatenate([[0.0], centers, [total]])
+            values = np.concatenate([[min], self.means, [max]])
+        return np.interp(np.asarray(q) * total, positions, values)
+
+    def to_dict(self):
+        return {'compression': self.compression, 'means': self.means.tolist(),
+                'weights': self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['compression'], d['means'], d['weights'])
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class ColumnSketch:
+    """Running statistics and quantile digest of one numeric column."""
+
+    def __init__(self, stats=None, digest=None):
+        self.stats = stats or RunningStats()
+        self.digest = digest or TDigest()
+
+    def update(self, values):
+        self.stats.update(values)
+        self.digest.update(values)
+        return self
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.digest.merge(other.digest)
+        return self
+
+    def describe(self):
+        """The statistics of DataFrame.describe(), with approximate quartiles."""
+        s = self.stats
+        if s.count == 0:
+            return dict(zip(describe_names, [0] + [float('nan')] * 7))
+        quartiles = self.digest.quantile([0.25, 0.5, 0.75], s.min, s.max)
+        values = [s.count, s.mean, s.std, s.min] + quartiles.tolist() + [s.max]
+        return dict(zip(describe_names, values))
+
+    def to_dict(self):
+        return {'stats': self.stats.to_dict(), 'digest': self.digest.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(RunningStats.from_dict(d['stats']), TDigest.from_dict(d['digest']))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def sketch_frame(df, chunk_size=SKETCH_CHUNK_SIZE):
+    """Sketch every numeric column of the DataFrame, reading chunk_size rows at a time."""
+    columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    sketches = {c: ColumnSketch() for c in columns}
+    for start in range(0, len(df), chunk_size):
+        for c in columns:
+            sketches[c].update(df[c].to_numpy()[start:start + chunk_size])
+    return sketches
+#-------------------------------------------------------------------------------------------------
@@ -22,6 +22,7 @@
 from django.db.models import Q
 from rest_framework.generics import (
     ListCreateAPIView,
+    RetrieveAPIView,
     RetrieveUpdateDestroyAPIView
 )
 from rest_framework import permissions
@@ -93,6 +94,27 @@ class DataSourceRetrieveUpdateDestroyAPIView(
 #-------------------------------------------------------------------------------------------------
 
 
+#-------------------------------------------------------------------------------------------------
+class DataSourceProfileAPIView(
+    DataSourceFilteredLookupMixin,
+    RetrieveAPIView
+):
+    """
+    Return the column profile (types, missing values, ranges, most frequent values and
+    histograms) of a datasource, without its contents.
+    """
+    permission_classes = (
+        permissions.IsAuthenticatedOrReadOnly,
+        IsOwnerOrReadOnly,
+    )
+    lookup_field = 'id'
+
+    def retrieve(self, request, *args, **kwargs):
+        datasource = self.get_object()
+        return Response({'id': datasource.id, 'profile': datasource.get_profile()})
+#-------------------------------------------------------------------------------------------------
+
+
 #-------------------------------------------------------------------------------------------------
 class DataSourceContentsAPIView(
     APIView
@@ -0,0 +1,290 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) Provided parsed DataFrame access for the 'datamanagement' page
+# ------------------------------------------------------------------------------------------------
+# Notes: This is one part of the serverside module that allows other apps (e.g. 'analysis') to
+#        use the contents of a stored data source without parsing the file on every request.
+#        Next to every csv file a columnar "sidecar" directory is kept (one .npy file per column
+#        plus a meta.json), which is memory-mapped instead of parsing the csv again. It also
+#        holds the sketches of the numeric columns (sketches.json) for fast statistics.
+# ------------------------------------------------------------------------------------------------
+# References: Django settings, threading, collections, json, shutil, numpy, pandas, logging libs
+#             and common.helpers and common.sketches
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+from collections import OrderedDict
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from common.helpers import read_dataframe_from_file
+from common.sketches import ColumnSketch, sketch_frame
+
+import logging
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------------------------
+
+# Number of parsed data sources that are kept in memory per process
+FRAME_CACHE_SIZE = getattr(settings, 'DATASOURCE_FRAME_CACHE_SIZE', 8)
+
+# 2: sketches.json with the column sketches (see common.sketches)
+SIDECAR_VERSION = 2
+
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_frame_key(datasource):
+    """Key that identifies one specific version of the file of a data source."""
+    return (str(datasource.id), datasource.file.name, datasource.modified.timestamp())
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_file_type(file):
+    filename, file_extension = os.path.splitext(file.name)
+    if file_extension == '.csv':
+        return 'csv'
+    if file_extension == '.xsl' or file_extension == '.xslx':
+        return 'xsl'
+    return None
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_sidecar_path(file):
+    """Directory of the columnar copy of the given file (next to the file in the storage)."""
+    path = file.storage.path(file.name)
+    return os.path.splitext(path)[0] + '.columns'
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def write_sidecar(file, df):
+    """Store the DataFrame column by column next to the file it was parsed from."""
+
+    path = get_sidecar_path(file)
+    tmp_path = path + '.tmp-' + str(os.getpid())
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        values = df[name].to_numpy()
+        file_name = 'c' + str(i) + '.npy'
+        mapped = values.dtype != object
+        np.save(os.path.join(tmp_path, file_name), values, allow_pickle=not mapped)
+        columns.append({'name': name, 'file': file_name, 'dtype': str(values.dtype),
+                        'mapped': mapped})
+
+    meta = {
+        'version': SIDECAR_VERSION,
+        'source': file.name,
+        'size': file.size,
+        'rows': len(df),
+        'columns': columns,
+    }
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    sketches = sketch_frame(df)
+    with open(os.path.join(tmp_path, 'sketches.json'), 'w') as f:
+        json.dump({str(name): sketch.to_dict() for name, sketch in sketches.items()}, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_sidecar_meta(file):
+    """Return the meta data of the sidecar of the file, or None if it is missing or outdated."""
+
+    try:
+        with open(os.path.join(get_sidecar_path(file), 'meta.json')) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if (meta.get('version') != SIDECAR_VERSION or meta.get('source') != file.name
+            or meta.get('size') != file.size):
+        return None
+
+    return meta
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def read_sidecar(file):
+    """Return the DataFrame stored in the sidecar of the file, or None if there is no (valid) one.
+    Numeric columns are memory-mapped read only, so the frame must not be modified in place.
+    """
+
+    meta = get_sidecar_meta(file)
+    if meta is None:
+        return None
+
+    path = get_sidecar_path(file)
+    arrays = OrderedDict()
+    for c in meta['columns']:
+        column_path = os.path.join(path, c['file'])
+        if c['mapped'] and meta['rows'] > 0:
+            arrays[c['name']] = np.load(column_path, mmap_mode='r')
+        else:
+            arrays[c['name']] = np.load(column_path, allow_pickle=True)
+
+    # copy=False keeps one block per column, so the memory maps are not consolidated into a copy
+    return pd.DataFrame(arrays, copy=False)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def delete_sidecar(file):
+    if not file:
+        return
+    shutil.rmtree(get_sidecar_path(file), ignore_errors=True)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def build_sidecar(datasource, force=True):
+    """Parse the file of the data source once and store its columnar copy.
+    Without force, nothing is done when an up to date sidecar exists already.
+    """
+
+    if not datasource.file or get_file_type(datasource.file) != 'csv':
+        return None
+
+    if not force and get_sidecar_meta(datasource.file) is not None:
+        return None
+
+    df, file_type = read_dataframe_from_file(datasource.file)
+    write_sidecar(datasource.file, df)
+
+    return df
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def load_dataframe(datasource):
+    """Read the contents of the data source from its sidecar, or (re)build the sidecar."""
+
+    if get_file_type(datasource.file) != 'csv':
+        return None
+
+    try:
+        df = read_sidecar(datasource.file)
+    except (OSError, ValueError) as e:
+        logger.warning('Broken sidecar of ' + str(datasource.id) + ': ' + str(e))
+        df = None
+
+    if df is None:
+        try:
+            df = build_sidecar(datasource)
+        except OSError as e:
+            logger.warning('Could not write the sidecar of ' + str(datasource.id) + ': ' + str(e))
+            df, file_type = read_dataframe_from_file(datasource.file)
+
+    return df
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_dataframe(datasource):
+    """Return the parsed contents of the data source as a DataFrame.
+
+    The frame is shared between requests, so callers must not modify it in place.
+
+    Arguments:
+        datasource {DataSource} -- The data source.
+
+    Returns:
+        df -- parsed DataFrame, or None if the file type is not supported
+    """
+
+    key = get_frame_key(datasource)
+
+    with _frames_lock:
+        if key in _frames:
+            _frames.move_to_end(key)
+            return _frames[key]
+
+    df = load_dataframe(datasource)
+    if df is None:
+        return None
+
+    with _frames_lock:
+        # drop older versions of the same data source first
+        for k in [k for k in _frames if k[0] == key[0]]:
+            del _frames[k]
+        _frames[key] = df
+        while len(_frames) > FRAME_CACHE_SIZE:
+            _frames.popitem(last=False)
+
+    return df
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_contents_from_datasource(datasource):
+    """Same as common.helpers.get_contents_from_file, but reading the cached/columnar frame.
+
+    Returns:
+        contents, file_type, columns
+    """
+
+    file_type = get_file_type(datasource.file)
+    df = get_dataframe(datasource)
+    if df is None:
+        return None, file_type, None
+
+    return df.to_json(orient='table'), file_type, df.columns
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_sketches(datasource):
+    """Return the column sketches (count, mean, std, min, max and quantile digest of every
+    numeric column) of the data source, read from its sidecar, or None if it has no sidecar.
+    """
+    if get_file_type(datasource.file) != 'csv':
+        return None
+
+    if get_sidecar_meta(datasource.file) is None:
+        get_dataframe(datasource)
+
+    try:
+        with open(os.path.join(get_sidecar_path(datasource.file), 'sketches.json')) as f:
+            sketches = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    return {name: ColumnSketch.from_dict(d) for name, d in sketches.items()}
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def invalidate_dataframe(datasource):
+    """Forget every cached frame of the data source."""
+    with _frames_lock:
+        for k in [k for k in _frames if k[0] == str(datasource.id)]:
+            del _frames[k]
+#-------------------------------------------------------------------------------------------------
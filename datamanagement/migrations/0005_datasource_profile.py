@@ -0,0 +1,19 @@
+# Generated by Django 3.2.18 on 2026-10-18 10:00
+
+from django.db import migrations
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datamanagement', '0004_alter_datasource_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='profile',
+            field=jsonfield.fields.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -11,13 +11,16 @@
 # Notes: This is one part of the serverside module that allows the user to interact with the
 #        'datamanagement' interface of the website. (DB and server Python methods)
 # ------------------------------------------------------------------------------------------------
-# References: Django platform libraries, private-storage, uuid, common.modelsm logging, uuid libs
-#             and 'User'-folder's 'models'
+# References: Django platform libraries, private-storage, jsonfield, uuid, common.modelsm logging,
+#             uuid libs
+#             and 'User'-folder's 'models' and 'datamanagement'-folder's 'dataframes' and
+#             'profiles'
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
+from django.core.files.base import ContentFile
 from django.db import models
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
@@ -25,6 +28,7 @@ from django.contrib.auth.models import Group
 from django.urls import reverse
 
 from private_storage.fields import PrivateFileField
+from jsonfield import JSONField
 
 import uuid  # Required for unique book instance
 import os
@@ -35,6 +39,14 @@ logger = logging.getLogger(__name__)
 from common.models import IndexedTimeStampedModel
 from common.models import OwnedResourceModel
 from users.models import User
+from .dataframes import build_sidecar
+from .dataframes import delete_sidecar
+from .dataframes import get_dataframe
+from .dataframes import get_sketches
+from .dataframes import invalidate_dataframe
+from .dataframes import write_sidecar
+from .profiles import create_profile
+from .profiles import is_profile_current
 
 #-------------------------------------------------------------------------------------------------
 
@@ -97,6 +109,8 @@ def delete_previous_file(function):
         if previous and previous.file.name != self.file.name:
             logger.info(str(self.file))
             logger.info(str(previous.file))
+            delete_sidecar(previous.file)
+            invalidate_dataframe(previous)
             previous.file.delete(False)
         return result
     return wrapper
@@ -116,8 +130,10 @@ class DataSource(OwnedResourceModel):
         Group, blank=True, related_name='datasource_shared_groups'
     )
 
-    objects = models.Manager()
+    # per-column profile of the current file (see profiles.py), computed when the file changes
+    profile = JSONField(null=True, blank=True, editable=False)
 
+    objects = models.Manager()
 
     def get_filename(self):
         return os.path.basename(self.file.name)
@@ -134,10 +150,32 @@ class DataSource(OwnedResourceModel):
     def get_public_datasources(self):
         return DataSource.objects.filter(accessibility=DataSource.ACCESSIBILITY_PUBLIC)
 
+    def get_profile(self):
+        """Return the column profile of the file, computing (and storing) it if it is outdated."""
+        if not is_profile_current(self.profile, self.file):
+            df = get_dataframe(self)
+            if df is None:
+                return None
+            self.profile = create_profile(self.file, df, get_sketches(self))
+            # update() instead of save(), the file itself has not changed
+            DataSource.objects.filter(pk=self.pk).update(profile=self.profile)
+        return self.profile
+
     @delete_previous_file
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
         super(DataSource, self).save()
 
+        # keep a columnar copy of the file, so that it does not have to be parsed again
+        try:
+            build_sidecar(self, force=False)
+        except Exception as e:
+            logger.warning('Could not build the sidecar of ' + str(self.id) + ': ' + str(e))
+
+        try:
+            self.get_profile()
+        except Exception as e:
+            logger.warning('Could not profile ' + str(self.id) + ': ' + str(e))
+
     @delete_previous_file
     def delete(self, using=None, keep_parents=False):
         super(DataSource, self).delete()
@@ -148,5 +186,32 @@ class DataSource(OwnedResourceModel):
 # when deleting model the file is removed
 @receiver(post_delete, sender=DataSource)
 def delete_file(sender, instance, **kwargs):
+    invalidate_dataframe(instance)
+    delete_sidecar(instance.file)
     instance.file.delete(False)
 #-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def create_datasource_from_dataframe(df, owner, name, description=''):
+    """Store a DataFrame (e.g. a derived table) as a new csv data source of the owner. The frame
+    is written as the sidecar of the new file right away, so the csv never has to be parsed.
+    Like an uploaded file, the csv must not be larger than the max_file_size of the file field
+    (ValueError otherwise).
+    """
+    contents = df.to_csv(index=False).encode('utf-8')
+    max_file_size = DataSource._meta.get_field('file').max_file_size
+    if max_file_size and len(contents) > max_file_size:
+        raise ValueError('The data would be stored as a file of ' + str(len(contents))
+                         + ' bytes, the limit of data sources is ' + str(max_file_size) + ' bytes.')
+
+    datasource = DataSource(name=name, owner=owner, description=description)
+    contents = ContentFile(contents)
+    datasource.file.save('data.csv', contents, save=False)
+    try:
+        write_sidecar(datasource.file, df.reset_index(drop=True))
+    except OSError as e:
+        logger.warning('Could not write the sidecar of ' + str(datasource.id) + ': ' + str(e))
+    datasource.save()
+    return datasource
+#-------------------------------------------------------------------------------------------------
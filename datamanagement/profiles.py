@@ -0,0 +1,140 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) column profiles of the data sources for the 'datamanagement'
+#              page
+# ------------------------------------------------------------------------------------------------
+# Notes: This is one part of the serverside module that allows other apps (e.g. 'analysis') and
+#        the client to know the columns of a data source (type, missing values, range,
+#        cardinality, most frequent values and a histogram) without loading its contents.
+#        A profile is computed once per version of the file and stored with the data source.
+#        The count, range and moments of the numeric columns are taken from the column sketches
+#        of the sidecar when they are given.
+# ------------------------------------------------------------------------------------------------
+# References: Django settings, numpy, pandas, logging libs and common.sketches
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+import numpy as np
+import pandas as pd
+
+from common.sketches import RunningStats
+
+import logging
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------------------------
+
+# Number of most frequent values kept per column
+PROFILE_TOP_K = getattr(settings, 'DATASOURCE_PROFILE_TOP_K', 10)
+
+# Number of (uniform) histogram bins of the numeric columns
+PROFILE_BINS = getattr(settings, 'DATASOURCE_PROFILE_BINS', 20)
+
+PROFILE_VERSION = 1
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def to_json_value(value):
+    """Plain python value of a numpy/pandas scalar, with None for missing and non-finite values."""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if value is None or (isinstance(value, float) and not np.isfinite(value)):
+        return None
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_column_kind(series):
+    if pd.api.types.is_bool_dtype(series):
+        return 'boolean'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    return 'categorical'
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def profile_column(series, top_k=PROFILE_TOP_K, bins=PROFILE_BINS, sketch=None):
+    """Profile of one column: type, counts, most frequent values and (numeric) range, moments
+    and histogram. The range and moments come from the ColumnSketch of the column if given.
+    """
+    kind = get_column_kind(series)
+    nulls = int(series.isna().sum())
+    counts = series.value_counts(dropna=True, sort=True)
+
+    profile = {
+        'name': str(series.name),
+        'dtype': str(series.dtype),
+        'kind': kind,
+        'count': len(series) - nulls,
+        'nulls': nulls,
+        'unique': len(counts),
+        'top': [{'value': to_json_value(v), 'count': int(c)}
+                for v, c in counts.head(top_k).items()],
+    }
+
+    if kind == 'numeric' and len(counts):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        stats = sketch.stats if sketch is not None else None
+        if stats is None or not np.isfinite([stats.min, stats.max]).all():
+            # no sketch (or one with infinite values), the finite values are summarized here
+            stats = RunningStats().update(values[np.isfinite(values)])
+        if stats.count:
+            # values outside the (finite) range, nan included, are left out of the histogram
+            hist, edges = np.histogram(values, bins=bins, range=(stats.min, stats.max))
+            profile.update({
+                'min': to_json_value(stats.min),
+                'max': to_json_value(stats.max),
+                'mean': to_json_value(stats.mean),
+                'std': to_json_value(stats.std),
+                'histogram': {'edges': edges.tolist(), 'counts': hist.tolist()},
+            })
+
+    return profile
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def create_profile(file, df, sketches=None):
+    """Profile of every column of the DataFrame parsed from the given file, using the column
+    sketches of its sidecar (by column name) where available.
+    """
+    sketches = sketches or {}
+    return {
+        'version': PROFILE_VERSION,
+        'source': file.name,
+        'size': file.size,
+        'rows': len(df),
+        'columns': [profile_column(df[c], sketch=sketches.get(str(c))) for c in df.columns],
+    }
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def is_profile_current(profile, file):
+    """True if the profile was computed (by this version of the code) from the given file."""
+    if not profile or not file:
+        return False
+    try:
+        size = file.size
+    except OSError:
+        return False
+    return (profile.get('version') == PROFILE_VERSION and profile.get('source') == file.name
+            and profile.get('size') == size)
+#-------------------------------------------------------------------------------------------------
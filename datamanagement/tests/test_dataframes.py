@@ -0,0 +1,93 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) datamanagement test of the dataframes code
+# ------------------------------------------------------------------------------------------------
+# Notes: This is a code test for the 'dataframes' of the serverside module that allows the user
+#        to interact with the 'datamanagement' interface of the website.
+# ------------------------------------------------------------------------------------------------
+# References: Django platform libraries, numpy, pandas libs and 'datamanagement'-folder's
+#             'dataframes' and common.sketches
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from django.core.files.base import ContentFile
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
+
+import numpy as np
+import pandas as pd
+import shutil
+import tempfile
+
+from common.helpers import read_dataframe_from_file
+from common.sketches import ColumnSketch
+from common.sketches import sketch_frame
+from datamanagement.dataframes import get_sidecar_meta
+from datamanagement.dataframes import read_sidecar
+from datamanagement.dataframes import write_sidecar
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class SidecarTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        storage = FileSystemStorage(location=self.root)
+        name = storage.save('owner/data.csv', ContentFile(b'a;b;c\n1;2.5;x\n2;;y\n3;4.5;z\n'))
+        self.file = File(storage.open(name).file, name=name)
+        self.file.storage = storage
+        self.addCleanup(self.file.close)
+
+    def test_delimiter_and_round_trip(self):
+        df, file_type = read_dataframe_from_file(self.file)
+        self.assertEqual(file_type, 'csv')
+        self.assertEqual(list(df.columns), ['a', 'b', 'c'])
+
+        write_sidecar(self.file, df)
+        stored = read_sidecar(self.file)
+
+        pd.testing.assert_frame_equal(stored, df)
+
+    def test_outdated_sidecar_is_ignored(self):
+        df, file_type = read_dataframe_from_file(self.file)
+        write_sidecar(self.file, df)
+        self.assertIsNotNone(get_sidecar_meta(self.file))
+
+        self.file.name = 'owner/other.csv'
+        self.assertIsNone(read_sidecar(self.file))
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class SketchTests(SimpleTestCase):
+
+    def test_merged_chunks_match_describe(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({'x': rng.normal(size=20000), 'y': rng.exponential(size=20000)})
+        df.loc[::7, 'y'] = np.nan
+
+        sketches = sketch_frame(df, chunk_size=3000)
+        exact = df.describe()
+        for c in df.columns:
+            described = sketches[c].describe()
+            for name in ['count', 'mean', 'std', 'min', 'max']:
+                self.assertAlmostEqual(described[name], exact.loc[name, c], places=8)
+            for name in ['25%', '50%', '75%']:
+                self.assertAlmostEqual(described[name], exact.loc[name, c], delta=0.02)
+
+    def test_json_round_trip(self):
+        sketch = ColumnSketch().update(np.arange(100.0))
+        restored = ColumnSketch.from_dict(sketch.to_dict())
+        self.assertEqual(restored.describe(), sketch.describe())
+#-------------------------------------------------------------------------------------------------
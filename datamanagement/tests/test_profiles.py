@@ -0,0 +1,62 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) datamanagement test of the profiles code
+# ------------------------------------------------------------------------------------------------
+# Notes: This is a code test for the 'profiles' of the serverside module that allows the user
+#        to interact with the 'datamanagement' interface of the website.
+# ------------------------------------------------------------------------------------------------
+# References: Django platform libraries, json, numpy, pandas libs, common.sketches and
+#             'datamanagement'-folder's 'profiles'
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from django.test import SimpleTestCase
+
+import json
+import numpy as np
+import pandas as pd
+
+from common.sketches import ColumnSketch
+from datamanagement.profiles import profile_column
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class ProfileTests(SimpleTestCase):
+
+    def test_numeric_column(self):
+        profile = profile_column(pd.Series([1.0, 2.0, np.nan, 2.0, 5.0], name='x'), top_k=2, bins=4)
+
+        self.assertEqual(profile['kind'], 'numeric')
+        self.assertEqual((profile['count'], profile['nulls'], profile['unique']), (4, 1, 3))
+        self.assertEqual(profile['top'][0], {'value': 2.0, 'count': 2})
+        self.assertEqual((profile['min'], profile['max']), (1.0, 5.0))
+        self.assertEqual(profile['histogram']['counts'], [1, 2, 0, 1])
+
+    def test_categorical_column_is_json(self):
+        profile = profile_column(pd.Series(['a', 'b', 'a', None], name='c'))
+
+        self.assertEqual(profile['kind'], 'categorical')
+        self.assertEqual(profile['top'], [{'value': 'a', 'count': 2}, {'value': 'b', 'count': 1}])
+        self.assertNotIn('histogram', profile)
+        json.dumps(profile, allow_nan=False)
+
+    def test_sketch_gives_the_same_profile(self):
+        series = pd.Series(np.random.default_rng(0).normal(size=500), name='x')
+        sketch = ColumnSketch().update(series.to_numpy())
+
+        with_sketch = profile_column(series, sketch=sketch)
+        without = profile_column(series)
+
+        self.assertEqual(with_sketch['histogram'], without['histogram'])
+        for key in ('count', 'min', 'max', 'mean', 'std'):
+            self.assertAlmostEqual(with_sketch[key], without[key], places=9)
+#-------------------------------------------------------------------------------------------------
@@ -61,6 +61,12 @@ urlpatterns = [
         view=views2.DataSourceRetrieveUpdateDestroyAPIView.as_view(),
         name="datasource_rest_api",
     ),
+    url(
+        regex=r"^api/datasource/(?P<id>[-\w]+)/profile/$",
+        view=views2.DataSourceProfileAPIView.as_view(),
+        name="datasource_profile_rest_api",
+    ),
     path("datasources/<id>/content", views.get_data, name="datasource_content"),
+    path("datasources/<id>/rows", views.get_rows, name="datasource_rows"),
 ]
 #-------------------------------------------------------------------------------------------------
@@ -23,6 +23,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
 from django.db.models import Q
 from django.shortcuts import redirect
 from django.shortcuts import render
@@ -35,9 +36,12 @@ from django.views.generic import DetailView
 from django.views.generic import UpdateView
 
 from django.http import HttpResponse
+from django.http import HttpResponseBadRequest
+from django.http import HttpResponseForbidden
 from django.http import HttpResponseNotFound
 from django.http import HttpResponseNotAllowed
 from django.http import HttpResponseServerError
+from django.http import StreamingHttpResponse
 
 from django_filters.views import FilterView
 from django_tables2.config import RequestConfig
@@ -46,7 +50,8 @@ from django_tables2.views import SingleTableView
 from rules.contrib.views import PermissionRequiredMixin
 from rules.contrib.views import LoginRequiredMixin
 
-from common.helpers import get_contents_from_file
+from .dataframes import get_contents_from_datasource
+from .dataframes import get_dataframe
 from .forms import DataSourceForm
 from .models import DataSource
 from .helpers import DataSourceTable
@@ -55,6 +60,7 @@ from .helpers import DataSourceFilterHelper
 from users.models import User
 
 import rules
+import json
 
 from logging import getLogger
 
@@ -193,7 +199,7 @@ class DataSourceDetailView(PermissionRequiredMixin, DetailView):
         # read contents if the file is CSS (or EXCEL?)
         context["file"] = context["object"].file
 
-        contents, file_type, columns = get_contents_from_file(context["object"].file)
+        contents, file_type, columns = get_contents_from_datasource(context["object"])
 
         context["contents"] = contents
         context["file_type"] = file_type
@@ -260,10 +266,102 @@ def get_data(request, id):
     logger.info(request.user.id)
     logger.info(target.name)
 
-    contents, file_type, columns = get_contents_from_file(target.file)
+    contents, file_type, columns = get_contents_from_datasource(target)
 
     if file_type == "csv":
         return HttpResponse(contents)
 
     return HttpResponseServerError("The file type is not supported.")
 #-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+ROWS_CHUNK_SIZE = 5000
+
+
+def iter_chunks(df, columns):
+    # rows are sliced first (a view of the memory-mapped columns), so only one chunk is copied
+    for start in range(0, len(df), ROWS_CHUNK_SIZE):
+        yield df.iloc[start:start + ROWS_CHUNK_SIZE][columns]
+
+
+def iter_rows_ndjson(df, columns):
+    for chunk in iter_chunks(df, columns):
+        yield chunk.to_json(orient="records", lines=True).rstrip("\n") + "\n"
+
+
+def iter_rows_json(df, columns, header):
+    yield json.dumps(header)[:-1] + ', "data": ['
+    separator = ""
+    for chunk in iter_chunks(df, columns):
+        records = chunk.to_json(orient="records")[1:-1]
+        if records:
+            yield separator + records
+            separator = ","
+    yield "]}"
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+def get_rows(request, id):
+    """Stream a window of the rows of a data source.
+
+    Query parameters:
+        offset  -- first row (default 0)
+        limit   -- number of rows (default all remaining rows)
+        columns -- comma separated column names (default all columns)
+        format  -- "ndjson" (one record per line) or "json" (default)
+    """
+
+    try:
+        target = DataSource.objects.filter(id=id).first()
+    except ValidationError:
+        target = None
+
+    if target is None:
+        return HttpResponseNotFound("The resource is not found.")
+
+    if not rules.test_rule("can_read_datasource", request.user, target):
+        return HttpResponseForbidden("Access denied.")
+
+    df = get_dataframe(target)
+    if df is None:
+        return HttpResponseServerError("The file type is not supported.")
+
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+        limit = request.GET.get("limit", None)
+        limit = len(df) if limit is None else max(int(limit), 0)
+    except ValueError:
+        return HttpResponseBadRequest("offset and limit must be integers.")
+
+    columns = request.GET.get("columns", None)
+    if columns:
+        columns = columns.split(",")
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            return HttpResponseBadRequest("Unknown columns: " + ", ".join(missing))
+    else:
+        columns = list(df.columns)
+
+    total = len(df)
+    df = df.iloc[offset:offset + limit]
+
+    if request.GET.get("format", "json") == "ndjson":
+        response = StreamingHttpResponse(
+            iter_rows_ndjson(df, columns), content_type="application/x-ndjson"
+        )
+    else:
+        header = {
+            "columns": columns,
+            "total": total,
+            "offset": offset,
+            "count": len(df),
+        }
+        response = StreamingHttpResponse(
+            iter_rows_json(df, columns, header), content_type="application/json"
+        )
+
+    response["X-Total-Count"] = str(total)
+    return response
+#-------------------------------------------------------------------------------------------------
@@ -0,0 +1,4 @@
+# Make sure the celery app is loaded when Django starts so that shared tasks use it
+from .celery import app as celery_app  # noqa
+
+__all__ = ('celery_app',)
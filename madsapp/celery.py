@@ -25,8 +25,8 @@ from celery import Celery
 
 #-------------------------------------------------------------------------------------------------
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "madsapp.settings.local")
-
+# No settings default here: this module is imported by the package (madsapp/__init__.py), so a
+# default would win over the one of wsgi.py / manage.py. Workers use 'madsapp.worker' instead.
 app = Celery('madsapp_tasks')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks(lambda: [n.name for n in apps.get_app_configs()])
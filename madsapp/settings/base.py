@@ -160,6 +160,64 @@ WEBPACK_LOADER = {
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+CELERY_TASK_TRACK_STARTED = True
+CELERY_RESULT_EXPIRES = 60 * 60 * 24
+
+# Analysis
+# number of parsed data sources kept in memory per process for data source references
+DATASOURCE_FRAME_CACHE_SIZE = 8
+
+# column profiles of the data sources: most frequent values kept and histogram bins per column
+DATASOURCE_PROFILE_TOP_K = 10
+DATASOURCE_PROFILE_BINS = 20
+
+# cache of component results, BACKEND is one of "locmem", "filesystem", "django" or None (off)
+ANALYSIS_RESULT_CACHE = {
+    "BACKEND": "locmem",
+    "MAX_ENTRIES": 128,
+    "MAX_BYTES": 256 * 1024 * 1024,
+    "LOCATION": base_dir_join("tmp_analysis_cache"),  # "filesystem" only
+    "CACHE_ALIAS": "default",  # "django" only
+    "TIMEOUT": None,
+}
+# joblib backend and per request core limit (None: all cores) of the parallel components
+ANALYSIS_PARALLEL_BACKEND = "loky"
+ANALYSIS_MAX_N_JOBS = 4
+# candidates predicted at once, and best candidates kept, by the Gaussian process component
+# for three or more features
+ANALYSIS_GP_CHUNK_SIZE = 16384
+ANALYSIS_GP_MAX_KEPT_CANDIDATES = 10000
+# (kernel, data, split) scores of the Gaussian process "route" mode remembered per process
+ANALYSIS_GP_SCORE_CACHE_SIZE = 1024
+# observations after which a Bayesian optimization session re-optimizes its kernel
+ANALYSIS_BO_REFIT_EVERY = 5
+# rows above which clustering switches to MiniBatchKMeans / fitting a Gaussian mixture on a
+# random sample of this size (all rows are assigned afterwards)
+ANALYSIS_CLUSTERING_LARGE_ROWS = 50000
+ANALYSIS_CLUSTERING_SAMPLE_SIZE = 20000
+# rows the silhouette score of a cluster count sweep is computed on
+ANALYSIS_CLUSTERING_SILHOUETTE_SAMPLE_SIZE = 5000
+# rows above which the 3D scatter PCA is fitted incrementally, in chunks of this many rows,
+# and fitted projections remembered per process
+ANALYSIS_PCA_INCREMENTAL_ROWS = 200000
+ANALYSIS_PCA_CHUNK_SIZE = 50000
+ANALYSIS_PROJECTION_CACHE_SIZE = 8
+# neighbors of the cached kNN graph of the t-SNE/UMAP embeddings (3 * perplexity + 2 are
+# needed) and neighbor graphs / embeddings remembered per process
+ANALYSIS_EMBEDDING_GRAPH_NEIGHBORS = 92
+ANALYSIS_EMBEDDING_CACHE_SIZE = 4
+# feature importances (per data, features, target and method) remembered per process
+ANALYSIS_IMPORTANCE_CACHE_SIZE = 64
+
+# Prediction
+# number of rows predicted with one call of the estimator in batch predictions
+PREDICTION_CHUNK_SIZE = 10000
+# loaded estimators of pretrained models kept per process (MAX_BYTES is compared to the file sizes;
+# the files are memory mapped, but trees and forests are copied into every process that loads them)
+PREDICTION_MODEL_REGISTRY = {
+    "MAX_ENTRIES": 16,
+    "MAX_BYTES": 512 * 1024 * 1024,
+}
 
 
 # For django-guardian and rules
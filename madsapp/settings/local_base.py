@@ -50,7 +50,19 @@ STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
 AUTH_PASSWORD_VALIDATORS = []  # allow easy passwords only on local
 
 # Celery
+# Runs the tasks in-process. To try a real worker without redis, use the local filesystem
+# broker instead, e.g.:
+#   CELERY_TASK_ALWAYS_EAGER = False
+#   CELERY_BROKER_URL = 'filesystem://'
+#   CELERY_BROKER_TRANSPORT_OPTIONS = {
+#       'data_folder_in': base_dir_join('tmp_celery', 'out'),
+#       'data_folder_out': base_dir_join('tmp_celery', 'out'),
+#   }
+#   CELERY_RESULT_BACKEND = 'file://' + base_dir_join('tmp_celery', 'results')
 CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_STORE_EAGER_RESULT = True
+CELERY_BROKER_URL = 'memory://'
+CELERY_RESULT_BACKEND = 'cache+memory://'
 
 # Email
 INSTALLED_APPS += ('naomi',)
@@ -0,0 +1,24 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) celery worker entry point for madsapp project.
+# ------------------------------------------------------------------------------------------------
+# Notes: Start workers with 'celery --app=madsapp.worker worker'. Only here the settings module
+#        defaults to the local settings, the web server keeps the default of wsgi.py.
+# ------------------------------------------------------------------------------------------------
+# References: os and the madsapp celery app
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+import os
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "madsapp.settings.local")
+
+from .celery import app  # noqa: E402
+#-------------------------------------------------------------------------------------------------
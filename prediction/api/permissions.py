@@ -43,3 +43,14 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         # Write permissions are only allowed to the owner of the snippet.
         return obj.owner == request.user
 #-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class CanReadModel(permissions.BasePermission):
+    """
+    Custom permission for actions that only use (read) a model, even when they are posted.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        return rules.test_rule('can_read_model', request.user, obj)
+#-------------------------------------------------------------------------------------------------
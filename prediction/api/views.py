@@ -12,8 +12,9 @@
 # Notes:  This is one of the REST API part of the serverside module that allows the user to
 #         interact with the 'prediction' interface of the website. (DB and server Python methods)
 # ------------------------------------------------------------------------------------------------
-# References: Django platform libraries and rest framework, logging, joblib, tempfile libs and
-#             'prediction' folder's 'models', 'api' subfolder's 'serializers' and 'permissions'
+# References: Django platform libraries and rest framework, logging, numpy, pandas, rules libs and
+#             'prediction' folder's 'models' and 'registry', 'api' subfolder's 'serializers' and
+#             'permissions'
 #             and 'analysis' folder's subfolder 'api' folder's 'utils'
 #=================================================================================================
 
@@ -21,7 +22,8 @@
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
 from django.db.models import Q
-from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.exceptions import ValidationError
+from django.http import StreamingHttpResponse
 import logging
 from rest_framework.generics import (
     ListCreateAPIView,
@@ -32,18 +34,29 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.parsers import FormParser
 from rest_framework.parsers import JSONParser
+from rest_framework.parsers import MultiPartParser
 from rest_framework import status
-import joblib
+import numpy as np
+import pandas as pd
+import rules
 
 from ..models import PretrainedModel
+from ..registry import model_registry
 from .serializers import PretrainedModelSerializer
 from .serializers import PretrainedModelSimpleSerializer
+from .permissions import CanReadModel
 from .permissions import IsOwnerOrReadOnly
 from analysis.api.utils.processor import get_model
+from common.helpers import sniff_delimiter
+from datamanagement.dataframes import get_dataframe
+from datamanagement.models import DataSource
 
+import json
 import sys
-import tempfile
 
 logger = logging.getLogger(__name__)
 
@@ -102,6 +115,10 @@ class PretrainedModelAPIViewSet(
         """
         if self.action == 'create_with_param':
             permission_classes = [IsOwnerOrReadOnly]
+        elif self.action == 'predict_batch':
+            permission_classes = [CanReadModel]
+        elif self.action == 'registry_stats':
+            permission_classes = [permissions.IsAdminUser]
         else:
             permission_classes = [IsOwnerOrReadOnly]
         return [permission() for permission in permission_classes]
@@ -126,6 +143,17 @@ class PretrainedModelAPIViewSet(
         return Response(serializer.data)
 
 
+    @action(detail=False, methods=['get', 'delete'])
+    def registry_stats(self, request):
+        """
+        Return the size, hit rate and load times of the model registry of this server process,
+        or empty the registry.
+        """
+        if request.method == 'DELETE':
+            model_registry.clear()
+        return Response(model_registry.stats())
+
+
     @action(detail=False, methods=['post'])
     def create_with_param(self, request, *args, **kwargs):
         logger.info('create new model')
@@ -156,11 +184,7 @@ class PretrainedModelAPIViewSet(
             'view': viewSettings['view'],
         })
         logger.info(model)
-        with tempfile.TemporaryFile('w+b') as f:
-            joblib.dump(model, f)
-            f.seek(0)
-
-            pm.file = SimpleUploadedFile('test.pkl', f.read())
+        pm.save_estimator(model)
 
         serializer = PretrainedModelSerializer(pm)
         pm.save()
@@ -197,14 +221,82 @@ class PretrainedModelAPIViewSet(
             'view': viewSettings['view'],
         })
         logger.info(model)
-        with tempfile.TemporaryFile('w+b') as f:
-            joblib.dump(model, f)
-            f.seek(0)
-
-            pm.file = SimpleUploadedFile('test.pkl', f.read())
+        pm.save_estimator(model)
 
         serializer = PretrainedModelSerializer(pm)
         pm.save()
 
         return Response(serializer.data)
+
+
+    def get_batch_inputs(self, request, columns):
+        """Build the input matrix of a batch prediction from an uploaded csv file ('file'),
+        posted rows ('rows', lists ordered like the inports or records) or a data source
+        ('dataSource').
+        """
+        if 'file' in request.FILES:
+            f = request.FILES['file']
+            df = pd.read_csv(f, sep=sniff_delimiter(f))
+            return df[columns].to_numpy(dtype='float64')
+
+        if 'dataSource' in request.data:
+            try:
+                target = DataSource.objects.get(id=request.data['dataSource'])
+            except (DataSource.DoesNotExist, ValidationError):
+                raise NotFound('The data source is not found.')
+            if not rules.test_rule('can_read_datasource', request.user, target):
+                raise PermissionDenied('Access denied.')
+            df = get_dataframe(target)
+            if df is None:
+                raise ValueError('The file type of the data source is not supported.')
+            return df[columns].to_numpy(dtype='float64')
+
+        rows = request.data['rows']
+        if len(rows) > 0 and isinstance(rows[0], dict):
+            return pd.DataFrame(rows)[columns].to_numpy(dtype='float64')
+        if len(rows) == 0:
+            return np.empty((0, len(columns)), dtype='float64')
+        X = np.asarray(rows, dtype='float64')
+        if X.ndim != 2 or X.shape[1] != len(columns):
+            raise ValueError('Every row must have one value per input (%d).' % len(columns))
+        return X
+
+
+    @action(detail=True, methods=['post'], parser_classes=[JSONParser, MultiPartParser, FormParser])
+    def predict_batch(self, request, *args, **kwargs):
+        """
+        Predict many rows with one vectorized call per chunk and stream the predictions back
+        as json ({"name", "count", "predictions"}) or, with "format": "csv", as one csv column.
+        """
+        pm = self.get_object()
+        columns = pm.get_inport_names()
+        name = pm.metadata['outports'][0]['name']
+
+        try:
+            X = self.get_batch_inputs(request, columns)
+            predictions = pm.predict_batch(X)
+        except KeyError as e:
+            return Response({'status': 'error: missing input ' + str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({'status': 'error: ' + str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.data.get('format', 'json') == 'csv':
+            def stream():
+                yield name + '\n'
+                for chunk in predictions:
+                    yield '\n'.join(map(str, chunk.tolist())) + '\n'
+
+            return StreamingHttpResponse(stream(), content_type='text/csv')
+
+        def stream():
+            yield json.dumps({'name': name, 'count': len(X)})[:-1] + ', "predictions": ['
+            separator = ''
+            for chunk in predictions:
+                if len(chunk):
+                    yield separator + json.dumps(chunk.tolist())[1:-1]
+                    separator = ','
+            yield ']}'
+
+        return StreamingHttpResponse(stream(), content_type='application/json')
 #-------------------------------------------------------------------------------------------------
@@ -11,13 +11,16 @@
 # Notes: This is one part of the serverside module that allows the user to interact with the
 #        'prediction' interface of the website. (DB and server Python methods)
 # ------------------------------------------------------------------------------------------------
-# References: Django platform libraries, private-storage, json, numpy, joblib, logging and uuid libs
+# References: Django platform libraries, private-storage, json, numpy, joblib, itertools, logging,
+#             tempfile and uuid libs
+#             and 'prediction' folder's 'registry'
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.contrib.auth.models import Group
 from django.db import models
 from django.db.models.signals import post_delete
@@ -31,8 +34,11 @@ import joblib
 import numpy as np
 
 from common.models import OwnedResourceModel
+from .registry import model_registry
 
+import itertools
 import os
+import tempfile
 import uuid
 
 import logging
@@ -44,6 +50,9 @@ logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+# Number of rows that are predicted with one call of the estimator in batch predictions
+PREDICTION_CHUNK_SIZE = getattr(settings, 'PREDICTION_CHUNK_SIZE', 10000)
+
 #-------------------------------------------------------------------------------------------------
 def get_encoded_filepath(instance, filename):
     filename, file_extension = os.path.splitext(filename)
@@ -78,6 +87,7 @@ def delete_previous_file(function):
         # if the previous file exists, delete it.
         if previous and previous.file.name != self.file.name:
             previous.file.delete(False)
+        model_registry.invalidate(self.pk)
         return result
     return wrapper
 #-------------------------------------------------------------------------------------------------
@@ -118,6 +128,74 @@ class PretrainedModel(OwnedResourceModel):
     def get_public_models(self):
         return PretrainedModel.objects.filter(accessibility=PretrainedModel.ACCESSIBILITY_PUBLIC)
 
+    def get_inport_names(self):
+        return [inport['name'] for inport in self.metadata['inports']]
+
+    def save_estimator(self, estimator):
+        """Dump the estimator straight into the private storage and point the file field to it.
+
+        The file is written uncompressed, so its numpy arrays can be memory-mapped when loading,
+        and always to a new name, so that workers that still map the previous file are not hit by
+        it being overwritten in place. The previous file is deleted when the model is saved.
+        It is dumped to a temporary file in the same folder first and then renamed into place, so
+        a crash or a concurrent upload never leaves a partly written file under the final name.
+        """
+        storage = self.file.storage
+        name = storage.get_available_name(
+            self.file.field.generate_filename(self, 'model.pkl'),
+            max_length=self.file.field.max_length
+        )
+        path = storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                joblib.dump(estimator, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.file.name = name
+
+    def load_estimator(self):
+        # read only memory maps are shared between the worker processes through the page cache.
+        # This helps estimators that keep large plain numpy arrays (linear models, embeddings,
+        # dense layers); sklearn trees and forests copy their node arrays when unpickled, so
+        # every process that loads them holds its own copy
+        return joblib.load(self.file.storage.path(self.file.name), mmap_mode='r')
+
+    def get_estimator(self):
+        """Return the loaded estimator, shared through the in-process model registry."""
+        return model_registry.get(self)
+
+    def predict_batch(self, X, chunk_size=PREDICTION_CHUNK_SIZE):
+        """Predict all rows of X (ordered like the inports) with one call per chunk.
+
+        Arguments:
+            X {array-like} -- 2D matrix of input values, one row per sample.
+
+        Returns:
+            iterator of 1D arrays of predictions. The inputs are validated and the first chunk is
+            predicted before it is returned, so bad inputs raise here and not while streaming.
+        """
+        X = np.asarray(X, dtype='float64')
+        if X.ndim != 2 or X.shape[1] != len(self.metadata['inports']):
+            raise ValueError('The inputs must have one column per inport of the model.')
+        if not np.isfinite(X).all():
+            raise ValueError('The inputs must not contain empty, missing or infinite values.')
+        if len(X) == 0:
+            return iter([])
+
+        model = self.get_estimator()
+        first = model.predict(X[:chunk_size])
+        rest = (model.predict(X[start:start + chunk_size])
+                for start in range(chunk_size, len(X), chunk_size))
+        return itertools.chain([first], rest)
+
     def predict(self, inports):
 
         outport = {}
@@ -125,7 +203,7 @@ class PretrainedModel(OwnedResourceModel):
         for key, value in inports.items():
             inputs.append(float(value))    # TODO: support different types: str, etc,
         logger.info(inputs)
-        model = joblib.load(self.file)
+        model = self.get_estimator()
         out = model.predict([inputs])
 
         outport = out[0]
@@ -146,5 +224,6 @@ class PretrainedModel(OwnedResourceModel):
 # when deleting model the file is removed
 @receiver(post_delete, sender=PretrainedModel)
 def delete_file(sender, instance, **kwargs):
+    model_registry.invalidate(instance.pk)
     instance.file.delete(False)
 #-------------------------------------------------------------------------------------------------
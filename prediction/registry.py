@@ -0,0 +1,125 @@
+#=================================================================================================
+# Project: CADS/MADS - An Integrated Web-based Visual Platform for Materials Informatics
+#          Hokkaido University (2018)
+#          Last Update: Q3 2023
+# ________________________________________________________________________________________________
+# Authors: Mikael Nicander Kuwahara (Lead Developer) [2021-]
+# ________________________________________________________________________________________________
+# Description: Serverside (Django) Provided model registry for the 'Prediction' page
+# ------------------------------------------------------------------------------------------------
+# Notes: This is one part of the serverside module that keeps recently used pretrained models
+#        loaded in memory, so that predictions do not unpickle the estimator on every request.
+# ------------------------------------------------------------------------------------------------
+# References: Django settings, collections, os, threading, time and logging libs
+#=================================================================================================
+
+#-------------------------------------------------------------------------------------------------
+# Import required Libraries
+#-------------------------------------------------------------------------------------------------
+from django.conf import settings
+
+from collections import OrderedDict
+import os
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------------------------
+
+DEFAULT_MODEL_REGISTRY = {
+    'MAX_ENTRIES': 16,
+    'MAX_BYTES': 512 * 1024 * 1024,
+}
+
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class ModelRegistry:
+    """LRU of loaded estimators of pretrained models.
+
+    Entries are keyed by model id and the name, modification time and size of the model file, so a
+    replaced file is never served from the registry. The size of the file is used as approximation
+    of the memory an estimator needs.
+    """
+
+    def __init__(self, options=None):
+        options = dict(DEFAULT_MODEL_REGISTRY, **(options or {}))
+        self.max_entries = options['MAX_ENTRIES']
+        self.max_bytes = options['MAX_BYTES']
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load_time = 0.0
+
+    def get_key(self, pm):
+        path = pm.file.storage.path(pm.file.name)
+        st = os.stat(path)
+        return (str(pm.id), pm.file.name, st.st_mtime, st.st_size)
+
+    def get(self, pm):
+        """Return the estimator of the pretrained model, loading it when it is not registered."""
+        key = self.get_key(pm)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        start = time.perf_counter()
+        estimator = pm.load_estimator()
+        elapsed = time.perf_counter() - start
+        logger.info('loaded model ' + key[0] + ' in ' + '{:.3f}'.format(elapsed) + 's')
+
+        with self._lock:
+            self.misses += 1
+            self.load_time += elapsed
+            self._remove(key[0])
+            if not self.max_bytes or key[3] <= self.max_bytes:
+                self._entries[key] = estimator
+                self._bytes += key[3]
+                while len(self._entries) > self.max_entries or (
+                    self.max_bytes and self._bytes > self.max_bytes
+                ):
+                    old_key, _ = self._entries.popitem(last=False)
+                    self._bytes -= old_key[3]
+
+        return estimator
+
+    def _remove(self, model_id):
+        for k in [k for k in self._entries if k[0] == model_id]:
+            del self._entries[k]
+            self._bytes -= k[3]
+
+    def invalidate(self, model_id):
+        with self._lock:
+            self._remove(str(model_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': self.hits / lookups if lookups else 0.0,
+                'loadTime': self.load_time,
+                'meanLoadTime': self.load_time / self.misses if self.misses else 0.0,
+            }
+#-------------------------------------------------------------------------------------------------
+
+model_registry = ModelRegistry(getattr(settings, 'PREDICTION_MODEL_REGISTRY', None))
+
+#-------------------------------------------------------------------------------------------------
@@ -10,19 +10,155 @@
 # ------------------------------------------------------------------------------------------------
 # Notes: This is the Tests part of the Prediction object as served from the Django server
 # ------------------------------------------------------------------------------------------------
-# References: Django platform libraries
+# References: Django platform libraries, rest framework, numpy, sklearn, os, tempfile, types,
+#             unittest libs and 'prediction' folder's 'models' and 'registry'
 #=================================================================================================
 
 #-------------------------------------------------------------------------------------------------
 # Import required Libraries
 #-------------------------------------------------------------------------------------------------
+from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from unittest import mock
+
+import json
+import numpy as np
+import os
+import tempfile
+import types
+from sklearn.linear_model import LinearRegression
+
+from .models import PretrainedModel
+from .registry import ModelRegistry
 
 #-------------------------------------------------------------------------------------------------
 
 
 #-------------------------------------------------------------------------------------------------
+class ModelRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.storage = FileSystemStorage(location=self.dir.name)
+        self.loads = 0
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def make_model(self, id, size):
+        name = str(id) + '.pkl'
+        with open(os.path.join(self.dir.name, name), 'wb') as f:
+            f.write(b'x' * size)
+
+        def load_estimator():
+            self.loads += 1
+            return object()
+
+        file = types.SimpleNamespace(name=name, storage=self.storage)
+        return types.SimpleNamespace(id=id, file=file, load_estimator=load_estimator)
+
+    def test_loaded_once(self):
+        registry = ModelRegistry()
+        pm = self.make_model(1, 10)
+        self.assertIs(registry.get(pm), registry.get(pm))
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(registry.stats()['hits'], 1)
+
+    def test_bounded_by_bytes(self):
+        registry = ModelRegistry({'MAX_BYTES': 100})
+        a, b = self.make_model(1, 60), self.make_model(2, 60)
+        registry.get(a)
+        registry.get(b)
+        self.assertEqual(registry.stats()['entries'], 1)
+        registry.get(a)
+        self.assertEqual(self.loads, 3)
+
+    def test_invalidate(self):
+        registry = ModelRegistry()
+        pm = self.make_model(1, 10)
+        registry.get(pm)
+        registry.invalidate(1)
+        registry.get(pm)
+        self.assertEqual(self.loads, 2)
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class PredictBatchAPITests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(email='test@example.com')
+        self.pm = PretrainedModel(name='model', owner=self.user, metadata={
+            'inports': [{'name': 'a'}, {'name': 'b'}],
+            'outports': [{'name': 'y'}],
+        })
+        self.pm.save()
+
+        estimator = LinearRegression().fit(np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]]), [1.0, 3.0, 4.0])
+        patcher = mock.patch.object(PretrainedModel, 'get_estimator', return_value=estimator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('prediction:models-api-predict-batch', kwargs={'pk': self.pm.id})
+
+    def test_predictions_are_streamed(self):
+        response = self.client.post(self.url, {'rows': [[1.0, 1.0], [2.0, 0.0]]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(b''.join(response.streaming_content))
+        self.assertEqual((result['name'], result['count']), ('y', 2))
+        np.testing.assert_allclose(result['predictions'], [6.0, 5.0])
+
+        response = self.client.post(self.url, {'rows': [{'a': 2.0, 'b': 0.0}], 'format': 'csv'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content).decode().split(), ['y', '5.0'])
+
+    def test_chunks(self):
+        chunks = list(self.pm.predict_batch(np.ones((5, 2)), chunk_size=2))
+        self.assertEqual([len(c) for c in chunks], [2, 2, 1])
+        self.assertEqual(list(self.pm.predict_batch(np.ones((0, 2)))), [])
+
+    def test_bad_inputs_are_rejected_before_streaming(self):
+        for rows in ([[1.0, None]], [[1.0, 2.0, 3.0]], [{'a': 1.0}], [[1.0, 2.0, 3.0, 4.0]],
+                     [1.0, 2.0, 3.0, 4.0]):
+            response = self.client.post(self.url, {'rows': rows}, format='json')
+            self.assertEqual(response.status_code, 400, rows)
+            self.assertFalse(response.streaming)
+
+        with mock.patch.object(LinearRegression, 'predict', side_effect=ValueError('bad input')):
+            response = self.client.post(self.url, {'rows': [[1.0, 2.0]]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bad input', response.data['status'])
+#-------------------------------------------------------------------------------------------------
+
+
+#-------------------------------------------------------------------------------------------------
+class SaveEstimatorTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.pm = PretrainedModel(name='model', owner=get_user_model().objects.create(email='test@example.com'))
+        self.pm.file.storage = FileSystemStorage(location=self.dir.name)
+
+    def list_files(self):
+        return [f for _, _, files in os.walk(self.dir.name) for f in files]
+
+    def test_saved_and_memory_mapped(self):
+        estimator = LinearRegression().fit(np.array([[0.0], [1.0]]), [0.0, 2.0])
+        self.pm.save_estimator(estimator)
 
-# Create your tests here.
+        self.assertEqual(self.list_files(), [os.path.basename(self.pm.file.name)])
+        np.testing.assert_allclose(self.pm.load_estimator().predict([[2.0]]), [4.0])
 
+    def test_failed_dump_leaves_no_file(self):
+        with mock.patch('prediction.models.joblib.dump', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.pm.save_estimator(LinearRegression())
+        self.assertEqual(self.list_files(), [])
 #-------------------------------------------------------------------------------------------------